@@ -0,0 +1,191 @@
+import argparse
+import cv2
+import json
+import platform
+import shutil
+import tempfile
+import time
+import tracemalloc
+import tss
+
+from pathlib import Path
+from synthetic import SyntheticSensorObserver, SyntheticVideoCapture, generate_sources
+from typing import Any, Callable, Dict, List
+
+
+def measure(function: Callable[[], Any]) -> Dict[str, float]:
+    """
+    関数の実行時間とPythonのヒープの最大使用量を計測する
+
+    Parameters
+    ----------
+    function : Callable[[], Any]
+
+        計測する関数
+
+    Returns
+    ----------
+    result : Dict[str, float]
+
+        実行時間(秒)と最大使用量(MiB)
+    """
+    tracemalloc.start()
+    start_time = time.perf_counter()
+
+    function()
+
+    elapsed = time.perf_counter() - start_time
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {'seconds': elapsed, 'peak_mib': peak / 2 ** 20}
+
+
+def bench_capture(work_dir: Path, args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    合成したカメラとセンサで録画し、撮影のフレームレートと取りこぼしを計測する
+    """
+    capture = SyntheticVideoCapture(args.width, args.height, args.fps)
+
+    observers = [SyntheticSensorObserver(args.sample_rate, args.channels, name=f'sensor{i}')
+                 for i in range(args.streams)]
+
+    engine = tss.RecordingEngine(observers, fps=int(args.fps), work_dir=work_dir, video_capture=capture)
+
+    recorded_samples = [0]
+
+    def count(name: str, samples: List[tss.Sample]) -> None:
+        recorded_samples[0] += len(samples)
+
+    engine.add_record_observe_method(count)
+
+    with engine:
+        engine.start()
+        generated_before = sum(observer.sample_count for observer in observers)
+
+        start_time = time.perf_counter()
+        time.sleep(args.duration)
+
+        metrics = engine.metrics()
+
+        engine.stop()
+        elapsed = time.perf_counter() - start_time
+
+        generated_samples = sum(observer.sample_count for observer in observers) - generated_before
+
+        recorded_frames = engine.metrics()['pipeline']['recorded_frames']
+
+        results = {
+            'capture_fps': recorded_frames / elapsed,
+            'target_fps': args.fps,
+            'recorded_frames': recorded_frames,
+            'dropped_frames': capture.dropped_count,
+            'generated_samples': generated_samples,
+            'recorded_samples': recorded_samples[0],
+            'dropped_samples': sum(observer.dropped_count for observer in observers),
+            'encode_latency_ms': metrics['pipeline']['encode_latency']['mean_ms'],
+            'callback_latency_ms': max(sensor['callback_latency']['mean_ms'] or 0.0
+                                       for sensor in metrics['sensors'].values())
+        }
+
+        results['save'] = measure(lambda: engine.save(work_dir / 'capture.tss'))
+
+    return results
+
+
+def bench_files(work_dir: Path, args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    合成した.tssファイルの保存と出力にかかる時間とメモリを計測する
+    """
+    movie_file_path, record_file_paths, frame_index_file_path = generate_sources(
+        work_dir / 'sources', args.frames, args.fps, (args.width, args.height),
+        args.sample_rate, args.channels, args.streams)
+
+    tss_file_path = work_dir / 'synthetic.tss'
+    file_manager = tss.TSSFileManager(tss_file_path)
+
+    results: Dict[str, Any] = {}
+
+    results['save'] = measure(lambda: file_manager.save(
+        movie_file_path, record_file_paths, frame_index_file_path=frame_index_file_path))
+
+    results['size_mib'] = tss_file_path.stat().st_size / 2 ** 20
+
+    # 読み出し結果のキャッシュの影響を受けないよう、出力毎に開き直す
+    results['exportAsCSV'] = measure(lambda: tss.TSSFileManager(tss_file_path).exportAsCSV(
+        work_dir / 'export.csv'))
+
+    (work_dir / 'export_md').mkdir()
+
+    results['exportAsMD'] = measure(lambda: tss.TSSFileManager(tss_file_path).exportAsMD(
+        work_dir / 'export_md', image_format=args.image_format))
+
+    return results
+
+
+BENCHMARKS = {
+    'capture': bench_capture,
+    'files': bench_files
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=u'カメラやセンサを用いずに録画と出力の性能を計測する')
+
+    parser.add_argument('benchmarks', nargs='*',
+                        help=u'実行するベンチマーク(' + ', '.join(BENCHMARKS.keys()) + u')。省略した場合は全て')
+    parser.add_argument('--duration', type=float, default=10.0, help=u'captureで録画する時間(秒)')
+    parser.add_argument('--frames', type=int, default=1800, help=u'filesで合成する動画のフレーム数')
+    parser.add_argument('--fps', type=float, default=30.0, help=u'フレームレート')
+    parser.add_argument('--width', type=int, default=1280, help=u'フレームの幅')
+    parser.add_argument('--height', type=int, default=720, help=u'フレームの高さ')
+    parser.add_argument('--sample-rate', type=float, default=100.0, help=u'各センサの1秒あたりの入力数')
+    parser.add_argument('--channels', type=int, default=9, help=u'1件の入力に含まれる値の数')
+    parser.add_argument('--streams', type=int, default=1, help=u'センサの数')
+    parser.add_argument('--image-format', choices=['png', 'jpg'], default='png', help=u'exportAsMDの画像形式')
+    parser.add_argument('--output', default=None, help=u'結果を追記するJSON Linesファイルへのパス')
+
+    args = parser.parse_args()
+
+    names = args.benchmarks or list(BENCHMARKS.keys())
+
+    for name in names:
+        if name not in BENCHMARKS:
+            parser.error(f'unknown benchmark: {name}')
+
+    report: Dict[str, Any] = {
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'opencv': cv2.__version__,
+        'parameters': {key: value for key, value in vars(args).items() if key not in ('benchmarks', 'output')}
+    }
+
+    work_dir = Path(tempfile.mkdtemp(prefix='tss-benchmark-'))
+
+    try:
+        for name in names:
+            benchmark_dir = work_dir / name
+            benchmark_dir.mkdir()
+
+            report[name] = BENCHMARKS[name](benchmark_dir, args)
+
+            print(f'[{name}]')
+
+            for key, value in report[name].items():
+                if isinstance(value, dict):
+                    print(f'  {key:<18} {value["seconds"]:10.3f} s {value["peak_mib"]:10.1f} MiB')
+                elif isinstance(value, float):
+                    print(f'  {key:<18} {value:10.2f}')
+                else:
+                    print(f'  {key:<18} {value:10}')
+    finally:
+        shutil.rmtree(work_dir)
+
+    if args.output is not None:
+        with open(args.output, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(report) + '\n')
+
+
+if __name__ == '__main__':
+    main()
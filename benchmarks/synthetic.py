@@ -0,0 +1,326 @@
+import cv2
+import math
+import numpy as np
+import time
+import tss
+
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+
+class SyntheticVideoCapture:
+    """
+    cv2.VideoCaptureの代わりに、一定の間隔で合成したフレームを返すフレーム源
+
+    実際のカメラと同様に、読み出しが間に合わなかったフレームは捨てられ、dropped_countに数えられる。
+    """
+
+    def __init__(self, width: int = 1280, height: int = 720, fps: float = 30.0) -> None:
+        """
+        Parameters
+        ----------
+        width : int
+
+            フレームの幅
+
+        height : int
+
+            フレームの高さ
+
+        fps : float
+
+            フレームが生成される頻度
+        """
+        self.__width = width
+        self.__height = height
+        self.__fps = fps
+        self.__interval = 1.0 / fps
+
+        # 横方向のグラデーションをずらすことで、フレーム毎に内容が変わるようにする
+        gradient = np.linspace(0, 255, width, dtype=np.uint8)
+        self.__base = np.ascontiguousarray(np.broadcast_to(gradient[None, :, None], (height, width, 3)))
+
+        self.__start_time: Optional[float] = None
+        self.__next_tick = 0
+
+        self.__frame_count = 0
+        self.__dropped_count = 0
+
+    @property
+    def frame_count(self) -> int:
+        """
+        Returns
+        ----------
+        frame_count : int
+
+            読み出されたフレーム数
+        """
+        return self.__frame_count
+
+    @property
+    def dropped_count(self) -> int:
+        """
+        Returns
+        ----------
+        dropped_count : int
+
+            読み出しが間に合わず捨てられたフレーム数
+        """
+        return self.__dropped_count
+
+    def isOpened(self) -> bool:
+        return True
+
+    def get(self, prop_id: int) -> float:
+        if prop_id == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self.__width)
+        elif prop_id == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self.__height)
+        elif prop_id == cv2.CAP_PROP_FPS:
+            return self.__fps
+
+        return 0.0
+
+    def read(self) -> Tuple[bool, np.ndarray]:
+        """
+        次のフレームが生成される時刻まで待ち、フレームを返す
+
+        Returns
+        ----------
+        ret : bool
+
+            常にTrue
+
+        frame : np.ndarray
+
+            BGRのフレーム
+        """
+        now = time.perf_counter()
+
+        if self.__start_time is None:
+            self.__start_time = now
+
+        tick = math.floor((now - self.__start_time) / self.__interval)
+
+        if tick < self.__next_tick:
+            time.sleep(self.__start_time + self.__next_tick * self.__interval - now)
+            tick = self.__next_tick
+        else:
+            self.__dropped_count += tick - self.__next_tick
+
+        self.__next_tick = tick + 1
+        self.__frame_count += 1
+
+        return True, self.frame(tick)
+
+    def frame(self, tick: int) -> np.ndarray:
+        """
+        待たずにフレームを合成する
+
+        Parameters
+        ----------
+        tick : int
+
+            フレームの通し番号
+
+        Returns
+        ----------
+        frame : np.ndarray
+
+            BGRのフレーム
+        """
+        return np.roll(self.__base, tick * 8, axis=1)
+
+    def release(self) -> None:
+        pass
+
+
+class SyntheticSensorObserver(tss.SensorObserver):
+    """
+    一定の頻度で合成した値を入力するSensorObserver
+    """
+
+    def __init__(self,
+                 rate: float = 100.0,
+                 channels: int = 9,
+                 queue_size: int = 4096,
+                 overflow_policy: str = 'drop_oldest',
+                 name: Optional[str] = None) -> None:
+        """
+        Parameters
+        ----------
+        rate : float
+
+            1秒あたりの入力数
+
+        channels : int
+
+            1件の入力に含まれる値の数
+
+        queue_size : int
+
+            通知待ちの入力を保持するキューの大きさ
+
+        overflow_policy : str
+
+            キューが溢れた場合の方針
+
+        name : Optional[str]
+
+            記録される際のストリーム名
+        """
+        super().__init__(tuple(['No'] + [f'Ch{i}' for i in range(channels)]),
+                         queue_size, overflow_policy, name)
+
+        self.__interval = 1.0 / rate
+        self.__channels = channels
+
+        self.__count = 0
+        self.__next_time: Optional[float] = None
+
+    @property
+    def sample_count(self) -> int:
+        """
+        Returns
+        ----------
+        sample_count : int
+
+            生成された入力の数
+        """
+        return self.__count
+
+    def read_data(self) -> Tuple:
+        """
+        次の入力の時刻まで待ち、合成した値を返す
+
+        Returns
+        ----------
+        data : Tuple
+
+            通し番号と各チャンネルの値
+        """
+        now = time.perf_counter()
+
+        if self.__next_time is None:
+            self.__next_time = now
+        elif self.__next_time > now:
+            time.sleep(self.__next_time - now)
+
+        self.__next_time += self.__interval
+        self.__count += 1
+
+        return synthetic_row(self.__count, self.__channels)
+
+
+def synthetic_row(number: int, channels: int) -> Tuple:
+    """
+    通し番号から合成した1件分の値を求める
+
+    Parameters
+    ----------
+    number : int
+
+        通し番号
+
+    channels : int
+
+        値の数
+
+    Returns
+    ----------
+    row : Tuple
+
+        通し番号と各チャンネルの値
+    """
+    return (number,) + tuple(int(1000 * math.sin(number * 0.01 * (i + 1))) for i in range(channels))
+
+
+def generate_sources(dir_path: Path,
+                     frames: int = 600,
+                     fps: float = 30.0,
+                     size: Tuple[int, int] = (640, 360),
+                     sample_rate: float = 100.0,
+                     channels: int = 9,
+                     streams: int = 1) -> Tuple[Path, Dict[str, Path], Path]:
+    """
+    .tssファイルの元になる動画と記録を合成して書き出す
+
+    Parameters
+    ----------
+    dir_path : Path
+
+        書き出し先のフォルダ
+
+    frames : int
+
+        動画のフレーム数
+
+    fps : float
+
+        動画のフレームレート
+
+    size : Tuple[int, int]
+
+        動画の大きさ(幅, 高さ)
+
+    sample_rate : float
+
+        各センサの1秒あたりの入力数
+
+    channels : int
+
+        1件の入力に含まれる値の数
+
+    streams : int
+
+        センサの数
+
+    Returns
+    ----------
+    movie_file_path : Path
+
+        動画ファイルへのパス
+
+    record_file_paths : Dict[str, Path]
+
+        ストリーム名毎の記録ファイルへのパス
+
+    frame_index_file_path : Path
+
+        各フレームの撮影時刻の記録ファイルへのパス
+    """
+    dir_path.mkdir(parents=True, exist_ok=True)
+
+    movie_file_path = dir_path / 'movie.mp4'
+    frame_index_file_path = dir_path / 'frames.jsonl'
+
+    capture = SyntheticVideoCapture(size[0], size[1], fps)
+    frame_interval = int(1e9 / fps)
+
+    video_writer = cv2.VideoWriter(str(movie_file_path), cv2.VideoWriter_fourcc(*'mp4v'), fps, size)
+
+    with tss.FrameIndexWriter(frame_index_file_path) as frame_index_writer:
+        for frame_no in range(frames):
+            video_writer.write(capture.frame(frame_no))
+            frame_index_writer.write(frame_no * frame_interval)
+
+    video_writer.release()
+
+    labels = tuple(['No'] + [f'Ch{i}' for i in range(channels)])
+    sample_count = int(frames / fps * sample_rate)
+    sample_interval = int(1e9 / sample_rate)
+
+    record_file_paths: Dict[str, Path] = {}
+
+    for stream in range(streams):
+        name = f'sensor{stream}'
+        record_file_path = dir_path / f'{name}.jsonl'
+
+        with tss.RecordWriter(record_file_path, labels) as record_writer:
+            for number in range(sample_count):
+                timestamp = number * sample_interval
+                record_writer.write(timestamp // frame_interval, synthetic_row(number, channels), timestamp)
+
+        record_file_paths[name] = record_file_path
+
+    return movie_file_path, record_file_paths, frame_index_file_path
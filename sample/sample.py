@@ -9,6 +9,26 @@ class SerialComObserver(tss.SensorObserver):
     シリアル通信でセンサとやり取りする場合のSensorObserver例
     """
 
+    # 受信データ中の各値の配置
+    # 受信データは先頭1文字の後に、58バイト分のデータが16進数で続く
+    DECODER = tss.FrameDecoder([
+        tss.Field('No', offset=4),
+        tss.Field('Area1', offset=15),
+        tss.Field('Area2', offset=17),
+        tss.Field('Area3', offset=19),
+        tss.Field('Area4', offset=21),
+        tss.Field('Temp', offset=24, scale=0.125 / 64, bias=26.75),
+        tss.Field('AccelX', offset=29),
+        tss.Field('AccelY', offset=31),
+        tss.Field('AccelZ', offset=33),
+        tss.Field('GyroX', offset=35),
+        tss.Field('GyroY', offset=37),
+        tss.Field('GyroZ', offset=39),
+        tss.Field('MagX', offset=41),
+        tss.Field('MagY', offset=43),
+        tss.Field('MagZ', offset=45)
+    ], frame_size=58, prefix_length=1)
+
     def __init__(self, port: str, baudrate: int) -> None:
         """
         Parameters
@@ -21,66 +41,10 @@ class SerialComObserver(tss.SensorObserver):
 
             ボーレート
         """
-        super().__init__(('No', 'Area1', 'Area2', 'Area3', 'Area4',
-                          'Temp', 'AccelX', 'AccelY', 'AccelZ',
-                          'GyroX', 'GyroY', 'GyroZ', 'MagX', 'MagY', 'MagZ'))
-
-        self.__data_format = {
-            'No':       0x00000000ffff00000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000,
-            'Area1':    0x000000000000000000000000000000ffff0000000000000000000000000000000000000000000000000000000000000000000000000000000000,
-            'Area2':    0x0000000000000000000000000000000000ffff000000000000000000000000000000000000000000000000000000000000000000000000000000,
-            'Area3':    0x00000000000000000000000000000000000000ffff00000000000000000000000000000000000000000000000000000000000000000000000000,
-            'Area4':    0x000000000000000000000000000000000000000000ffff0000000000000000000000000000000000000000000000000000000000000000000000,
-            'Temp':     0x000000000000000000000000000000000000000000000000ffff0000000000000000000000000000000000000000000000000000000000000000,
-            'AccelX':   0x0000000000000000000000000000000000000000000000000000000000ffff000000000000000000000000000000000000000000000000000000,
-            'AccelY':   0x00000000000000000000000000000000000000000000000000000000000000ffff00000000000000000000000000000000000000000000000000,
-            'AccelZ':   0x000000000000000000000000000000000000000000000000000000000000000000ffff0000000000000000000000000000000000000000000000,
-            'GyroX':    0x0000000000000000000000000000000000000000000000000000000000000000000000ffff000000000000000000000000000000000000000000,
-            'GyroY':    0x00000000000000000000000000000000000000000000000000000000000000000000000000ffff00000000000000000000000000000000000000,
-            'GyroZ':    0x000000000000000000000000000000000000000000000000000000000000000000000000000000ffff0000000000000000000000000000000000,
-            'MagX':     0x0000000000000000000000000000000000000000000000000000000000000000000000000000000000ffff000000000000000000000000000000,
-            'MagY':     0x00000000000000000000000000000000000000000000000000000000000000000000000000000000000000ffff00000000000000000000000000,
-            'MagZ':     0x000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000ffff0000000000000000000000
-        }
-
-        self.__labels = tuple(self.__data_format.keys())
+        super().__init__(SerialComObserver.DECODER.labels)
 
         self.__serial = serial.Serial(port, baudrate)
 
-    def extract_data(self, data: int, position_indicator: int) -> int:
-        """
-        データから指定した部分の値を抜き出す
-
-        Parameters
-        ----------
-        data : int
-
-            抜き出す元のデータ
-
-        position_indicator : int
-
-            抜き出す部分のbitを1、それ以外のbitを0とした値
-
-        Returns
-        ----------
-        extracted_data : int
-
-            抜き出されたデータ
-        """
-        while position_indicator & 1 == 0:
-            position_indicator >>= 1
-            data >>= 1
-
-        extracted_data = data & position_indicator
-
-        most_significant_bit = extracted_data - \
-            (extracted_data & (position_indicator >> 1))
-
-        if most_significant_bit != 0:
-            extracted_data -= most_significant_bit << 1
-
-        return extracted_data
-
     def parse_data(self, raw_data: bytes) -> Tuple:
         """
         受信したデータをパースする
@@ -89,20 +53,7 @@ class SerialComObserver(tss.SensorObserver):
 
             受信できた生のデータ
         """
-        data = int(raw_data.decode()[1:], 16)
-
-        result_list = []
-
-        for label in self.__data_format.keys():
-            result_list.append(self.extract_data(
-                data, self.__data_format[label]))
-
-        temp_index = self.__labels.index('Temp')
-
-        result_list[temp_index] *= (0.125 / 64)
-        result_list[temp_index] += 26.75
-
-        return tuple(result_list)
+        return SerialComObserver.DECODER.decode(raw_data)
 
     def read_data(self) -> Tuple:
         """
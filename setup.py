@@ -4,6 +4,7 @@ setup(
     name='tss',
     version='0.1',
     install_requires=[
+        'numpy',
         'opencv_contrib_python',
         'Pillow',
         'pyserial'
@@ -0,0 +1,147 @@
+import cv2
+import numpy as np
+import pytest
+import time
+
+from pathlib import Path
+from tss.filemanager import TSSFileManager
+from tss.record import FrameIndexWriter, RecordWriter
+from tss.sensor import SensorObserver
+from typing import Any, Callable, Optional, Sequence
+
+
+# テスト用の動画のフレーム数・フレームレート・大きさ
+MOVIE_FRAME_COUNT = 60
+MOVIE_FPS = 30
+MOVIE_SIZE = (64, 48)
+
+# テスト用の記録の各フレームの撮影時刻の起点
+FRAME_TIME_ORIGIN = 1000
+
+
+def draw_frame(frame_no: int) -> np.ndarray:
+    """
+    フレーム番号を識別できる画像を作成する
+    """
+    frame = np.zeros((MOVIE_SIZE[1], MOVIE_SIZE[0], 3), dtype=np.uint8)
+    frame[:, (frame_no * 3) % MOVIE_SIZE[0]] = 255
+    frame[(frame_no * 5) % MOVIE_SIZE[1], :] = 128
+
+    return frame
+
+
+class CountingObserver(SensorObserver):
+    """
+    一定の間隔で連番を返すセンサ
+    """
+
+    def __init__(self) -> None:
+        super().__init__(('x',))
+        self.count = 0
+
+    def read_data(self):
+        time.sleep(0.002)
+        self.count += 1
+        return (self.count,)
+
+
+@pytest.fixture(scope='session')
+def movie_frame_count() -> int:
+    """
+    テスト用の動画のフレーム数
+    """
+    return MOVIE_FRAME_COUNT
+
+
+@pytest.fixture(scope='session')
+def movie_path(tmp_path_factory: pytest.TempPathFactory) -> Path:
+    """
+    mp4v形式で符号化されたテスト用の動画
+    """
+    path = tmp_path_factory.mktemp('movie') / 'movie.mp4'
+
+    video_writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*'mp4v'), MOVIE_FPS, MOVIE_SIZE)
+
+    for frame_no in range(MOVIE_FRAME_COUNT):
+        video_writer.write(draw_frame(frame_no))
+
+    video_writer.release()
+
+    return path
+
+
+@pytest.fixture(scope='session')
+def movie_frames(movie_path: Path) -> Sequence[np.ndarray]:
+    """
+    テスト用の動画を先頭から順にデコードしたフレーム
+    """
+    video_capture = cv2.VideoCapture(str(movie_path))
+    frames = []
+
+    while True:
+        ret, frame = video_capture.read()
+
+        if not ret:
+            break
+
+        frames.append(frame)
+
+    video_capture.release()
+
+    return frames
+
+
+@pytest.fixture
+def write_record() -> Callable[..., Path]:
+    """
+    RecordWriterで記録ファイルを書き出す関数
+    """
+    def write(path: Path, labels: Sequence[str], rows: Sequence[Sequence[Any]],
+              frames: Sequence[int], times: Optional[Sequence[int]] = None) -> Path:
+        with RecordWriter(path, labels) as record_writer:
+            for i, row in enumerate(rows):
+                record_writer.write(frames[i], row, None if times is None else times[i])
+
+        return path
+
+    return write
+
+
+@pytest.fixture
+def saved_recording(tmp_path_factory: pytest.TempPathFactory,
+                    movie_path: Path,
+                    write_record: Callable[..., Path]) -> Callable[..., Path]:
+    """
+    テスト用の動画と記録を.tss形式で保存する関数
+
+    記録は、各フレームに1件ずつxとしてフレーム番号の10倍を持つimuと、1フレームおきにyとしてフレーム番号を持つgpsの
+    2つのストリームからなる。imuの受信時刻と各フレームの撮影時刻はFRAME_TIME_ORIGINにフレーム番号を足した値である。
+    """
+    def save(path: Path, movie_file_path: Path = movie_path, sensor_format: str = 'columns') -> Path:
+        records_dir = tmp_path_factory.mktemp('records')
+        frames = list(range(MOVIE_FRAME_COUNT))
+
+        imu_path = write_record(records_dir / 'imu.jsonl', ('x',), [(frame * 10,) for frame in frames], frames,
+                                [FRAME_TIME_ORIGIN + frame for frame in frames])
+        gps_path = write_record(records_dir / 'gps.jsonl', ('y',), [(frame,) for frame in frames[::2]], frames[::2])
+
+        frame_index_path = records_dir / 'frames.jsonl'
+
+        with FrameIndexWriter(frame_index_path) as frame_index_writer:
+            for frame in frames:
+                frame_index_writer.write(FRAME_TIME_ORIGIN + frame)
+
+        TSSFileManager(path).save(movie_file_path, {'imu': imu_path, 'gps': gps_path}, delete_original_files=False,
+                                  frame_index_file_path=frame_index_path, sensor_format=sensor_format)
+
+        return path
+
+    return save
+
+
+@pytest.fixture
+def counting_observer() -> CountingObserver:
+    """
+    一定の間隔で連番を返すセンサ
+    """
+    return CountingObserver()
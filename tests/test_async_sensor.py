@@ -0,0 +1,75 @@
+import asyncio
+import threading
+import time
+
+from tss.async_sensor import AsyncSensorObserver
+
+
+class FailingObserver(AsyncSensorObserver):
+    """
+    数件を読み出した後に例外を送出するセンサ
+    """
+
+    def __init__(self) -> None:
+        super().__init__(('x',))
+        self.count = 0
+
+    async def read_data(self):
+        await asyncio.sleep(0.001)
+        self.count += 1
+
+        if self.count > 3:
+            raise OSError('sensor disconnected')
+
+        return (self.count,)
+
+
+def test_stop_observe_joins_dispatcher_after_reader_error():
+    observer = FailingObserver()
+    received = []
+    observer.add_observe_method(received.append)
+
+    threads = set(threading.enumerate())
+
+    observer.start_observe()
+    time.sleep(0.1)
+    observer.stop_observe(timeout=1.0)
+
+    assert isinstance(observer.error, OSError)
+    assert received == [(1,), (2,), (3,)]
+    assert [thread for thread in threading.enumerate() if thread not in threads and not thread.daemon] == []
+
+
+class BlockingAsyncObserver(AsyncSensorObserver):
+    """
+    キューが満杯の場合に空きを待つ、連番を返すセンサ
+    """
+
+    def __init__(self) -> None:
+        super().__init__(('x',), queue_size=2, overflow_policy='block')
+        self.count = 0
+
+    async def read_data(self):
+        await asyncio.sleep(0.001)
+        self.count += 1
+        return (self.count,)
+
+
+def test_block_policy_counts_sample_held_at_stop():
+    observer = BlockingAsyncObserver()
+    received = []
+
+    def observe(data):
+        time.sleep(0.02)
+        received.append(data)
+
+    observer.add_observe_method(observe)
+
+    observer.start_observe()
+    time.sleep(0.2)
+    observer.stop_observe()
+
+    # 通知された入力と捨てられた入力で、読み出した全ての入力が数えられる
+    assert observer.error is None
+    assert len(received) + observer.dropped_count == observer.count
+    assert received == [(i + 1,) for i in range(len(received))]
@@ -0,0 +1,97 @@
+import os
+import pytest
+
+from pathlib import Path
+from tss.batch import _plan, collect_inputs, InvalidInputError, run_batch
+
+
+@pytest.fixture
+def recordings(tmp_path, saved_recording):
+    """
+    2つのフォルダに分けて保存された.tssファイル
+    """
+    input_dir = tmp_path / 'input'
+    (input_dir / 'a').mkdir(parents=True)
+    (input_dir / 'b').mkdir(parents=True)
+
+    saved_recording(input_dir / 'a' / 'first.tss')
+    saved_recording(input_dir / 'b' / 'second.tss')
+
+    return input_dir
+
+
+def run(inputs, output_dir, force=False):
+    results = {}
+
+    counts = run_batch('csv', inputs, output_dir, {'stream': 'imu'}, jobs=2, force=force,
+                       report=lambda input_path, result, error: results.__setitem__(input_path.name, result))
+
+    return counts, results
+
+
+def test_run_batch_skips_up_to_date_outputs(tmp_path, recordings):
+    inputs = collect_inputs([str(recordings)])
+    output_dir = tmp_path / 'output'
+
+    assert [relative_path for _, relative_path in inputs] == [Path('a/first.tss'), Path('b/second.tss')]
+
+    counts, results = run(inputs, output_dir)
+
+    assert counts == {'converted': 2, 'skipped': 0, 'failed': 0}
+    assert results == {'first.tss': 'converted', 'second.tss': 'converted'}
+    # フォルダの構成が出力先でも保たれ、ジョブ毎の一時フォルダは残らない
+    assert sorted(path.relative_to(output_dir).as_posix() for path in output_dir.rglob('*')) == \
+        ['a', 'a/first.csv', 'b', 'b/second.csv']
+
+    counts, _ = run(inputs, output_dir)
+
+    assert counts == {'converted': 0, 'skipped': 2, 'failed': 0}
+
+    counts, _ = run(inputs, output_dir, force=True)
+
+    assert counts == {'converted': 2, 'skipped': 0, 'failed': 0}
+
+
+def test_run_batch_keeps_previous_output_when_conversion_fails(tmp_path, recordings):
+    inputs = collect_inputs([str(recordings)])
+    output_dir = tmp_path / 'output'
+
+    run(inputs, output_dir)
+
+    output_path = output_dir / 'a' / 'first.csv'
+    previous = output_path.read_bytes()
+
+    # 壊れたファイルで置き換え、出力より新しくする
+    input_path = recordings / 'a' / 'first.tss'
+    input_path.write_bytes(b'not a zip file')
+    os.utime(input_path, (output_path.stat().st_mtime + 10, output_path.stat().st_mtime + 10))
+
+    counts, results = run(inputs, output_dir)
+
+    assert counts == {'converted': 0, 'skipped': 1, 'failed': 1}
+    assert results['first.tss'] == 'failed'
+    assert output_path.read_bytes() == previous
+    assert [path.name for path in (output_dir / 'a').iterdir()] == ['first.csv']
+
+
+def test_plan_rejects_colliding_outputs(tmp_path, recordings):
+    inputs = collect_inputs([str(recordings / '**' / '*.tss')])
+    (recordings / 'b' / 'second.tss').rename(recordings / 'b' / 'first.tss')
+    colliding = collect_inputs([str(recordings / '**' / '*.tss')])
+
+    assert len(_plan('csv', inputs, tmp_path / 'output')) == 2
+
+    with pytest.raises(InvalidInputError):
+        _plan('csv', colliding, tmp_path / 'output')
+
+    with pytest.raises(InvalidInputError):
+        run_batch('csv', colliding, tmp_path / 'output', {})
+
+    assert not (tmp_path / 'output').exists()
+
+
+def test_collect_inputs_rejects_non_tss_file(tmp_path):
+    (tmp_path / 'data.txt').write_text('')
+
+    with pytest.raises(InvalidInputError):
+        collect_inputs([str(tmp_path / 'data.txt')])
@@ -0,0 +1,30 @@
+import zipfile
+
+from tss.catalog import Catalog
+from tss.columns import MAGIC
+from tss.mp4 import member_data_offset
+
+
+def test_scan_counts_corrupt_column_member_as_failed(tmp_path, saved_recording, movie_frame_count):
+    recordings = tmp_path / 'recordings'
+    recordings.mkdir()
+
+    saved_recording(recordings / 'valid.tss')
+    saved_recording(recordings / 'corrupt.tss')
+
+    # 列形式の記録の識別子を壊す
+    with zipfile.ZipFile(recordings / 'corrupt.tss') as zip:
+        offset = member_data_offset(recordings / 'corrupt.tss', zip.getinfo('sensors/imu.columns'))
+
+    with (recordings / 'corrupt.tss').open(mode='r+b') as f:
+        f.seek(offset)
+        f.write(b'X' * len(MAGIC))
+
+    with Catalog(tmp_path / 'catalog.sqlite') as catalog:
+        counts = catalog.scan(recordings)
+
+        assert counts['added'] == 1
+        assert counts['failed'] == 1
+        assert [entry['path'] for entry in catalog.query()] == [str((recordings / 'valid.tss').resolve())]
+        # imuは各フレームに1件、gpsは1フレームおきに記録されている
+        assert catalog.query(label='x')[0]['sample_count'] == movie_frame_count + movie_frame_count // 2
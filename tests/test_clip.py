@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from tss.filemanager import TSSFileManager
+
+
+def test_export_clip_rebases_frames(tmp_path, saved_recording, movie_frames):
+    saved_recording(tmp_path / 'source.tss')
+
+    result = TSSFileManager(tmp_path / 'source.tss').exportClip(tmp_path / 'clip.tss', 15, 34)
+
+    assert result['frame_count'] == 20
+    assert result['copied_frames'] + result['encoded_frames'] == 20
+
+    clip = TSSFileManager(tmp_path / 'clip.tss')
+
+    imu = clip.sensor_data('imu')
+    assert imu.frames.tolist() == list(range(20))
+    assert [row[0] for row in imu.rows()] == [frame * 10 for frame in range(15, 35)]
+    assert imu.times.tolist() == [1000 + frame for frame in range(15, 35)]
+
+    gps = clip.sensor_data('gps')
+    assert gps.frames.tolist() == list(range(1, 20, 2))
+    assert [row[0] for row in gps.rows()] == list(range(16, 35, 2))
+
+    assert clip.frame_index().timestamps.tolist() == [1000 + frame for frame in range(15, 35)]
+
+    video_reader = clip.open_video()
+
+    try:
+        assert video_reader.frame_count == 20
+
+        for frame_no in range(20):
+            frame = video_reader.read(frame_no)
+            # 再エンコードされたフレームも元の画像とほぼ一致する
+            assert np.abs(frame.astype(int) - movie_frames[15 + frame_no].astype(int)).mean() < 8
+    finally:
+        video_reader.release()
+
+
+def test_export_clip_rejects_negative_start_frame(tmp_path, saved_recording):
+    saved_recording(tmp_path / 'source.tss')
+
+    with pytest.raises(ValueError):
+        TSSFileManager(tmp_path / 'source.tss').exportClip(tmp_path / 'clip.tss', -10)
+
+    assert not (tmp_path / 'clip.tss').exists()
@@ -0,0 +1,107 @@
+import io
+import json
+import numpy as np
+import pytest
+
+from pathlib import Path
+from tss.columns import ColumnReader, ColumnWriter
+from tss.filemanager import TSSFileManager
+
+
+def save_both(write_record, tmp_path: Path, movie_path: Path, labels, rows, frames, times=None):
+    """
+    同じ記録を列形式とJSON Lines形式で保存する
+    """
+    file_managers = {}
+
+    for sensor_format in ('columns', 'jsonl'):
+        record_path = write_record(tmp_path / f'{sensor_format}.jsonl', labels, rows, frames, times)
+
+        file_manager = TSSFileManager(tmp_path / f'{sensor_format}.tss')
+        file_manager.save(movie_path, {'imu': record_path}, delete_original_files=False, sensor_format=sensor_format)
+
+        file_managers[sensor_format] = TSSFileManager(tmp_path / f'{sensor_format}.tss')
+
+    return file_managers['columns'], file_managers['jsonl']
+
+
+def assert_same(actual, expected):
+    assert actual.labels == expected.labels
+    np.testing.assert_array_equal(actual.frames, expected.frames)
+    np.testing.assert_array_equal(actual.times, expected.times)
+
+    for label in expected.labels:
+        assert actual[label].dtype == expected[label].dtype
+        np.testing.assert_array_equal(actual[label], expected[label])
+
+
+def test_round_trip_matches_jsonl(tmp_path, movie_path, write_record):
+    rows = [(i, i * 0.5 if i % 7 else float('nan'), 'a' * (i % 3), None if i % 5 == 0 else i) for i in range(300)]
+    frames = [i // 5 for i in range(300)]
+    times = [i * 1000 for i in range(300)]
+
+    columns, jsonl = save_both(write_record, tmp_path, movie_path, ('n', 'f', 's', 'o'), rows, frames, times)
+
+    assert_same(columns.sensor_data('imu'), jsonl.sensor_data('imu'))
+    # NaNを含むため、JSONとして比較する
+    assert json.dumps(columns.read_record('imu'), sort_keys=True) == json.dumps(jsonl.read_record('imu'), sort_keys=True)
+    assert columns.sensor_summary('imu') == jsonl.sensor_summary('imu')
+
+
+def test_reserved_label_names_do_not_overwrite_frames_and_times(tmp_path, movie_path, write_record):
+    rows = [(1000 + i, 50 + i, i * 0.1) for i in range(10)]
+    frames = list(range(10))
+    times = [i * 1_000_000 for i in range(10)]
+
+    columns, jsonl = save_both(write_record, tmp_path, movie_path, ('time', 'frame', 'v'), rows, frames, times)
+
+    sensor_data = columns.read_sensor_data('imu')
+
+    np.testing.assert_array_equal(sensor_data.frames, frames)
+    np.testing.assert_array_equal(sensor_data.times, times)
+    np.testing.assert_array_equal(sensor_data['frame'], [50 + i for i in range(10)])
+    np.testing.assert_array_equal(sensor_data['time'], [1000 + i for i in range(10)])
+
+    assert_same(sensor_data, jsonl.sensor_data('imu'))
+
+    filtered = columns.read_sensor_data('imu', 2, 8, where={'frame': (55, None)})
+
+    np.testing.assert_array_equal(filtered.frames, [5, 6, 7, 8])
+    np.testing.assert_array_equal(filtered['frame'], [55, 56, 57, 58])
+
+
+def write_chunks(chunk_size: int = 100) -> ColumnReader:
+    writer = ColumnWriter(('x',), chunk_size=chunk_size)
+
+    for i in range(1000):
+        writer.write(i // 10, (i,), i)
+
+    buffer = io.BytesIO()
+    writer.finish(buffer)
+
+    return ColumnReader(buffer)
+
+
+def test_read_skips_chunks_outside_range():
+    reader = write_chunks()
+
+    sensor_data = reader.read(20, 29)
+
+    np.testing.assert_array_equal(sensor_data['x'], np.arange(200, 300))
+
+    sensor_data = reader.read(where={'x': (950, None)})
+
+    np.testing.assert_array_equal(sensor_data['x'], np.arange(950, 1000))
+    assert len(reader.read(where={'x': (5000, None)})) == 0
+
+
+def test_statistics_from_headers():
+    reader = write_chunks()
+
+    assert reader.count == 1000
+    assert reader.statistics() == {'x': (0, 999, 499.5)}
+
+
+def test_invalid_magic_is_rejected():
+    with pytest.raises(ColumnReader.InvalidFormatError):
+        ColumnReader(io.BytesIO(b'XXXX\x00\x00\x00\x00'))
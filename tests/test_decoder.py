@@ -0,0 +1,27 @@
+import pytest
+
+from tss.decoder import Field, FrameDecoder
+
+
+def test_decode_rows_keeps_one_row_per_line():
+    decoder = FrameDecoder([Field('x', 0), Field('y', 2, signed=False, scale=0.5)], prefix_length=1)
+    lines = [b'$0001FFFE\r\n', b'$00\r\n', b'$FFFF0004\r\n', b'$0001FFFE0000\r\n', b'$00020006\r\n']
+
+    rows = decoder.decode_rows(lines)
+
+    assert rows == [(1, 32767.0), None, (-1, 2.0), None, (2, 3.0)]
+    assert [decoder.decode(line) for line, row in zip(lines, rows) if row is not None] == \
+        [row for row in rows if row is not None]
+
+
+def test_decode_rows_binary():
+    decoder = FrameDecoder([Field('x', 1, width=1), Field('y', 2, width=4)], byteorder='little', encoding='binary')
+
+    rows = decoder.decode_rows([b'\x00\x05\x01\x00\x00\x00', b'\x00\x05', b'\x00\xff\xff\xff\xff\xff'])
+
+    assert rows == [(5, 1), None, (-1, -1)]
+
+
+def test_overlapping_fields_are_rejected():
+    with pytest.raises(ValueError):
+        FrameDecoder([Field('x', 0, width=4), Field('y', 2)])
@@ -0,0 +1,67 @@
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from tss.engine import RecordingEngine
+
+
+class FakeCapture:
+    """
+    一定の間隔で黒いフレームを返すカメラの代わり
+    """
+
+    def read(self):
+        time.sleep(1 / 30)
+        return True, np.zeros((48, 64, 3), dtype=np.uint8)
+
+    def get(self, prop_id):
+        return {cv2.CAP_PROP_FRAME_WIDTH: 64, cv2.CAP_PROP_FRAME_HEIGHT: 48}.get(prop_id, 0)
+
+    def release(self):
+        pass
+
+
+def test_records_samples_received_between_start_and_stop(tmp_path, counting_observer):
+    observer = counting_observer
+    received = []
+    recorded = []
+    lock = threading.Lock()
+
+    observer.add_sample_observe_method(received.append)
+
+    def observe(name, samples):
+        with lock:
+            recorded.extend(samples)
+
+    engine = RecordingEngine(observer, frame_width=64, frame_height=48, fps=30,
+                             work_dir=tmp_path, video_capture=FakeCapture())
+    engine.add_record_observe_method(observe)
+
+    with engine:
+        time.sleep(0.2)
+
+        before_start = time.monotonic_ns()
+        engine.start()
+        after_start = time.monotonic_ns()
+
+        time.sleep(0.3)
+
+        before_stop = time.monotonic_ns()
+        engine.stop()
+        after_stop = time.monotonic_ns()
+
+        with lock:
+            recorded_at_stop = list(recorded)
+
+        time.sleep(0.2)
+
+    # 開始前・終了後に受信したデータは、通知が遅れても記録されない
+    assert len(recorded_at_stop) > 0
+    assert recorded == recorded_at_stop
+    assert all(before_start <= sample.timestamp <= after_stop for sample in recorded)
+
+    # 録画中に受信したデータは、終了時にまとめて通知される前のものも含めて全て記録される
+    expected = [sample for sample in received if after_start <= sample.timestamp <= before_stop]
+    assert [sample for sample in recorded if after_start <= sample.timestamp <= before_stop] == expected
@@ -0,0 +1,70 @@
+import csv
+import numpy as np
+import pytest
+
+from tss.filemanager import TSSFileManager
+
+
+@pytest.fixture
+def large_recording(tmp_path, movie_path, write_record):
+    """
+    出力時の1チャンクより多い記録を持つ.tssファイル
+
+    各フレームに5件ずつ、整数・小数・文字列の値を持つ。
+    """
+    rows = [(i, i * 0.25, f'v{i % 13}') for i in range(TSSFileManager.EXPORT_CHUNK_SIZE * 2 + 123)]
+    frames = [i // 5 for i in range(len(rows))]
+    record_path = write_record(tmp_path / 'imu.jsonl', ('n', 'f', 's'), rows, frames)
+
+    TSSFileManager(tmp_path / 'large.tss').save(movie_path, {'imu': record_path}, delete_original_files=False)
+
+    return TSSFileManager(tmp_path / 'large.tss'), rows, frames
+
+
+def read_csv(path):
+    with path.open(newline='') as f:
+        return list(csv.reader(f))
+
+
+def test_csv_rows_match_records_across_chunks(tmp_path, large_recording):
+    file_manager, rows, frames = large_recording
+
+    file_manager.exportAsCSV(tmp_path / 'all.csv')
+
+    assert read_csv(tmp_path / 'all.csv') == [['n', 'f', 's']] + [[str(value) for value in row] for row in rows]
+
+
+def test_csv_frame_range(tmp_path, large_recording):
+    file_manager, rows, frames = large_recording
+    start_frame, end_frame = 1999, 4003
+
+    file_manager.exportAsCSV(tmp_path / 'range.csv', start_frame, end_frame)
+
+    expected = [[str(value) for value in row] for row, frame in zip(rows, frames) if start_frame <= frame <= end_frame]
+
+    assert len(expected) > TSSFileManager.EXPORT_CHUNK_SIZE
+    assert read_csv(tmp_path / 'range.csv')[1:] == expected
+
+
+def test_csv_does_not_overwrite_without_exists_ok(tmp_path, large_recording):
+    file_manager, _, _ = large_recording
+    (tmp_path / 'exists.csv').write_text('keep')
+
+    with pytest.raises(TSSFileManager.FileAlreadyExistsError):
+        file_manager.exportAsCSV(tmp_path / 'exists.csv')
+
+    assert (tmp_path / 'exists.csv').read_text() == 'keep'
+
+
+@pytest.mark.parametrize('compressed', [False, True])
+def test_npz_arrays_match_records(tmp_path, large_recording, compressed):
+    file_manager, rows, frames = large_recording
+
+    file_manager.exportAsNPZ(tmp_path / 'all.npz', 10, 19, compressed=compressed)
+
+    with np.load(tmp_path / 'all.npz') as npz:
+        assert sorted(npz.files) == ['f', 'frame', 'n', 's']
+        np.testing.assert_array_equal(npz['frame'], np.repeat(np.arange(10, 20), 5))
+        np.testing.assert_array_equal(npz['n'], np.arange(50, 100))
+        np.testing.assert_array_equal(npz['f'], np.arange(50, 100) * 0.25)
+        assert npz['s'].tolist() == [f'v{i % 13}' for i in range(50, 100)]
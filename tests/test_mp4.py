@@ -0,0 +1,64 @@
+import io
+import zipfile
+
+import pytest
+
+from tss.mp4 import keyframe_index, KEYFRAME_INDEX_MEMBER, read_keyframe_index, UnsupportedMovieError
+
+
+def test_keyframe_index(movie_path, movie_frame_count):
+    data = movie_path.read_bytes()
+    index = keyframe_index(io.BytesIO(data), len(data))
+
+    assert index['frame_count'] == movie_frame_count
+    assert index['keyframes'][0] == 0
+
+
+def test_malformed_movie_is_unsupported(movie_path):
+    data = movie_path.read_bytes()
+    moov = data.find(b'moov') - 4
+
+    # moovボックスのサンプル表の途中で切れた動画
+    for end in range(moov + 8, data.find(b'stco'), 97):
+        with pytest.raises(UnsupportedMovieError):
+            keyframe_index(io.BytesIO(data[:end]), end)
+
+    # サンプル数が壊れた動画
+    stsz = data.find(b'stsz')
+    broken = data[:stsz + 12] + b'\xff\xff\xff\xff' + data[stsz + 16:]
+
+    with pytest.raises(UnsupportedMovieError):
+        keyframe_index(io.BytesIO(broken), len(broken))
+
+
+def test_save_malformed_movie_without_keyframe_index(tmp_path, movie_path, saved_recording):
+    data = movie_path.read_bytes()
+    truncated_path = tmp_path / 'truncated.mp4'
+    truncated_path.write_bytes(data[:data.find(b'stbl')])
+
+    saved_recording(tmp_path / 'truncated.tss', truncated_path)
+
+    with zipfile.ZipFile(tmp_path / 'truncated.tss') as zip:
+        assert KEYFRAME_INDEX_MEMBER not in zip.namelist()
+        assert zip.read('movie.mp4') == truncated_path.read_bytes()
+
+
+def test_read_keyframe_index_ignores_replaced_movie(tmp_path, saved_recording, movie_frame_count):
+    saved_recording(tmp_path / 'original.tss')
+
+    with zipfile.ZipFile(tmp_path / 'original.tss') as zip:
+        assert read_keyframe_index(zip)['movie.mp4']['frame_count'] == movie_frame_count
+
+        # 索引を残したまま動画だけを置き換える
+        with zipfile.ZipFile(tmp_path / 'replaced.tss', 'w') as replaced:
+            for info in zip.infolist():
+                content = zip.read(info)
+
+                if info.filename == 'movie.mp4':
+                    content = content[:-1] + bytes([content[-1] ^ 0xFF])
+
+                replaced.writestr(info, content)
+
+    with zipfile.ZipFile(tmp_path / 'replaced.tss') as zip:
+        assert KEYFRAME_INDEX_MEMBER in zip.namelist()
+        assert read_keyframe_index(zip) == {}
@@ -0,0 +1,78 @@
+import threading
+import time
+
+from tss.sensor import SensorObserver
+
+
+def test_drain_delivers_pending_batches(counting_observer):
+    observer = counting_observer
+    batches = []
+    lock = threading.Lock()
+
+    def observe(samples):
+        with lock:
+            batches.append(samples)
+
+    # 通常は終了まで通知されない大きさと間隔でまとめる
+    observer.add_batch_observe_method(observe, batch_size=100000, interval=60.0)
+
+    observer.start_observe()
+
+    try:
+        time.sleep(0.1)
+        timestamp = time.monotonic_ns()
+
+        assert observer.drain(timestamp, timeout=1.0)
+
+        with lock:
+            delivered = [sample for batch in batches for sample in batch]
+    finally:
+        observer.stop_observe()
+
+    all_samples = [sample for batch in batches for sample in batch]
+
+    # 指定した時刻までに受信した入力は、drainから戻った時点で全て通知されている
+    assert len(delivered) > 0
+    assert delivered == all_samples[:len(delivered)]
+    assert [sample for sample in all_samples if sample.timestamp <= timestamp] == \
+        [sample for sample in delivered if sample.timestamp <= timestamp]
+
+
+def test_drain_without_dispatcher_returns_immediately(counting_observer):
+    assert counting_observer.drain(timeout=0.0)
+
+
+class BlockingObserver(SensorObserver):
+    """
+    キューが満杯の場合に空きを待つ、連番を返すセンサ
+    """
+
+    def __init__(self) -> None:
+        super().__init__(('x',), queue_size=2, overflow_policy='block')
+        self.count = 0
+
+    def read_data(self):
+        time.sleep(0.001)
+        self.count += 1
+        return (self.count,)
+
+
+def test_block_policy_counts_sample_held_at_stop():
+    observer = BlockingObserver()
+    received = []
+
+    # 空きを待つ時間(0.1秒)より通知を遅くし、終了時に入力を保持したままにする
+    def observe(data):
+        time.sleep(0.15)
+        received.append(data)
+
+    observer.add_observe_method(observe)
+
+    observer.start_observe()
+    time.sleep(0.2)
+    observer.stop_observe()
+
+    # 通知された入力と捨てられた入力で、読み出した全ての入力が数えられる
+    assert len(received) + observer.dropped_count == observer.count
+    assert observer.metrics()['dropped_count'] == observer.dropped_count
+    assert received == [(i + 1,) for i in range(len(received))]
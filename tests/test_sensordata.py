@@ -0,0 +1,111 @@
+import csv
+import numpy as np
+import pytest
+
+from tss.__main__ import gencsv
+from tss.sensordata import SensorData
+
+
+@pytest.fixture
+def sensor_data():
+    """
+    フレーム0に3件、フレーム1に1件、フレーム3に2件の記録
+    """
+    return SensorData(('a', 'b', 's'),
+                      np.array([0, 0, 0, 1, 3, 3]),
+                      {'a': np.array([1, 2, 6, 4, 5, 7]),
+                       'b': np.array([0.5, 1.5, 2.5, 3.5, 4.5, 5.5]),
+                       's': np.array(['p', 'q', 'r', 's', 't', 'u'])},
+                      np.array([0, 10, 20, 30, 40, 55]))
+
+
+def test_resample_per_frame(sensor_data):
+    resampled = sensor_data.resample(('mean', 'count'))
+
+    assert resampled.labels == ('a_mean', 'b_mean', 'count')
+    np.testing.assert_array_equal(resampled.frames, [0, 1, 3])
+    np.testing.assert_allclose(resampled['a_mean'], [3.0, 4.0, 6.0])
+    np.testing.assert_allclose(resampled['b_mean'], [1.5, 3.5, 5.0])
+    np.testing.assert_array_equal(resampled['count'], [3, 1, 2])
+    assert resampled.times is None
+
+
+def test_resample_per_frame_other_functions(sensor_data):
+    resampled = sensor_data.resample(('min', 'max', 'sum', 'first', 'last'), labels=('a',))
+
+    np.testing.assert_array_equal(resampled['a_min'], [1, 4, 5])
+    np.testing.assert_array_equal(resampled['a_max'], [6, 4, 7])
+    np.testing.assert_array_equal(resampled['a_sum'], [9, 4, 12])
+    np.testing.assert_array_equal(resampled['a_first'], [1, 4, 5])
+    np.testing.assert_array_equal(resampled['a_last'], [6, 4, 7])
+
+
+def test_resample_fills_missing_frames(sensor_data):
+    resampled = sensor_data.resample(('mean', 'count'), labels=('a',), fill=True)
+
+    np.testing.assert_array_equal(resampled.frames, [0, 1, 2, 3])
+    np.testing.assert_allclose(resampled['a_mean'], [3.0, 4.0, np.nan, 6.0])
+    np.testing.assert_array_equal(resampled['count'], [3, 1, 0, 2])
+
+
+def test_resample_by_interval(sensor_data):
+    resampled = sensor_data.resample(('mean', 'count'), labels=('a',), interval=25)
+
+    # 受信時刻0-24, 25-49, 50-74の区間にまとめられる
+    np.testing.assert_array_equal(resampled.times, [0, 25, 50])
+    np.testing.assert_array_equal(resampled.frames, [0, 1, 3])
+    np.testing.assert_allclose(resampled['a_mean'], [3.0, 4.5, 7.0])
+    np.testing.assert_array_equal(resampled['count'], [3, 2, 1])
+
+    resampled = sensor_data.resample(('count',), interval=20, origin=-10, fill=True)
+
+    np.testing.assert_array_equal(resampled.times, [-10, 10, 30, 50])
+    np.testing.assert_array_equal(resampled['count'], [1, 2, 2, 1])
+
+
+def test_resample_rejects_invalid_arguments(sensor_data):
+    with pytest.raises(ValueError):
+        sensor_data.resample(('mode',))
+
+    without_times = SensorData(('a',), sensor_data.frames, {'a': sensor_data['a']})
+
+    with pytest.raises(ValueError):
+        without_times.resample(interval=10)
+
+
+def read_csv(path):
+    with path.open(newline='') as f:
+        return list(csv.reader(f))
+
+
+def test_gencsv_aggregate(tmp_path, saved_recording):
+    tss_path = saved_recording(tmp_path / 'recording.tss')
+
+    gencsv([str(tss_path), str(tmp_path / 'frames.csv'), '--stream', 'gps', '--aggregate', 'max,count'])
+
+    rows = read_csv(tmp_path / 'frames.csv')
+
+    assert rows[0] == ['frame', 'y_max', 'count']
+    assert rows[1:4] == [['0', '0', '1'], ['2', '2', '1'], ['4', '4', '1']]
+
+    # imuの受信時刻は1ナノ秒毎のため、10ナノ秒の区間には10件ずつ含まれる
+    gencsv([str(tss_path), str(tmp_path / 'interval.csv'), '--stream', 'imu', '--aggregate', 'mean,count',
+            '--interval', '1e-8'])
+
+    rows = read_csv(tmp_path / 'interval.csv')
+
+    assert rows[0] == ['frame', 'time', 'x_mean', 'count']
+    assert rows[1:3] == [['0', '1000', '45.0', '10'], ['10', '1010', '145.0', '10']]
+    assert len(rows) == 7
+
+
+def test_gencsv_interval_requires_aggregate(tmp_path, saved_recording):
+    tss_path = saved_recording(tmp_path / 'recording.tss')
+
+    with pytest.raises(SystemExit):
+        gencsv([str(tss_path), str(tmp_path / 'out.csv'), '--interval', '1'])
+
+    with pytest.raises(SystemExit):
+        gencsv([str(tss_path), str(tmp_path / 'out.csv'), '--aggregate', 'mode'])
+
+    assert not (tmp_path / 'out.csv').exists()
@@ -1,5 +1,65 @@
-from .filemanager import TSSFileManager
-from .sensor import SensorObserver
+import importlib
 
-from .recorder import Recorder
-from .player import Player
+from typing import Any, List, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .decoder import Field, FrameDecoder
+    from .record import FrameIndexWriter, RecordWriter
+    from .metrics import LatencyMeter, MetricsLogger, RateMeter
+    from .sensordata import FrameIndex, SensorData
+    from .video import VideoReader
+    from .filemanager import TSSFileManager
+    from .catalog import Catalog
+    from .sensor import BaseSensorObserver, Sample, SensorObserver
+    from .async_sensor import AsyncSensorObserver, SharedEventLoop
+
+    from .pipeline import RecordingPipeline
+    from .engine import RecordingEngine
+    from .logview import LogView
+    from .recorder import Recorder
+    from .player import Player
+
+# 公開するクラスと、それを定義しているモジュールの対応
+# cv2・tkinter・PILを必要とするモジュールは、そのクラスが初めて参照された時点で読み込まれる
+_LAZY_ATTRIBUTES = {
+    'Field': 'decoder',
+    'FrameDecoder': 'decoder',
+    'FrameIndexWriter': 'record',
+    'RecordWriter': 'record',
+    'LatencyMeter': 'metrics',
+    'MetricsLogger': 'metrics',
+    'RateMeter': 'metrics',
+    'FrameIndex': 'sensordata',
+    'SensorData': 'sensordata',
+    'VideoReader': 'video',
+    'TSSFileManager': 'filemanager',
+    'Catalog': 'catalog',
+    'BaseSensorObserver': 'sensor',
+    'Sample': 'sensor',
+    'SensorObserver': 'sensor',
+    'AsyncSensorObserver': 'async_sensor',
+    'SharedEventLoop': 'async_sensor',
+    'RecordingPipeline': 'pipeline',
+    'RecordingEngine': 'engine',
+    'LogView': 'logview',
+    'Recorder': 'recorder',
+    'Player': 'player'
+}
+
+__all__ = list(_LAZY_ATTRIBUTES.keys())
+
+
+def __getattr__(name: str) -> Any:
+    module_name = _LAZY_ATTRIBUTES.get(name)
+
+    if module_name is None:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+    value = getattr(importlib.import_module(f'.{module_name}', __name__), name)
+    globals()[name] = value
+
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted(list(globals().keys()) + __all__)
@@ -1,8 +1,7 @@
 import argparse
 
 from pathlib import Path
-from tss import Player, TSSFileManager
-from typing import List
+from typing import Any, Dict, List
 
 
 def player(args: List[str]) -> None:
@@ -29,9 +28,139 @@ def player(args: List[str]) -> None:
         print(u'無効な引数:', ','.join(args[1:]))
         return
 
+    from tss.player import Player
+
     Player(file_path)
 
 
+def add_aggregate_arguments(parser: argparse.ArgumentParser) -> None:
+    """
+    計測データを集計して出力するための引数を追加する
+
+    Parameters
+    ----------
+    parser : argparse.ArgumentParser
+
+        引数を追加するパーサ
+    """
+    parser.add_argument('--aggregate', default=None,
+                        help=u'フレーム毎に集計して出力する。集計方法(mean, min, max, sum, first, last, count)をカンマ区切りで指定する')
+    parser.add_argument('--interval', type=float, default=None,
+                        help=u'--aggregateで集計する区間の長さ(秒)。省略した場合はフレーム毎に集計する')
+
+
+def aggregate_options(parser: argparse.ArgumentParser, parsed_args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    集計のための引数を、TSSFileManagerの出力メソッドに与える引数へ変換する
+
+    Parameters
+    ----------
+    parser : argparse.ArgumentParser
+
+        引数が不正な場合にエラーを表示するパーサ
+
+    parsed_args : argparse.Namespace
+
+        aggregate・intervalを持つ解析済みの引数
+
+    Returns
+    ----------
+    options : Dict[str, Any]
+
+        aggregateとintervalをキーに持つ辞書
+    """
+    from tss.sensordata import SensorData
+
+    if parsed_args.aggregate is None:
+        if parsed_args.interval is not None:
+            parser.error(u'--intervalは--aggregateと共に指定してください。')
+
+        return {'aggregate': None, 'interval': None}
+
+    functions = [function.strip() for function in parsed_args.aggregate.split(',') if function.strip() != '']
+
+    for function in functions:
+        if function not in SensorData.RESAMPLE_FUNCTIONS:
+            parser.error(f'--aggregate: {function}')
+
+    if parsed_args.interval is not None and parsed_args.interval <= 0:
+        parser.error(u'--intervalには正の数を指定してください。')
+
+    return {'aggregate': functions, 'interval': parsed_args.interval}
+
+
+def add_batch_arguments(parser: argparse.ArgumentParser) -> None:
+    """
+    複数のファイルをまとめて変換するための引数を追加する
+
+    Parameters
+    ----------
+    parser : argparse.ArgumentParser
+
+        引数を追加するパーサ
+    """
+    parser.add_argument('--jobs', type=int, default=None,
+                        help=u'複数のファイルを変換する際に同時に変換を行うプロセス数。省略した場合はCPUの数')
+    parser.add_argument('--force', action='store_true',
+                        help=u'複数のファイルを変換する際に、変換元より新しい出力も変換し直す')
+
+
+def batch(kind: str, parsed_args: argparse.Namespace, options: Dict[str, Any]) -> bool:
+    """
+    変換元として複数のファイルが指定されている場合に、まとめて変換する
+
+    Parameters
+    ----------
+    kind : str
+
+        変換の種類('csv'、'npz'、'md'のいずれか)
+
+    parsed_args : argparse.Namespace
+
+        tssfile・output・jobs・forceを持つ解析済みの引数
+
+    options : Dict[str, Any]
+
+        TSSFileManagerの出力メソッドに与える引数
+
+    Returns
+    ----------
+    handled : bool
+
+        まとめて変換した場合はTrue。変換元が1つのファイルの場合はFalse
+    """
+    from tss.batch import collect_inputs, InvalidInputError, is_batch, run_batch
+
+    if not is_batch(parsed_args.tssfile):
+        return False
+
+    output_dir_path = Path(parsed_args.output)
+
+    if output_dir_path.exists() and not output_dir_path.is_dir():
+        print(u'複数のファイルを変換する場合は，引数outputにフォルダを指定してください。')
+        return True
+
+    def report(input_path: Path, result: str, error: Any) -> None:
+        if result == 'failed':
+            print(u'失敗:', str(input_path), f'({type(error).__name__}: {error})')
+        elif result == 'skipped':
+            print(u'スキップ:', str(input_path))
+        else:
+            print(u'変換:', str(input_path))
+
+    try:
+        inputs = collect_inputs(parsed_args.tssfile)
+        counts = run_batch(kind, inputs, output_dir_path, options,
+                           jobs=parsed_args.jobs, force=parsed_args.force, report=report)
+    except InvalidInputError as e:
+        print(str(e))
+        return True
+
+    print(u'変換: {converted}件, スキップ: {skipped}件, 失敗: {failed}件'.format(**counts))
+
+    return True
+
+
 def gencsv(args: List[str]) -> None:
     """
     機能としてgencsvが選択されている時に呼び出される関数
@@ -45,12 +174,68 @@ def gencsv(args: List[str]) -> None:
     parser = argparse.ArgumentParser(prog='tss gencsv', description=u'tssファイルからcsvファイルを生成する',
                                      epilog=u'その他詳しい情報はGitHubのリポジトリ(https://github.com/Hara-Yuma/TimeSeriesSensing)を確認してください。')
 
-    parser.add_argument('tssfile', help=u'tss形式のファイルへのパス')
-    parser.add_argument('output', help=u'生成するcsvファイルへのパス')
+    parser.add_argument('tssfile', nargs='+',
+                        help=u'tss形式のファイルへのパス。複数のファイル・フォルダ・globパターンを指定するとまとめて変換する')
+    parser.add_argument('output', help=u'生成するcsvファイルへのパス。まとめて変換する場合は出力先のフォルダへのパス')
+    parser.add_argument('--stream', default=None, help=u'出力するセンサのストリーム名。省略した場合は先頭のストリーム')
+    add_aggregate_arguments(parser)
+    add_batch_arguments(parser)
 
     parsed_args = parser.parse_args(args)
 
-    target_file_path = Path(parsed_args.tssfile)
+    options = aggregate_options(parser, parsed_args)
+    options['stream'] = parsed_args.stream
+
+    if batch('csv', parsed_args, options):
+        return
+
+    target_file_path = Path(parsed_args.tssfile[0])
+    output_file_path = Path(parsed_args.output)
+
+    if not target_file_path.exists():
+        print(str(target_file_path), u'は存在しません。')
+        return
+    elif target_file_path.suffix != '.tss':
+        print(u'引数tssfileには，.tss形式のファイルを指定してください。')
+        return
+
+    from tss.filemanager import TSSFileManager
+
+    file_manager = TSSFileManager(target_file_path)
+    file_manager.exportAsCSV(output_file_path, exists_ok=True, **options)
+
+
+def gennpz(args: List[str]) -> None:
+    """
+    機能としてgennpzが選択されている時に呼び出される関数
+
+    Parameters
+    ----------
+    args : List[str]
+
+        function(gennpz)以降に与えられた引数
+    """
+    parser = argparse.ArgumentParser(prog='tss gennpz', description=u'tssファイルからnpzファイルを生成する',
+                                     epilog=u'その他詳しい情報はGitHubのリポジトリ(https://github.com/Hara-Yuma/TimeSeriesSensing)を確認してください。')
+
+    parser.add_argument('tssfile', nargs='+',
+                        help=u'tss形式のファイルへのパス。複数のファイル・フォルダ・globパターンを指定するとまとめて変換する')
+    parser.add_argument('output', help=u'生成するnpzファイルへのパス。まとめて変換する場合は出力先のフォルダへのパス')
+    parser.add_argument('--compressed', action='store_true', help=u'圧縮して保存する')
+    parser.add_argument('--stream', default=None, help=u'出力するセンサのストリーム名。省略した場合は先頭のストリーム')
+    add_aggregate_arguments(parser)
+    add_batch_arguments(parser)
+
+    parsed_args = parser.parse_args(args)
+
+    options = aggregate_options(parser, parsed_args)
+    options['stream'] = parsed_args.stream
+    options['compressed'] = parsed_args.compressed
+
+    if batch('npz', parsed_args, options):
+        return
+
+    target_file_path = Path(parsed_args.tssfile[0])
     output_file_path = Path(parsed_args.output)
 
     if not target_file_path.exists():
@@ -60,8 +245,10 @@ def gencsv(args: List[str]) -> None:
         print(u'引数tssfileには，.tss形式のファイルを指定してください。')
         return
 
+    from tss.filemanager import TSSFileManager
+
     file_manager = TSSFileManager(target_file_path)
-    file_manager.exportAsCSV(output_file_path, exists_ok=True)
+    file_manager.exportAsNPZ(output_file_path, exists_ok=True, **options)
 
 
 def genmd(args: List[str]) -> None:
@@ -77,13 +264,62 @@ def genmd(args: List[str]) -> None:
     parser = argparse.ArgumentParser(prog='tss genmd', description=u'tssファイルからmdファイルを生成する',
                                      epilog=u'その他詳しい情報はGitHubのリポジトリ(https://github.com/Hara-Yuma/TimeSeriesSensing)を確認してください。')
 
+    parser.add_argument('tssfile', nargs='+',
+                        help=u'tss形式のファイルへのパス。複数のファイル・フォルダ・globパターンを指定するとまとめて変換する')
+    parser.add_argument('output', help=u'mdファイルを生成するディレクトリへのパス。まとめて変換する場合はファイル毎のディレクトリが作られる')
+    parser.add_argument('--format', choices=['png', 'jpg'], default='png', help=u'フレーム画像の形式')
+    parser.add_argument('--workers', type=int, default=None, help=u'画像のエンコードを行うスレッド数')
+    parser.add_argument('--processes', type=int, default=1, help=u'動画のデコードを分担するプロセス数')
+    add_batch_arguments(parser)
+
+    parsed_args = parser.parse_args(args)
+
+    if batch('md', parsed_args, {'image_format': parsed_args.format,
+                                 'workers': parsed_args.workers,
+                                 'processes': parsed_args.processes}):
+        return
+
+    target_file_path = Path(parsed_args.tssfile[0])
+    output_dir_path = Path(parsed_args.output)
+
+    if not target_file_path.exists():
+        print(str(target_file_path), u'は存在しません。')
+        return
+    elif target_file_path.suffix != '.tss':
+        print(u'引数tssfileには，.tss形式のファイルを指定してください。')
+        return
+
+    from tss.filemanager import TSSFileManager
+
+    file_manager = TSSFileManager(target_file_path)
+    file_manager.exportAsMD(output_dir_path, exists_ok=True,
+                            image_format=parsed_args.format,
+                            workers=parsed_args.workers,
+                            processes=parsed_args.processes)
+
+
+def genclip(args: List[str]) -> None:
+    """
+    機能としてgenclipが選択されている時に呼び出される関数
+
+    Parameters
+    ----------
+    args : List[str]
+
+        function(genclip)以降に与えられた引数
+    """
+    parser = argparse.ArgumentParser(prog='tss genclip', description=u'tssファイルの一部を新しいtssファイルとして切り出す',
+                                     epilog=u'その他詳しい情報はGitHubのリポジトリ(https://github.com/Hara-Yuma/TimeSeriesSensing)を確認してください。')
+
     parser.add_argument('tssfile', help=u'tss形式のファイルへのパス')
-    parser.add_argument('output', help=u'mdファイルを生成するディレクトリへのパス')
+    parser.add_argument('output', help=u'生成するtssファイルへのパス')
+    parser.add_argument('--start', type=int, required=True, help=u'切り出す範囲の開始フレーム番号')
+    parser.add_argument('--end', type=int, default=None, help=u'切り出す範囲の終了フレーム番号(このフレームを含む)。省略した場合は末尾まで')
 
     parsed_args = parser.parse_args(args)
 
     target_file_path = Path(parsed_args.tssfile)
-    output_dir_path = Path(parsed_args.output)
+    output_file_path = Path(parsed_args.output)
 
     if not target_file_path.exists():
         print(str(target_file_path), u'は存在しません。')
@@ -91,9 +327,134 @@ def genmd(args: List[str]) -> None:
     elif target_file_path.suffix != '.tss':
         print(u'引数tssfileには，.tss形式のファイルを指定してください。')
         return
+    elif target_file_path.resolve() == output_file_path.resolve():
+        print(u'引数outputには，tssfileとは異なるファイルを指定してください。')
+        return
+
+    from tss.filemanager import TSSFileManager
 
     file_manager = TSSFileManager(target_file_path)
-    file_manager.exportAsMD(output_dir_path, exists_ok=True)
+
+    try:
+        result = file_manager.exportClip(output_file_path, parsed_args.start, parsed_args.end, exists_ok=True)
+    except ValueError as e:
+        print(str(e))
+        return
+
+    print(u'{frame_count}フレーム(書き写し: {copied_frames}, 再エンコード: {encoded_frames})を出力しました。'.format(**result))
+
+
+def index(args: List[str]) -> None:
+    """
+    機能としてindexが選択されている時に呼び出される関数
+
+    Parameters
+    ----------
+    args : List[str]
+
+        function(index)以降に与えられた引数
+    """
+    parser = argparse.ArgumentParser(prog='tss index', description=u'tssファイルに動画のキーフレームの索引を追加する',
+                                     epilog=u'その他詳しい情報はGitHubのリポジトリ(https://github.com/Hara-Yuma/TimeSeriesSensing)を確認してください。')
+
+    parser.add_argument('tssfile', nargs='+', help=u'tss形式のファイルへのパス。フォルダやglobパターンも指定できる')
+    parser.add_argument('--force', action='store_true', help=u'索引が最新のファイルも索引を作成し直す')
+
+    parsed_args = parser.parse_args(args)
+
+    from tss.batch import collect_inputs, InvalidInputError
+    from tss.filemanager import TSSFileManager
+
+    try:
+        inputs = collect_inputs(parsed_args.tssfile)
+    except InvalidInputError as e:
+        print(str(e))
+        return
+
+    counts = {'indexed': 0, 'skipped': 0, 'failed': 0}
+
+    for input_path, _ in inputs:
+        try:
+            indexed_count = TSSFileManager(input_path).build_keyframe_index(force=parsed_args.force)
+        except Exception as e:
+            print(u'失敗:', str(input_path), f'({type(e).__name__}: {e})')
+            counts['failed'] += 1
+            continue
+
+        if indexed_count == 0:
+            print(u'スキップ:', str(input_path))
+            counts['skipped'] += 1
+        else:
+            print(u'作成:', str(input_path))
+            counts['indexed'] += 1
+
+    print(u'作成: {indexed}件, スキップ: {skipped}件, 失敗: {failed}件'.format(**counts))
+
+
+def catalog(args: List[str]) -> None:
+    """
+    機能としてcatalogが選択されている時に呼び出される関数
+
+    Parameters
+    ----------
+    args : List[str]
+
+        function(catalog)以降に与えられた引数
+    """
+    parser = argparse.ArgumentParser(prog='tss catalog', description=u'tssファイルの索引を作成し、検索する',
+                                     epilog=u'その他詳しい情報はGitHubのリポジトリ(https://github.com/Hara-Yuma/TimeSeriesSensing)を確認してください。')
+
+    parser.add_argument('--db', default='tss-catalog.sqlite', help=u'索引のデータベースファイルへのパス')
+
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    scan_parser = subparsers.add_parser('scan', help=u'フォルダ内のtssファイルを索引に登録する')
+    scan_parser.add_argument('folder', nargs='+', help=u'スキャンするフォルダへのパス')
+    scan_parser.add_argument('--no-recursive', action='store_true', help=u'サブフォルダをスキャンしない')
+
+    query_parser = subparsers.add_parser('query', help=u'条件に合うtssファイルを検索する')
+    query_parser.add_argument('--min-duration', type=float, default=None, help=u'録画時間(秒)の下限')
+    query_parser.add_argument('--max-duration', type=float, default=None, help=u'録画時間(秒)の上限')
+    query_parser.add_argument('--above', nargs=2, action='append', default=[], metavar=('LABEL', 'VALUE'),
+                              help=u'最大値がVALUEを超えるラベル。複数指定できる')
+    query_parser.add_argument('--below', nargs=2, action='append', default=[], metavar=('LABEL', 'VALUE'),
+                              help=u'最小値がVALUEを下回るラベル。複数指定できる')
+    query_parser.add_argument('--stream', default=None, help=u'ストリーム名')
+    query_parser.add_argument('--label', default=None, help=u'記録されているラベル')
+
+    parsed_args = parser.parse_args(args)
+
+    from tss.catalog import Catalog
+
+    with Catalog(Path(parsed_args.db)) as tss_catalog:
+        if parsed_args.command == 'scan':
+            for folder in parsed_args.folder:
+                folder_path = Path(folder)
+
+                if not folder_path.is_dir():
+                    print(str(folder_path), u'は存在しないか，フォルダではありません。')
+                    continue
+
+                counts = tss_catalog.scan(folder_path, recursive=not parsed_args.no_recursive)
+
+                print(str(folder_path) + u': 追加: {added}件, 更新: {updated}件, 変更なし: {unchanged}件, '
+                      u'削除: {removed}件, 失敗: {failed}件'.format(**counts))
+        else:
+            try:
+                above = [(label, float(value)) for label, value in parsed_args.above]
+                below = [(label, float(value)) for label, value in parsed_args.below]
+            except ValueError:
+                print(u'--above・--belowのVALUEには数値を指定してください。')
+                return
+
+            files = tss_catalog.query(min_duration=parsed_args.min_duration,
+                                      max_duration=parsed_args.max_duration,
+                                      above=above, below=below,
+                                      stream=parsed_args.stream, label=parsed_args.label)
+
+            for entry in files:
+                duration = '-' if entry['duration'] is None else f'{entry["duration"]:.1f}s'
+                print(f'{entry["path"]}\t{duration}\t{entry["frame_count"]} frames\t{entry["sample_count"]} samples')
 
 
 def main() -> None:
@@ -101,8 +462,8 @@ def main() -> None:
                                      epilog=u'その他詳しい情報はGitHubのリポジトリ(https://github.com/Hara-Yuma/TimeSeriesSensing)を確認してください。')
 
     parser.add_argument('function', choices=[
-                        'player', 'gencsv', 'genmd'], help=u'機能を指定する。')
-    parser.add_argument('args', nargs='*', help=u'機能毎の引数')
+                        'player', 'gencsv', 'gennpz', 'genmd', 'genclip', 'index', 'catalog'], help=u'機能を指定する。')
+    parser.add_argument('args', nargs=argparse.REMAINDER, help=u'機能毎の引数')
 
     parsed_args = parser.parse_args()
 
@@ -112,8 +473,17 @@ def main() -> None:
         player(parsed_args.args)
     elif func == 'gencsv':
         gencsv(parsed_args.args)
+    elif func == 'gennpz':
+        gennpz(parsed_args.args)
     elif func == 'genmd':
         genmd(parsed_args.args)
+    elif func == 'genclip':
+        genclip(parsed_args.args)
+    elif func == 'index':
+        index(parsed_args.args)
+    elif func == 'catalog':
+        catalog(parsed_args.args)
 
 
-main()
+if __name__ == '__main__':
+    main()
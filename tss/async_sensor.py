@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import threading
+import time
+
+from abc import abstractmethod
+from tss.sensor import BaseSensorObserver, Sample
+from typing import Optional, Tuple
+
+
+class SharedEventLoop:
+    """
+    複数のAsyncSensorObserverで共有されるイベントループ
+
+    最初に使用された時点で、専用のスレッド上でイベントループが開始される。
+    """
+
+    __loop: Optional[asyncio.AbstractEventLoop] = None
+    __lock = threading.Lock()
+
+    @classmethod
+    def get(cls) -> asyncio.AbstractEventLoop:
+        """
+        Returns
+        ----------
+        loop : asyncio.AbstractEventLoop
+
+            共有されるイベントループ
+        """
+        with cls.__lock:
+            if cls.__loop is None:
+                loop = asyncio.new_event_loop()
+
+                thread = threading.Thread(target=loop.run_forever, name='tss-event-loop', daemon=True)
+                thread.start()
+
+                cls.__loop = loop
+
+            return cls.__loop
+
+
+class AsyncSensorObserver(BaseSensorObserver):
+    """
+    イベントループ上でセンサとの通信を監視するためのクラス
+
+    read_dataをコルーチンとして実装することで、多数のセンサを1つのイベントループで監視できる。
+    監視の終了時には読み出し中のread_dataがキャンセルされるため、
+    入力が来ないセンサであっても終了処理が止まることはない。
+    """
+
+    def __init__(self,
+                 labels: Tuple[str, ...],
+                 queue_size: int = 4096,
+                 overflow_policy: str = 'drop_oldest',
+                 name: Optional[str] = None,
+                 loop: Optional[asyncio.AbstractEventLoop] = None) -> None:
+        """
+        Parameters
+        ----------
+        labels : Tuple[str, ...]
+
+            取得されるデータのラベル
+
+        queue_size : int
+
+            通知待ちの入力を保持するキューの大きさ
+
+        overflow_policy : str
+
+            キューが溢れた場合の方針。OVERFLOW_POLICIESのいずれか
+
+        name : Optional[str]
+
+            記録される際のストリーム名。Noneの場合はクラス名
+
+        loop : Optional[asyncio.AbstractEventLoop]
+
+            監視に用いるイベントループ。Noneの場合はSharedEventLoopが用いられる。
+            別のスレッドで実行されている必要がある
+        """
+        super().__init__(labels, queue_size, overflow_policy, name)
+
+        self.__loop = loop
+
+        self.__future: Optional[concurrent.futures.Future] = None
+
+        # イベントループ上で監視を行っているタスク
+        self.__task: Optional[asyncio.Task] = None
+
+        # read_dataで発生し、監視を終了させた例外
+        self.__error: Optional[Exception] = None
+
+    @property
+    def error(self) -> Optional[Exception]:
+        """
+        Returns
+        ----------
+        error : Optional[Exception]
+
+            read_dataで発生し、監視を終了させた例外。stop_observeの後に参照できる。発生していない場合はNone
+        """
+        return self.__error
+
+    async def __observe(self) -> None:
+        """
+        センサとの通信を監視し、入力があった際にキューへ追加する。
+        """
+        self.__task = asyncio.current_task()
+
+        while self.is_observing:
+            data = await self.read_data()
+            timestamp = time.monotonic_ns()
+
+            sample = Sample(timestamp, data)
+
+            # イベントループを止めないよう、キューの空きは非同期に待つ
+            while not self._offer(sample):
+                if not self.is_observing:
+                    self._abandon(sample)
+                    break
+
+                try:
+                    await asyncio.sleep(0.001)
+                except asyncio.CancelledError:
+                    self._abandon(sample)
+                    raise
+
+    def start_observe(self) -> None:
+        """
+        センサとの通信の監視を開始する
+        """
+        if self.__loop is None:
+            self.__loop = SharedEventLoop.get()
+
+        self.__error = None
+        self.__task = None
+
+        self._start_dispatching()
+        self.__future = asyncio.run_coroutine_threadsafe(self.__observe(), self.__loop)
+
+    def stop_observe(self, timeout: Optional[float] = 5.0) -> None:
+        """
+        センサとの通信の監視を終了する
+
+        読み出し中のread_dataはキャンセルされ、通知待ちの入力は全て通知されてから終了する。
+        read_dataが例外によって終了していた場合も通知用のスレッドは必ず終了し、例外はerrorで参照できる。
+        イベントループを実行しているスレッドから呼び出してはならない。
+
+        Parameters
+        ----------
+        timeout : Optional[float]
+
+            読み出しの終了を待つ最大の時間(秒)
+        """
+        self._end_observing()
+
+        try:
+            if self.__future is not None:
+                self.__future.cancel()
+
+                try:
+                    self.__future.result(timeout=timeout)
+                except (concurrent.futures.CancelledError, concurrent.futures.TimeoutError):
+                    pass
+                except Exception as e:
+                    self.__error = e
+                finally:
+                    self.__future = None
+
+                # Futureは取り消した時点で完了するため、保持していた入力の処理を含めてタスクが終わるまで待つ
+                try:
+                    asyncio.run_coroutine_threadsafe(self.__wait_task(), self.__loop).result(timeout=timeout)
+                except concurrent.futures.TimeoutError:
+                    pass
+        finally:
+            # 通知用のスレッドが残るとインタプリタが終了できないため、読み出しの結果に関わらず終了させる
+            self._join_dispatching()
+
+    async def __wait_task(self) -> None:
+        """
+        監視を行っているタスクが終了するまで待つ
+
+        取り消しの要求より後にイベントループで実行されるため、この時点でタスクが始まっていなければ以後も始まらない。
+        """
+        if self.__task is not None:
+            await asyncio.wait({self.__task})
+
+    @abstractmethod
+    async def read_data(self) -> Tuple:
+        """
+        データを読み取るためのコルーチン。
+
+        Returns
+        ----------
+        data : Tuple
+
+            入力されたデータ。
+
+            labelsに対応している必要がある。
+        """
+        pass
@@ -0,0 +1,328 @@
+from __future__ import annotations
+
+import glob
+import os
+import shutil
+import tempfile
+
+from concurrent.futures import as_completed, ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+
+# 変換の種類毎の出力先の名前の拡張子。空文字列の場合は入力ファイル名のフォルダへ出力する
+OUTPUT_SUFFIXES: Dict[str, str] = {
+    'csv': '.csv',
+    'npz': '.npz',
+    'md': ''
+}
+
+
+class InvalidInputError(ValueError):
+    """
+    変換元として不正なパスが指定されたことを知らせる例外クラス
+    """
+    pass
+
+
+def is_batch(patterns: Sequence[str]) -> bool:
+    """
+    変換元の指定が複数のファイルを対象とするか判定する
+
+    Parameters
+    ----------
+    patterns : Sequence[str]
+
+        変換元として指定されたファイル・フォルダへのパスもしくはglobパターン
+
+    Returns
+    ----------
+    is_batch : bool
+
+        複数の指定、フォルダ、globパターンのいずれかを含む場合はTrue
+    """
+    return len(patterns) != 1 or glob.has_magic(patterns[0]) or Path(patterns[0]).is_dir()
+
+
+def collect_inputs(patterns: Sequence[str]) -> List[Tuple[Path, Path]]:
+    """
+    変換元として指定されたパスから、.tss形式のファイルを集める
+
+    フォルダが指定された場合はその下の全ての.tssファイルを、globパターンが指定された場合は一致する.tssファイルを対象とする。
+
+    Parameters
+    ----------
+    patterns : Sequence[str]
+
+        変換元として指定されたファイル・フォルダへのパスもしくはglobパターン
+
+    Returns
+    ----------
+    inputs : List[Tuple[Path, Path]]
+
+        .tssファイルへのパスと、出力先での相対パスの組。同じファイルは1度だけ含まれる
+
+    Raises
+    ----------
+    InvalidInputError
+
+        存在しないパスや、.tssファイルではないファイルが指定されたことを知らせる例外
+    """
+    inputs: Dict[Path, Path] = {}
+
+    for pattern in patterns:
+        if glob.has_magic(pattern):
+            matches = [Path(path) for path in sorted(glob.glob(pattern, recursive=True))]
+            found = [(path, Path(path.name)) for path in matches if path.is_file() and path.suffix == '.tss']
+        elif Path(pattern).is_dir():
+            # フォルダの下の構成を出力先でも保ち、異なるフォルダの同名のファイルを区別する
+            dir_path = Path(pattern)
+            found = [(path, path.relative_to(dir_path)) for path in sorted(dir_path.rglob('*.tss')) if path.is_file()]
+        elif Path(pattern).is_file() and Path(pattern).suffix == '.tss':
+            found = [(Path(pattern), Path(Path(pattern).name))]
+        else:
+            raise InvalidInputError(f'{pattern} は.tss形式のファイルもしくはフォルダではありません。')
+
+        for path, relative_path in found:
+            inputs.setdefault(path.resolve(), relative_path)
+
+    return [(path, relative_path) for path, relative_path in inputs.items()]
+
+
+def output_path_of(relative_path: Path, output_dir: Path, kind: str) -> Path:
+    """
+    変換元のファイルに対応する出力先のパスを求める
+
+    Parameters
+    ----------
+    relative_path : Path
+
+        変換元のファイルの、出力先での相対パス
+
+    output_dir : Path
+
+        出力先のフォルダへのパス
+
+    kind : str
+
+        変換の種類。OUTPUT_SUFFIXESのキーのいずれか
+
+    Returns
+    ----------
+    output_path : Path
+
+        出力先のファイル(genmdの場合はフォルダ)へのパス
+    """
+    return output_dir / relative_path.with_suffix(OUTPUT_SUFFIXES[kind])
+
+
+def is_up_to_date(input_path: Path, output_path: Path, kind: str) -> bool:
+    """
+    出力が変換元のファイルより新しいか判定する
+
+    Parameters
+    ----------
+    input_path : Path
+
+        .tss形式のファイルへのパス
+
+    output_path : Path
+
+        出力先のファイル(genmdの場合はフォルダ)へのパス
+
+    kind : str
+
+        変換の種類
+
+    Returns
+    ----------
+    up_to_date : bool
+
+        出力が存在し、変換元のファイル以降に更新されている場合はTrue
+    """
+    # genmdの出力はフォルダ内のmdファイルで判定する(mdファイルは画像の後に書き出される)
+    target = output_path / (input_path.stem + '.md') if kind == 'md' else output_path
+
+    try:
+        return target.stat().st_mtime >= input_path.stat().st_mtime
+    except FileNotFoundError:
+        return False
+
+
+def convert(kind: str, input_path: Path, output_path: Path, options: Dict[str, Any]) -> None:
+    """
+    1つの.tss形式のファイルを変換する
+
+    一時ファイルは出力先と同じ場所に作られるジョブ毎のフォルダに書き出され、
+    変換が完了した時点で出力先へ移動される。途中で失敗した場合に不完全な出力は残らない。
+
+    Parameters
+    ----------
+    kind : str
+
+        変換の種類。OUTPUT_SUFFIXESのキーのいずれか
+
+    input_path : Path
+
+        .tss形式のファイルへのパス
+
+    output_path : Path
+
+        出力先のファイル(genmdの場合はフォルダ)へのパス
+
+    options : Dict[str, Any]
+
+        変換の種類毎のTSSFileManagerの出力メソッドに与える引数
+    """
+    from tss.filemanager import TSSFileManager
+
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+
+    with tempfile.TemporaryDirectory(prefix='~tss-', dir=output_path.parent) as temp_dir:
+        # 動画を展開する場合などの一時ファイルも、このジョブのフォルダに作られるようにする
+        default_temp_dir = tempfile.tempdir
+        tempfile.tempdir = temp_dir
+
+        try:
+            temp_output_path = Path(temp_dir) / output_path.name
+            file_manager = TSSFileManager(input_path)
+
+            if kind == 'csv':
+                file_manager.exportAsCSV(temp_output_path, exists_ok=True, **options)
+            elif kind == 'npz':
+                file_manager.exportAsNPZ(temp_output_path, exists_ok=True, **options)
+            else:
+                temp_output_path.mkdir()
+                file_manager.exportAsMD(temp_output_path, exists_ok=True, **options)
+
+                if output_path.is_dir():
+                    shutil.rmtree(output_path)
+
+            os.replace(temp_output_path, output_path)
+        finally:
+            tempfile.tempdir = default_temp_dir
+
+
+def run_batch(kind: str,
+              inputs: Sequence[Tuple[Path, Path]],
+              output_dir: Path,
+              options: Dict[str, Any],
+              jobs: Optional[int] = None,
+              force: bool = False,
+              report: Optional[Callable[[Path, str, Optional[BaseException]], None]] = None) -> Dict[str, int]:
+    """
+    複数の.tss形式のファイルを、プロセスプールで並列に変換する
+
+    Parameters
+    ----------
+    kind : str
+
+        変換の種類。OUTPUT_SUFFIXESのキーのいずれか
+
+    inputs : Sequence[Tuple[Path, Path]]
+
+        collect_inputsによって集められた、.tssファイルへのパスと出力先での相対パスの組
+
+    output_dir : Path
+
+        出力先のフォルダへのパス
+
+    options : Dict[str, Any]
+
+        TSSFileManagerの出力メソッドに与える引数
+
+    jobs : Optional[int]
+
+        同時に変換を行うプロセス数。Noneの場合はCPUの数
+
+    force : bool
+
+        出力が変換元より新しい場合も変換し直すかどうか
+
+    report : Optional[Callable[[Path, str, Optional[BaseException]], None]]
+
+        ファイル毎に、変換元のパス・結果('converted'、'skipped'、'failed'のいずれか)・失敗時の例外を受け取る関数
+
+    Returns
+    ----------
+    counts : Dict[str, int]
+
+        結果毎のファイル数
+    """
+    counts = {'converted': 0, 'skipped': 0, 'failed': 0}
+
+    def notify(input_path: Path, result: str, error: Optional[BaseException] = None) -> None:
+        counts[result] += 1
+
+        if report is not None:
+            report(input_path, result, error)
+
+    pending: List[Tuple[Path, Path]] = []
+
+    for input_path, output_path in _plan(kind, inputs, output_dir):
+        if not force and is_up_to_date(input_path, output_path, kind):
+            notify(input_path, 'skipped')
+        else:
+            pending.append((input_path, output_path))
+
+    if len(pending) == 0:
+        return counts
+
+    max_workers = min(jobs or os.cpu_count() or 1, len(pending))
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(convert, kind, input_path, output_path, options): input_path
+                   for input_path, output_path in pending}
+
+        for future in as_completed(futures):
+            error = future.exception()
+
+            if error is None:
+                notify(futures[future], 'converted')
+            else:
+                notify(futures[future], 'failed', error)
+
+    return counts
+
+
+def _plan(kind: str, inputs: Sequence[Tuple[Path, Path]], output_dir: Path) -> List[Tuple[Path, Path]]:
+    """
+    変換元のファイルと出力先のパスの組を求める
+
+    Parameters
+    ----------
+    kind : str
+
+        変換の種類
+
+    inputs : Sequence[Tuple[Path, Path]]
+
+        .tssファイルへのパスと出力先での相対パスの組
+
+    output_dir : Path
+
+        出力先のフォルダへのパス
+
+    Returns
+    ----------
+    plan : List[Tuple[Path, Path]]
+
+        .tssファイルへのパスと出力先のパスの組
+
+    Raises
+    ----------
+    InvalidInputError
+
+        異なる変換元のファイルが同じ出力先に対応することを知らせる例外
+    """
+    outputs: Dict[Path, Path] = {}
+
+    for input_path, relative_path in inputs:
+        output_path = output_path_of(relative_path, output_dir, kind)
+
+        if output_path in outputs:
+            raise InvalidInputError(f'{outputs[output_path]} と {input_path} の出力先が重複しています。')
+
+        outputs[output_path] = input_path
+
+    return [(input_path, output_path) for output_path, input_path in outputs.items()]
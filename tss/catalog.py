@@ -0,0 +1,377 @@
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+
+from pathlib import Path
+from tss.filemanager import TSSFileManager
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+
+class Catalog:
+    """
+    フォルダ内の.tss形式のファイルの情報をSQLiteの索引として保持するクラス
+
+    scanで各ファイルのストリーム・ラベル・記録数・フレーム数・録画時間と、ラベル毎の最小値・最大値・平均値を記録する。
+    再スキャン時は更新日時と大きさが変わったファイルのみを読み直すため、queryはアーカイブを開かずに結果を返す。
+    """
+
+    # 索引の形式のバージョン。異なる場合は索引を作り直す
+    SCHEMA_VERSION = 1
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS files (
+            path TEXT PRIMARY KEY,
+            mtime_ns INTEGER NOT NULL,
+            size INTEGER NOT NULL,
+            version INTEGER,
+            frame_count INTEGER,
+            duration REAL,
+            fps REAL,
+            sample_count INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS streams (
+            path TEXT NOT NULL REFERENCES files(path) ON DELETE CASCADE,
+            stream TEXT NOT NULL,
+            labels TEXT NOT NULL,
+            sample_count INTEGER NOT NULL,
+            PRIMARY KEY (path, stream)
+        );
+        CREATE TABLE IF NOT EXISTS labels (
+            path TEXT NOT NULL REFERENCES files(path) ON DELETE CASCADE,
+            stream TEXT NOT NULL,
+            label TEXT NOT NULL,
+            min REAL,
+            max REAL,
+            mean REAL,
+            PRIMARY KEY (path, stream, label)
+        );
+        CREATE INDEX IF NOT EXISTS labels_label ON labels (label);
+        CREATE INDEX IF NOT EXISTS files_duration ON files (duration);
+    """
+
+    def __init__(self, db_path: Path) -> None:
+        """
+        Parameters
+        ----------
+        db_path : Path
+
+            索引を保存するSQLiteのデータベースファイルへのパス。存在しない場合は作成される
+        """
+        self.__db_path = db_path
+
+        self.__connection = sqlite3.connect(str(db_path))
+        self.__connection.execute('PRAGMA foreign_keys = ON')
+
+        self.__prepare()
+
+    @property
+    def db_path(self) -> Path:
+        """
+        Returns
+        ----------
+        db_path : Path
+
+            データベースファイルへのパス
+        """
+        return self.__db_path
+
+    def __prepare(self) -> None:
+        """
+        テーブルを作成する。形式のバージョンが異なる場合は既存の索引を破棄する
+        """
+        version = self.__connection.execute('PRAGMA user_version').fetchone()[0]
+
+        with self.__connection:
+            if version != Catalog.SCHEMA_VERSION:
+                for table in ('labels', 'streams', 'files'):
+                    self.__connection.execute(f'DROP TABLE IF EXISTS {table}')
+
+            self.__connection.executescript(Catalog.SCHEMA)
+            self.__connection.execute(f'PRAGMA user_version = {Catalog.SCHEMA_VERSION}')
+
+    def scan(self, dir_path: Path, recursive: bool = True, remove_missing: bool = True) -> Dict[str, int]:
+        """
+        フォルダ内の.tss形式のファイルを索引に登録する
+
+        更新日時と大きさが前回のスキャンから変わっていないファイルは読み込まない。
+
+        Parameters
+        ----------
+        dir_path : Path
+
+            スキャンするフォルダへのパス
+
+        recursive : bool
+
+            サブフォルダ内のファイルも対象とするか
+
+        remove_missing : bool
+
+            フォルダ内に存在しなくなったファイルを索引から削除するか
+
+        Returns
+        ----------
+        counts : Dict[str, int]
+
+            結果('added'、'updated'、'unchanged'、'removed'、'failed')毎のファイル数
+        """
+        counts = {'added': 0, 'updated': 0, 'unchanged': 0, 'removed': 0, 'failed': 0}
+
+        file_paths = sorted(dir_path.rglob('*.tss') if recursive else dir_path.glob('*.tss'))
+        found = set()
+
+        for file_path in file_paths:
+            if not file_path.is_file():
+                continue
+
+            path = str(file_path.resolve())
+            found.add(path)
+
+            stat = file_path.stat()
+            known = self.__connection.execute('SELECT mtime_ns, size FROM files WHERE path = ?', (path,)).fetchone()
+
+            if known is not None and tuple(known) == (stat.st_mtime_ns, stat.st_size):
+                counts['unchanged'] += 1
+                continue
+
+            try:
+                entry = Catalog.read_entry(file_path)
+            except Exception:
+                counts['failed'] += 1
+                continue
+
+            with self.__connection:
+                self.__connection.execute('DELETE FROM files WHERE path = ?', (path,))
+                self.__insert(path, stat.st_mtime_ns, stat.st_size, entry)
+
+            counts['added' if known is None else 'updated'] += 1
+
+        if remove_missing:
+            prefix = str(dir_path.resolve()) + os.sep
+
+            with self.__connection:
+                for (path,) in self.__connection.execute('SELECT path FROM files').fetchall():
+                    if path.startswith(prefix) and path not in found and \
+                            (recursive or os.sep not in path[len(prefix):]):
+                        self.__connection.execute('DELETE FROM files WHERE path = ?', (path,))
+                        counts['removed'] += 1
+
+        return counts
+
+    @staticmethod
+    def read_entry(file_path: Path) -> Dict[str, Any]:
+        """
+        .tss形式のファイルから索引に記録する情報を読み込む
+
+        フレーム数と録画時間はフレームの撮影時刻の記録から求め、記録を持たない古いファイルの場合のみ動画を開く。
+
+        Parameters
+        ----------
+        file_path : Path
+
+            tss形式のファイルへのパス
+
+        Returns
+        ----------
+        entry : Dict[str, Any]
+
+            version・frame_count・duration・fps・streamsをキーに持つ情報。
+            streamsはストリーム名毎のlabels・sample_count・statsを持つ
+        """
+        file_manager = TSSFileManager(file_path)
+
+        manifest = file_manager.read_manifest()
+        frame_index = file_manager.frame_index()
+
+        frame_count: Optional[int] = None
+        duration: Optional[float] = None
+        fps: Optional[float] = None
+
+        if frame_index is not None and len(frame_index) > 0:
+            frame_count = len(frame_index)
+            span = int(frame_index.timestamps[-1] - frame_index.timestamps[0])
+
+            if span > 0:
+                fps = (frame_count - 1) * 1e9 / span
+                duration = frame_count / fps
+        else:
+            try:
+                with file_manager.open_video() as video_reader:
+                    frame_count = video_reader.frame_count
+                    fps = video_reader.fps or None
+            except Exception:
+                pass
+
+            if frame_count is not None and fps is not None:
+                duration = frame_count / fps
+
+        # 列形式で格納された記録では、統計値は記録を展開せずにチャンク毎の統計値から求められる
+        streams: Dict[str, Dict[str, Any]] = {stream: file_manager.sensor_summary(stream)
+                                              for stream in file_manager.stream_names()}
+
+        return {
+            'version': None if manifest is None else manifest.get('version'),
+            'frame_count': frame_count,
+            'duration': duration,
+            'fps': fps,
+            'streams': streams
+        }
+
+    def __insert(self, path: str, mtime_ns: int, size: int, entry: Dict[str, Any]) -> None:
+        """
+        ファイルの情報を索引に書き込む
+        """
+        streams = entry['streams']
+
+        self.__connection.execute(
+            'INSERT INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            (path, mtime_ns, size, entry['version'], entry['frame_count'], entry['duration'], entry['fps'],
+             sum(stream['sample_count'] for stream in streams.values())))
+
+        for name, stream in streams.items():
+            self.__connection.execute('INSERT INTO streams VALUES (?, ?, ?, ?)',
+                                      (path, name, json.dumps(stream['labels']), stream['sample_count']))
+
+            self.__connection.executemany('INSERT INTO labels VALUES (?, ?, ?, ?, ?, ?)',
+                                          [(path, name, label) + tuple(values)
+                                           for label, values in stream['stats'].items()])
+
+    def query(self,
+              min_duration: Optional[float] = None,
+              max_duration: Optional[float] = None,
+              above: Sequence[Tuple[str, float]] = (),
+              below: Sequence[Tuple[str, float]] = (),
+              stream: Optional[str] = None,
+              label: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        条件に合うファイルを索引から検索する
+
+        全ての条件を満たすファイルが返される。
+
+        Parameters
+        ----------
+        min_duration : Optional[float]
+
+            録画時間(秒)の下限
+
+        max_duration : Optional[float]
+
+            録画時間(秒)の上限
+
+        above : Sequence[Tuple[str, float]]
+
+            ラベルと値の組。ラベルの最大値が値を超えるファイルを検索する
+
+        below : Sequence[Tuple[str, float]]
+
+            ラベルと値の組。ラベルの最小値が値を下回るファイルを検索する
+
+        stream : Optional[str]
+
+            ストリーム名。指定した場合はこのストリームを持つファイルのみを検索し、above・belowもこのストリームで判定する
+
+        label : Optional[str]
+
+            指定した場合はこのラベルを持つファイルのみを検索する
+
+        Returns
+        ----------
+        files : List[Dict[str, Any]]
+
+            path・frame_count・duration・fps・sample_count・version・sizeをキーに持つファイルの情報のリスト
+        """
+        conditions: List[str] = []
+        parameters: List[Any] = []
+
+        if min_duration is not None:
+            conditions.append('files.duration >= ?')
+            parameters.append(min_duration)
+
+        if max_duration is not None:
+            conditions.append('files.duration <= ?')
+            parameters.append(max_duration)
+
+        stream_condition = '' if stream is None else ' AND labels.stream = ?'
+        stream_parameters = [] if stream is None else [stream]
+
+        for column, operator, thresholds in (('max', '>', above), ('min', '<', below)):
+            for threshold_label, value in thresholds:
+                conditions.append('EXISTS (SELECT 1 FROM labels WHERE labels.path = files.path '
+                                  f'AND labels.label = ? AND labels.{column} {operator} ?{stream_condition})')
+                parameters.extend([threshold_label, value] + stream_parameters)
+
+        if stream is not None:
+            conditions.append('EXISTS (SELECT 1 FROM streams WHERE streams.path = files.path AND streams.stream = ?)')
+            parameters.append(stream)
+
+        if label is not None:
+            conditions.append('EXISTS (SELECT 1 FROM streams, json_each(streams.labels) '
+                              'WHERE streams.path = files.path AND json_each.value = ?)')
+            parameters.append(label)
+
+        sql = 'SELECT path, frame_count, duration, fps, sample_count, version, size FROM files'
+
+        if len(conditions) > 0:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+
+        sql += ' ORDER BY path'
+
+        keys = ('path', 'frame_count', 'duration', 'fps', 'sample_count', 'version', 'size')
+
+        return [dict(zip(keys, row)) for row in self.__connection.execute(sql, parameters)]
+
+    def describe(self, file_path: Path) -> Optional[Dict[str, Any]]:
+        """
+        索引に記録されている1つのファイルの情報を取得する
+
+        Parameters
+        ----------
+        file_path : Path
+
+            tss形式のファイルへのパス
+
+        Returns
+        ----------
+        entry : Optional[Dict[str, Any]]
+
+            read_entryと同じ形式の情報。索引に登録されていない場合はNone
+        """
+        path = str(file_path.resolve())
+
+        row = self.__connection.execute('SELECT version, frame_count, duration, fps FROM files WHERE path = ?',
+                                        (path,)).fetchone()
+
+        if row is None:
+            return None
+
+        streams: Dict[str, Dict[str, Any]] = {}
+
+        for name, labels, sample_count in self.__connection.execute(
+                'SELECT stream, labels, sample_count FROM streams WHERE path = ?', (path,)):
+            streams[name] = {'labels': json.loads(labels), 'sample_count': sample_count, 'stats': {}}
+
+        for name, label, minimum, maximum, mean in self.__connection.execute(
+                'SELECT stream, label, min, max, mean FROM labels WHERE path = ?', (path,)):
+            streams[name]['stats'][label] = (minimum, maximum, mean)
+
+        return {
+            'version': row[0],
+            'frame_count': row[1],
+            'duration': row[2],
+            'fps': row[3],
+            'streams': streams
+        }
+
+    def close(self) -> None:
+        """
+        データベースを閉じる
+        """
+        self.__connection.close()
+
+    def __enter__(self) -> Catalog:
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
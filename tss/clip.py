@@ -0,0 +1,246 @@
+from __future__ import annotations
+
+import cv2
+import json
+import numpy as np
+import shutil
+import zipfile
+
+from contextlib import ExitStack
+from pathlib import Path
+from tss.mp4 import member_data_offset, Mp4Track, read_track, UnsupportedMovieError, write_movie
+from tss.video import open_archive_video
+from typing import BinaryIO, Dict, List, Tuple
+
+
+# 全体を再エンコードする場合の符号化方式
+FALLBACK_FOURCC = 'mp4v'
+
+
+def clip_movie(archive_path: Path, start_frame: int, end_frame: int, output_path: Path, temp_dir: Path) -> Dict[str, int]:
+    """
+    .tss形式のファイル内の動画から、指定されたフレーム範囲を新しい動画として書き出す
+
+    範囲内の最初のキーフレーム以降は、符号化されたサンプルを復号せずにそのまま書き写す。
+    範囲の先頭から最初のキーフレームまでの不完全なGOPのみを再エンコードし、同じ符号化の設定であれば
+    書き写したサンプルと1つのトラックにまとめる。サンプル表を扱えない動画や、符号化の設定が一致しない場合は、
+    範囲全体を再エンコードする。
+
+    Parameters
+    ----------
+    archive_path : Path
+
+        tss形式のファイルへのパス
+
+    start_frame : int
+
+        範囲の開始フレーム番号
+
+    end_frame : int
+
+        範囲の終了フレーム番号(このフレームを含む)。動画の末尾を超える場合は末尾まで
+
+    output_path : Path
+
+        書き出し先の動画ファイルへのパス
+
+    temp_dir : Path
+
+        圧縮されている動画の展開や、再エンコードに用いる一時フォルダへのパス
+
+    Returns
+    ----------
+    result : Dict[str, int]
+
+        書き写したフレーム数(copied_frames)と再エンコードしたフレーム数(encoded_frames)
+
+    Raises
+    ----------
+    ValueError
+
+        開始フレーム番号が負である、もしくは範囲に含まれるフレームが無いことを知らせる例外
+    """
+    # 負の番号をそのまま用いると、配列の末尾から数えた範囲が書き出されてしまう
+    if start_frame < 0:
+        raise ValueError(f'negative start frame: {start_frame}')
+
+    with ExitStack() as stack:
+        try:
+            sources, tracks = _open_tracks(archive_path, temp_dir, stack)
+        except UnsupportedMovieError:
+            return _encode_range(archive_path, start_frame, end_frame, output_path)
+
+        template = tracks[0]
+
+        if not all(template.is_compatible(track) for track in tracks):
+            return _encode_range(archive_path, start_frame, end_frame, output_path)
+
+        source_numbers = np.concatenate([np.full(len(track), i, dtype=np.int64) for i, track in enumerate(tracks)])
+        offsets = np.concatenate([track.offsets for track in tracks])
+        sizes = np.concatenate([track.sizes for track in tracks])
+        durations = np.concatenate([track.durations for track in tracks])
+        sync = np.concatenate([track.sync for track in tracks])
+
+        end_frame = min(end_frame, len(sizes) - 1)
+
+        if start_frame > end_frame:
+            raise ValueError(f'empty frame range: {start_frame}-{end_frame}')
+
+        keyframes = np.flatnonzero(sync[start_frame:end_frame + 1])
+
+        # 範囲内にキーフレームが無い場合は書き写せるサンプルが無い
+        if len(keyframes) == 0:
+            return _encode_range(archive_path, start_frame, end_frame, output_path)
+
+        first_keyframe = start_frame + int(keyframes[0])
+
+        samples: List[Tuple[int, int, int]] = []
+        clip_sync = sync[start_frame:end_frame + 1].copy()
+
+        if first_keyframe > start_frame:
+            head_path = temp_dir / 'head.mp4'
+
+            if not _encode_frames(archive_path, range(start_frame, first_keyframe), head_path,
+                                  _fourcc(template), template.timescale / float(np.median(durations)),
+                                  (template.width, template.height)):
+                return _encode_range(archive_path, start_frame, end_frame, output_path)
+
+            head_file = stack.enter_context(head_path.open(mode='rb'))
+            head = read_track(head_file, head_path.stat().st_size)
+
+            if not template.is_compatible(head) or len(head) != first_keyframe - start_frame or not head.sync[0]:
+                return _encode_range(archive_path, start_frame, end_frame, output_path)
+
+            sources.append(head_file)
+            samples.extend((len(sources) - 1, int(offset), int(size)) for offset, size in zip(head.offsets, head.sizes))
+            clip_sync[:len(head)] = head.sync
+
+        samples.extend(zip(source_numbers[first_keyframe:end_frame + 1].tolist(),
+                           offsets[first_keyframe:end_frame + 1].tolist(),
+                           sizes[first_keyframe:end_frame + 1].tolist()))
+
+        write_movie(output_path, template, sources, samples, durations[start_frame:end_frame + 1], clip_sync)
+
+        return {'copied_frames': end_frame + 1 - first_keyframe, 'encoded_frames': first_keyframe - start_frame}
+
+
+def _open_tracks(archive_path: Path, temp_dir: Path, stack: ExitStack) -> Tuple[List[BinaryIO], List[Mp4Track]]:
+    """
+    アーカイブ内の動画(セグメントに分けられている場合は全てのセグメント)のサンプル表を読み込む
+
+    無圧縮で格納された動画はアーカイブから直接読み、圧縮されている場合のみ一時フォルダへ展開する。
+
+    Returns
+    ----------
+    sources : List[BinaryIO]
+
+        サンプルを読み出すファイル
+
+    tracks : List[Mp4Track]
+
+        セグメント毎のサンプル表。位置はsourcesの対応するファイルの先頭からの位置である
+    """
+    with zipfile.ZipFile(archive_path) as zip:
+        members = ['movie.mp4']
+
+        if 'manifest.json' in zip.namelist():
+            with zip.open('manifest.json') as member:
+                segments = json.load(member).get('segments', [])
+
+            if len(segments) > 0:
+                members = [segment['movie'] for segment in segments]
+
+        infos = [zip.getinfo(member) for member in members]
+
+        sources: List[BinaryIO] = []
+        tracks: List[Mp4Track] = []
+
+        for i, info in enumerate(infos):
+            if info.compress_type == zipfile.ZIP_STORED:
+                source = stack.enter_context(archive_path.open(mode='rb'))
+                tracks.append(read_track(source, info.file_size, member_data_offset(archive_path, info)))
+            else:
+                movie_path = temp_dir / f'movie{i}.mp4'
+
+                with zip.open(info) as member, movie_path.open(mode='wb') as f:
+                    shutil.copyfileobj(member, f, 1024 * 1024)
+
+                source = stack.enter_context(movie_path.open(mode='rb'))
+                tracks.append(read_track(source, info.file_size))
+
+            sources.append(source)
+
+    return sources, tracks
+
+
+def _fourcc(track: Mp4Track) -> str:
+    """
+    サンプル表の符号化の設定から、cv2.VideoWriterに与える符号化方式を求める
+    """
+    # stsdのヘッダ・バージョンとフラグ・件数・サンプルエントリの大きさに続く4バイト
+    return track.sample_entry[20:24].decode('ascii', errors='replace')
+
+
+def _encode_frames(archive_path: Path,
+                   frame_numbers: range,
+                   output_path: Path,
+                   fourcc: str,
+                   fps: float,
+                   frame_size: Tuple[int, int]) -> bool:
+    """
+    指定されたフレームを復号し、再エンコードして書き出す
+
+    Returns
+    ----------
+    encoded : bool
+
+        全てのフレームを書き出すことができた場合はTrue
+    """
+    video_writer = cv2.VideoWriter(str(output_path), cv2.VideoWriter_fourcc(*fourcc), fps, frame_size)
+
+    if not video_writer.isOpened():
+        return False
+
+    count = 0
+
+    try:
+        with open_archive_video(archive_path) as video_reader:
+            for _, frame in video_reader.read_frames(frame_numbers):
+                video_writer.write(frame)
+                count += 1
+    finally:
+        video_writer.release()
+
+    return count == len(frame_numbers)
+
+
+def _encode_range(archive_path: Path, start_frame: int, end_frame: int, output_path: Path) -> Dict[str, int]:
+    """
+    範囲全体を再エンコードして書き出す
+    """
+    with open_archive_video(archive_path) as video_reader:
+        end_frame = min(end_frame, video_reader.frame_count - 1)
+        fps = video_reader.fps
+
+        if start_frame > end_frame:
+            raise ValueError(f'empty frame range: {start_frame}-{end_frame}')
+
+        first_frame = video_reader.read(start_frame)
+
+    if first_frame is None:
+        raise ValueError(f'frame {start_frame} could not be read')
+
+    frame_size = (first_frame.shape[1], first_frame.shape[0])
+    frame_numbers = range(start_frame, end_frame + 1)
+
+    # 途中のフレームが読み出せなかった場合は、それまでに書き出したフレームを動画とする
+    _encode_frames(archive_path, frame_numbers, output_path, FALLBACK_FOURCC, fps, frame_size)
+
+    video_capture = cv2.VideoCapture(str(output_path))
+    encoded_frames = int(video_capture.get(cv2.CAP_PROP_FRAME_COUNT))
+    video_capture.release()
+
+    if encoded_frames == 0:
+        raise ValueError(f'frames {start_frame}-{end_frame} could not be encoded')
+
+    return {'copied_frames': 0, 'encoded_frames': encoded_frames}
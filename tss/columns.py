@@ -0,0 +1,589 @@
+from __future__ import annotations
+
+import bz2
+import json
+import lzma
+import math
+import numpy as np
+import shutil
+import struct
+import tempfile
+import zlib
+
+from tss.sensordata import SensorData
+from typing import IO, Any, BinaryIO, Callable, Dict, List, Optional, Sequence, Tuple
+
+
+# ファイルの先頭に置かれる識別子
+MAGIC = b'TSSC'
+
+# 列形式のバージョン。2以降はフレーム番号と受信時刻の列をラベルの列と分けて記録する
+FORMAT_VERSION = 2
+
+# 1つのチャンクに含める記録の件数
+CHUNK_SIZE = 65536
+
+# 圧縮方式毎の圧縮・展開関数
+CODECS: Dict[str, Tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]] = {
+    'zlib': (lambda data: zlib.compress(data, 6), zlib.decompress),
+    'bz2': (bz2.compress, bz2.decompress),
+    'lzma': (lzma.compress, lzma.decompress)
+}
+
+# フレーム番号と受信時刻の列の名前。チャンクのヘッダではラベルの列(columns)とは別のindexに記録されるため、
+# 同じ名前のラベルを持つセンサの記録も区別される。単調に増加するため、値ではなく差分を格納する
+INDEX_COLUMNS = ('frame', 'time')
+
+
+class ColumnWriter:
+    """
+    センサの記録を型付きの列に分け、一定件数のチャンク毎に圧縮して書き出すクラス
+
+    各チャンクのフレーム番号・受信時刻の範囲と、数値のラベル毎の最小値・最大値・合計・件数はヘッダに記録される。
+    チャンクは書き込み中は一時ファイルに保持され、finishでヘッダと共に書き出される。
+    """
+
+    def __init__(self, labels: Sequence[str], chunk_size: int = CHUNK_SIZE, codec: str = 'zlib') -> None:
+        """
+        Parameters
+        ----------
+        labels : Sequence[str]
+
+            記録されるデータのラベル
+
+        chunk_size : int
+
+            1つのチャンクに含める記録の件数
+
+        codec : str
+
+            圧縮方式。CODECSのキーのいずれか
+        """
+        if codec not in CODECS:
+            raise ValueError(f'unknown codec: {codec}')
+
+        self.__labels = list(labels)
+        self.__chunk_size = chunk_size
+        self.__codec = codec
+
+        self.__blobs: IO[bytes] = tempfile.TemporaryFile()
+        self.__chunks: List[Dict[str, Any]] = []
+
+        self.__frames: List[int] = []
+        self.__times: List[Optional[int]] = []
+        self.__rows: List[Sequence[Any]] = []
+
+        self.__count = 0
+        self.__has_time: Optional[bool] = None
+
+    @property
+    def count(self) -> int:
+        """
+        Returns
+        ----------
+        count : int
+
+            書き込まれた記録の件数
+        """
+        return self.__count
+
+    def write(self, frame: int, data: Sequence[Any], timestamp: Optional[int] = None) -> None:
+        """
+        記録を1件追加する
+
+        Parameters
+        ----------
+        frame : int
+
+            データを受信した時点のフレーム番号
+
+        data : Sequence[Any]
+
+            センサから取得したデータ
+
+        timestamp : Optional[int]
+
+            データを受信した時刻(time.monotonic_nsの値)
+        """
+        # 受信時刻の有無は最初の記録に合わせる
+        if self.__has_time is None:
+            self.__has_time = timestamp is not None
+
+        self.__frames.append(frame)
+        self.__times.append(timestamp)
+        self.__rows.append(data)
+        self.__count += 1
+
+        if len(self.__frames) >= self.__chunk_size:
+            self.__flush_chunk()
+
+    def __flush_chunk(self) -> None:
+        """
+        保持している記録を1つのチャンクとして圧縮し、一時ファイルへ書き出す
+        """
+        if len(self.__frames) == 0:
+            return
+
+        compress, _ = CODECS[self.__codec]
+
+        index_columns: Dict[str, np.ndarray] = {'frame': np.asarray(self.__frames, dtype=np.int64)}
+
+        if self.__has_time:
+            index_columns['time'] = np.asarray([-1 if t is None else t for t in self.__times], dtype=np.int64)
+
+        values = list(zip(*self.__rows)) if len(self.__rows) > 0 else []
+
+        columns: Dict[str, np.ndarray] = {}
+
+        for i, label in enumerate(self.__labels):
+            columns[label] = _as_column(values[i] if i < len(values) else [None] * len(self.__frames))
+
+        chunk: Dict[str, Any] = {
+            'count': len(self.__frames),
+            'frame_min': int(index_columns['frame'].min()),
+            'frame_max': int(index_columns['frame'].max()),
+            'index': {},
+            'columns': {},
+            'stats': {}
+        }
+
+        if self.__has_time:
+            chunk['time_min'] = int(index_columns['time'].min())
+            chunk['time_max'] = int(index_columns['time'].max())
+
+        for name, column in index_columns.items():
+            chunk['index'][name] = self.__write_blob(compress, column, delta=True)
+
+        for label, column in columns.items():
+            chunk['columns'][label] = self.__write_blob(compress, column, delta=False)
+
+            if column.dtype.kind in 'iuf' and column.ndim == 1:
+                chunk['stats'][label] = _statistics(column)
+
+        self.__chunks.append(chunk)
+
+        self.__frames = []
+        self.__times = []
+        self.__rows = []
+
+    def __write_blob(self, compress: Callable[[bytes], bytes], column: np.ndarray, delta: bool) -> List[Any]:
+        """
+        列を圧縮して一時ファイルへ書き出す
+
+        Returns
+        ----------
+        entry : List[Any]
+
+            チャンクのデータ内での位置・大きさ・型の組
+        """
+        data, dtype = _encode(column, delta)
+        blob = compress(data)
+
+        entry = [self.__blobs.tell(), len(blob), dtype]
+        self.__blobs.write(blob)
+
+        return entry
+
+    def finish(self, dest: BinaryIO) -> None:
+        """
+        ヘッダと全てのチャンクを書き出し、一時ファイルを閉じる
+
+        Parameters
+        ----------
+        dest : BinaryIO
+
+            書き出し先のファイル
+        """
+        self.__flush_chunk()
+
+        header = json.dumps({
+            'version': FORMAT_VERSION,
+            'labels': self.__labels,
+            'count': self.__count,
+            'codec': self.__codec,
+            'has_time': bool(self.__has_time),
+            'chunks': self.__chunks
+        }).encode('utf-8')
+
+        dest.write(MAGIC + struct.pack('<I', len(header)) + header)
+
+        self.__blobs.seek(0)
+        shutil.copyfileobj(self.__blobs, dest, 1024 * 1024)
+
+        self.close()
+
+    def close(self) -> None:
+        """
+        書き出さずに一時ファイルを閉じる
+        """
+        self.__blobs.close()
+
+
+def _as_column(values: Sequence[Any]) -> np.ndarray:
+    """
+    値の列をSensorData.from_recordと同じ型の配列に変換する。要素の形が揃わない場合はobject型の配列となる
+    """
+    try:
+        return np.asarray(values)
+    except ValueError:
+        column = np.empty(len(values), dtype=object)
+        column[:] = list(values)
+        return column
+
+
+def _encode(column: np.ndarray, delta: bool) -> Tuple[bytes, str]:
+    """
+    列をバイト列に変換する。deltaがTrueの場合は隣り合う値の差分を格納する
+
+    Returns
+    ----------
+    data : bytes
+
+        変換されたバイト列
+
+    dtype : str
+
+        配列の型。数値以外の値を含む列はJSONとして格納され、'json'となる
+    """
+    if column.dtype.kind not in 'iufb' or column.ndim != 1:
+        return json.dumps(column.tolist()).encode('utf-8'), 'json'
+
+    dtype = column.dtype.newbyteorder('<')
+
+    if delta:
+        return np.diff(column, prepend=0).astype(dtype).tobytes(), 'delta' + dtype.str
+
+    return column.astype(dtype).tobytes(), dtype.str
+
+
+def _decode(data: bytes, dtype: str) -> np.ndarray:
+    """
+    _encodeによって変換されたバイト列を配列に戻す
+    """
+    if dtype == 'json':
+        return _as_column(json.loads(data.decode('utf-8')))
+
+    if dtype.startswith('delta'):
+        return np.cumsum(np.frombuffer(data, dtype=np.dtype(dtype[5:])), dtype=np.int64)
+
+    return np.frombuffer(data, dtype=np.dtype(dtype))
+
+
+def _statistics(column: np.ndarray) -> List[Optional[float]]:
+    """
+    数値の列の最小値・最大値・合計と、それらを求めた件数を求める。NaNは無視され、有限の値が無い場合はNoneとなる
+    """
+    values = column[np.isfinite(column)] if column.dtype.kind == 'f' else column
+
+    if values.size == 0:
+        return [None, None, None, 0]
+
+    return [values.min().item(), values.max().item(), values.sum(dtype=np.float64).item(), int(values.size)]
+
+
+def convert_record_file(file: IO[str], dest: BinaryIO, chunk_size: int = CHUNK_SIZE, codec: str = 'zlib') -> int:
+    """
+    RecordWriterによって書き出されたJSON Lines形式の記録を、列形式に変換して書き出す
+
+    記録は1行ずつ読み込まれるため、記録の件数に関わらずメモリ使用量は一定に保たれる。
+
+    Parameters
+    ----------
+    file : IO[str]
+
+        JSON Lines形式の記録ファイル
+
+    dest : BinaryIO
+
+        書き出し先のファイル
+
+    chunk_size : int
+
+        1つのチャンクに含める記録の件数
+
+    codec : str
+
+        圧縮方式。CODECSのキーのいずれか
+
+    Returns
+    ----------
+    count : int
+
+        変換した記録の件数
+    """
+    header = json.loads(file.readline())
+
+    writer = ColumnWriter(header['labels'], chunk_size, codec)
+
+    try:
+        for line in file:
+            # 書き込み途中で中断された最終行は読み飛ばす
+            if not line.endswith('\n'):
+                break
+
+            record = json.loads(line)
+            writer.write(record['frame'], record['data'], record.get('time'))
+
+        writer.finish(dest)
+    finally:
+        writer.close()
+
+    return writer.count
+
+
+def merge_statistics(labels: Sequence[str],
+                     chunks: Sequence[Dict[str, Any]]) -> Dict[str, Tuple[Optional[float], Optional[float], Optional[float]]]:
+    """
+    チャンク毎の統計値を結合し、数値のラベル毎の最小値・最大値・平均値を求める
+
+    Parameters
+    ----------
+    labels : Sequence[str]
+
+        データのラベル
+
+    chunks : Sequence[Dict[str, Any]]
+
+        ColumnReader.chunksの値。複数の記録のチャンクを連結したものでもよい
+
+    Returns
+    ----------
+    statistics : Dict[str, Tuple[Optional[float], Optional[float], Optional[float]]]
+
+        ラベル毎の最小値・最大値・平均値の組。全てのチャンクで数値であったラベルのみを含み、NaNは無視される
+    """
+    statistics = {}
+
+    for label in labels:
+        stats = [chunk['stats'].get(label) for chunk in chunks]
+
+        if len(stats) == 0 or any(stat is None for stat in stats):
+            continue
+
+        finite = [stat for stat in stats if stat[0] is not None]
+
+        if len(finite) == 0:
+            statistics[label] = (None, None, None)
+            continue
+
+        statistics[label] = (min(stat[0] for stat in finite),
+                             max(stat[1] for stat in finite),
+                             math.fsum(stat[2] for stat in finite) / sum(stat[3] for stat in finite))
+
+    return statistics
+
+
+class ColumnReader:
+    """
+    ColumnWriterによって書き出された列形式の記録を読み出すためのクラス
+
+    ヘッダのみを読み込んで作成され、各チャンクは必要になった時点で読み出される。
+    フレーム範囲や値の範囲に合わないチャンクは、ヘッダの統計値によって展開せずに読み飛ばされる。
+    """
+
+    # 先頭の識別子とヘッダの長さの大きさ
+    PREFIX_SIZE = 8
+
+    class InvalidFormatError(ValueError):
+        """
+        列形式の記録ではないことを知らせる例外クラス
+        """
+        pass
+
+    def __init__(self, file: BinaryIO, offset: int = 0) -> None:
+        """
+        Parameters
+        ----------
+        file : BinaryIO
+
+            列形式の記録を含むファイル。seekできる必要がある
+
+        offset : int
+
+            ファイル内で記録が始まる位置
+        """
+        file.seek(offset)
+        prefix = file.read(ColumnReader.PREFIX_SIZE)
+
+        if len(prefix) != ColumnReader.PREFIX_SIZE or prefix[:4] != MAGIC:
+            raise ColumnReader.InvalidFormatError()
+
+        header_length = struct.unpack('<I', prefix[4:])[0]
+
+        self.__file = file
+        self.__header: Dict[str, Any] = json.loads(file.read(header_length).decode('utf-8'))
+        self.__data_offset = offset + ColumnReader.PREFIX_SIZE + header_length
+
+        if self.__header['version'] != FORMAT_VERSION:
+            raise ColumnReader.InvalidFormatError()
+
+    @property
+    def labels(self) -> Tuple[str, ...]:
+        """
+        Returns
+        ----------
+        labels : Tuple[str, ...]
+
+            データのラベル
+        """
+        return tuple(self.__header['labels'])
+
+    @property
+    def count(self) -> int:
+        """
+        Returns
+        ----------
+        count : int
+
+            記録の件数
+        """
+        return self.__header['count']
+
+    @property
+    def chunks(self) -> List[Dict[str, Any]]:
+        """
+        Returns
+        ----------
+        chunks : List[Dict[str, Any]]
+
+            各チャンクの件数・フレーム番号の範囲・列毎の統計値などの情報
+        """
+        return self.__header['chunks']
+
+    def statistics(self) -> Dict[str, Tuple[Optional[float], Optional[float], Optional[float]]]:
+        """
+        チャンクを展開せずに、数値のラベル毎の最小値・最大値・平均値を求める
+
+        Returns
+        ----------
+        statistics : Dict[str, Tuple[Optional[float], Optional[float], Optional[float]]]
+
+            ラベル毎の最小値・最大値・平均値の組。全てのチャンクで数値であったラベルのみを含み、NaNは無視される
+        """
+        return merge_statistics(self.labels, self.chunks)
+
+    def read(self,
+             start_frame: Optional[int] = None,
+             end_frame: Optional[int] = None,
+             where: Optional[Dict[str, Tuple[Optional[float], Optional[float]]]] = None) -> SensorData:
+        """
+        条件に合う記録を読み出す
+
+        Parameters
+        ----------
+        start_frame : Optional[int]
+
+            範囲の開始フレーム番号。Noneの場合は先頭から
+
+        end_frame : Optional[int]
+
+            範囲の終了フレーム番号(このフレームを含む)。Noneの場合は末尾まで
+
+        where : Optional[Dict[str, Tuple[Optional[float], Optional[float]]]]
+
+            ラベルと、値の下限・上限(どちらも含む。Noneの場合は制限しない)の組。全ての条件を満たす記録のみを読み出す
+
+        Returns
+        ----------
+        sensor_data : SensorData
+
+            条件に合う記録
+        """
+        where = where or {}
+
+        parts: List[Dict[str, Any]] = []
+
+        for chunk in self.chunks:
+            if not self.__may_match(chunk, start_frame, end_frame, where):
+                continue
+
+            # 条件の判定に必要な列のみを先に展開し、該当する記録が無ければ残りの列は展開しない
+            frames = self.__read_column(chunk['index']['frame'])
+            columns = {label: self.__read_column(chunk['columns'][label]) for label in where.keys()}
+
+            mask = np.ones(chunk['count'], dtype=bool)
+
+            if start_frame is not None:
+                mask &= frames >= start_frame
+            if end_frame is not None:
+                mask &= frames <= end_frame
+
+            for label, (lower, upper) in where.items():
+                if lower is not None:
+                    mask &= columns[label] >= lower
+                if upper is not None:
+                    mask &= columns[label] <= upper
+
+            if not mask.any():
+                continue
+
+            for label in chunk['columns'].keys():
+                if label not in columns:
+                    columns[label] = self.__read_column(chunk['columns'][label])
+
+            part = {'columns': {label: column[mask] for label, column in columns.items()}, 'frame': frames[mask]}
+
+            if self.__header['has_time']:
+                part['time'] = self.__read_column(chunk['index']['time'])[mask]
+
+            parts.append(part)
+
+        return self.__to_sensor_data(parts)
+
+    def __may_match(self,
+                    chunk: Dict[str, Any],
+                    start_frame: Optional[int],
+                    end_frame: Optional[int],
+                    where: Dict[str, Tuple[Optional[float], Optional[float]]]) -> bool:
+        """
+        チャンクの統計値から、条件に合う記録を含む可能性があるか判定する
+        """
+        if start_frame is not None and chunk['frame_max'] < start_frame:
+            return False
+
+        if end_frame is not None and chunk['frame_min'] > end_frame:
+            return False
+
+        for label, (lower, upper) in where.items():
+            stat = chunk['stats'].get(label)
+
+            if stat is None:
+                continue
+
+            minimum, maximum = stat[:2]
+
+            if minimum is None:
+                return False
+            if lower is not None and maximum < lower:
+                return False
+            if upper is not None and minimum > upper:
+                return False
+
+        return True
+
+    def __read_column(self, entry: Sequence[Any]) -> np.ndarray:
+        """
+        チャンクのヘッダに記録された位置・大きさ・型の組から、1つの列を読み出して展開する
+        """
+        _, decompress = CODECS[self.__header['codec']]
+
+        offset, length, dtype = entry
+
+        self.__file.seek(self.__data_offset + offset)
+
+        return _decode(decompress(self.__file.read(length)), dtype)
+
+    def __to_sensor_data(self, parts: List[Dict[str, Any]]) -> SensorData:
+        """
+        チャンク毎に読み出した列を連結する
+        """
+        labels = self.labels
+
+        if len(parts) == 0:
+            return SensorData(labels, np.zeros(0, dtype=np.int64), {label: np.zeros(0) for label in labels},
+                              np.zeros(0, dtype=np.int64) if self.__header['has_time'] else None)
+
+        return SensorData(labels,
+                          np.concatenate([part['frame'] for part in parts]),
+                          {label: np.concatenate([part['columns'][label] for part in parts]) for label in labels},
+                          np.concatenate([part['time'] for part in parts]) if self.__header['has_time'] else None)
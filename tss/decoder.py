@@ -0,0 +1,339 @@
+from __future__ import annotations
+
+import numpy as np
+import struct
+
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+
+class Field(NamedTuple):
+    """
+    受信データ中の1つの値の配置
+    """
+
+    # 値のラベル
+    label: str
+
+    # データの先頭からの位置(バイト)
+    offset: int
+
+    # 値の大きさ(バイト)。1, 2, 4, 8のいずれか
+    width: int = 2
+
+    # 符号付き整数であるかどうか
+    signed: bool = True
+
+    # 値に掛ける係数
+    scale: float = 1.0
+
+    # 係数を掛けた後に加える値
+    bias: float = 0.0
+
+
+class FrameDecoder:
+    """
+    宣言されたフィールドの配置に従って、センサから受信したデータを解析するクラス
+
+    1件のデータはstructで、複数件のデータはNumPyの構造化dtypeでまとめて解析される。
+    """
+
+    # 値の大きさ毎のstructの書式文字
+    STRUCT_CODES = {1: 'b', 2: 'h', 4: 'i', 8: 'q'}
+
+    def __init__(self,
+                 fields: Sequence[Field],
+                 frame_size: Optional[int] = None,
+                 byteorder: str = 'big',
+                 encoding: str = 'hex',
+                 prefix_length: int = 0) -> None:
+        """
+        Parameters
+        ----------
+        fields : Sequence[Field]
+
+            フィールドの配置。この順序でlabelsが並ぶ
+
+        frame_size : Optional[int]
+
+            1件のデータの大きさ(バイト)。Noneの場合は最も後ろのフィールドの終端
+
+        byteorder : str
+
+            バイトオーダー。'big'もしくは'little'
+
+        encoding : str
+
+            受信データの形式。16進数の文字列の場合は'hex'、バイナリの場合は'binary'
+
+        prefix_length : int
+
+            受信データの先頭にある、解析しない部分の長さ(hexの場合は文字数、binaryの場合はバイト数)
+        """
+        for field in fields:
+            if field.width not in FrameDecoder.STRUCT_CODES:
+                raise ValueError(f'unsupported width: {field.width}')
+
+        if encoding not in ('hex', 'binary'):
+            raise ValueError(f'unknown encoding: {encoding}')
+
+        self.__fields = tuple(fields)
+        self.__frame_size = frame_size if frame_size is not None else \
+            max(field.offset + field.width for field in fields)
+        self.__encoding = encoding
+        self.__prefix_length = prefix_length
+
+        order = '>' if byteorder == 'big' else '<'
+
+        self.__struct, self.__struct_order = self.__compile_struct(order)
+
+        self.__dtype = np.dtype({
+            'names': [field.label for field in self.__fields],
+            'formats': [order + ('i' if field.signed else 'u') + str(field.width) for field in self.__fields],
+            'offsets': [field.offset for field in self.__fields],
+            'itemsize': self.__frame_size
+        })
+
+        # 係数を持つフィールドのみ浮動小数点数に変換する
+        self.__scaled = [field.scale != 1.0 or field.bias != 0.0 for field in self.__fields]
+
+    @property
+    def labels(self) -> Tuple[str, ...]:
+        """
+        Returns
+        ----------
+        labels : Tuple[str, ...]
+
+            フィールドのラベル。SensorObserverのlabelsとして用いることができる
+        """
+        return tuple(field.label for field in self.__fields)
+
+    @property
+    def frame_size(self) -> int:
+        """
+        Returns
+        ----------
+        frame_size : int
+
+            1件のデータの大きさ(バイト)
+        """
+        return self.__frame_size
+
+    @property
+    def dtype(self) -> np.dtype:
+        """
+        Returns
+        ----------
+        dtype : np.dtype
+
+            1件のデータを表すNumPyの構造化dtype
+        """
+        return self.__dtype
+
+    def __compile_struct(self, order: str) -> Tuple[struct.Struct, List[int]]:
+        """
+        全てのフィールドを1度に読み出すstructを作成する
+
+        フィールドは位置の順に並べ替えられ、間は読み飛ばされる。
+        structは値を順に連結して読み出すため、重なっているフィールドは扱えない。
+
+        Parameters
+        ----------
+        order : str
+
+            structのバイトオーダーを表す文字
+
+        Returns
+        ----------
+        compiled_struct : struct.Struct
+
+            全てのフィールドを読み出すstruct
+
+        struct_order : List[int]
+
+            structが返す各値が、何番目のフィールドに対応するか
+
+        Raises
+        ----------
+        ValueError
+
+            フィールドが直前のフィールドと重なっていることを知らせる例外
+        """
+        struct_order = sorted(range(len(self.__fields)), key=lambda i: self.__fields[i].offset)
+
+        format_string = order
+        position = 0
+
+        for index in struct_order:
+            field = self.__fields[index]
+
+            if field.offset < position:
+                raise ValueError(f'field {field.label} overlaps the previous field')
+
+            code = FrameDecoder.STRUCT_CODES[field.width]
+
+            format_string += 'x' * (field.offset - position)
+            format_string += code if field.signed else code.upper()
+
+            position = field.offset + field.width
+
+        return struct.Struct(format_string), struct_order
+
+    def __payload(self, raw_data: bytes) -> bytes:
+        """
+        受信データから解析する部分をバイト列として取り出す
+
+        Parameters
+        ----------
+        raw_data : bytes
+
+            受信データ
+
+        Returns
+        ----------
+        payload : bytes
+
+            解析する部分
+        """
+        if self.__encoding == 'hex':
+            return bytes.fromhex(raw_data[self.__prefix_length:].strip().decode('ascii'))
+
+        return raw_data[self.__prefix_length:self.__prefix_length + self.__frame_size]
+
+    def decode(self, raw_data: bytes) -> Tuple:
+        """
+        1件のデータを解析する
+
+        Parameters
+        ----------
+        raw_data : bytes
+
+            受信データ
+
+        Returns
+        ----------
+        data : Tuple
+
+            labelsに対応した値のタプル
+        """
+        values = self.__struct.unpack_from(self.__payload(raw_data))
+
+        result: List[Any] = [0] * len(self.__fields)
+
+        for value, index in zip(values, self.__struct_order):
+            if self.__scaled[index]:
+                field = self.__fields[index]
+                result[index] = value * field.scale + field.bias
+            else:
+                result[index] = value
+
+        return tuple(result)
+
+    def decode_buffer(self, buffer: bytes) -> Dict[str, np.ndarray]:
+        """
+        frame_sizeバイト毎に並んだ複数件のバイナリデータをまとめて解析する
+
+        Parameters
+        ----------
+        buffer : bytes
+
+            データを連結したバイト列。長さはframe_sizeの倍数である必要がある
+
+        Returns
+        ----------
+        columns : Dict[str, np.ndarray]
+
+            ラベル毎の値の配列
+        """
+        records = np.frombuffer(buffer, dtype=self.__dtype)
+
+        columns: Dict[str, np.ndarray] = {}
+
+        for field, scaled in zip(self.__fields, self.__scaled):
+            column = records[field.label]
+
+            if scaled:
+                columns[field.label] = column * field.scale + field.bias
+            else:
+                columns[field.label] = column.astype(column.dtype.newbyteorder('='))
+
+        return columns
+
+    def decode_batch(self, lines: Sequence[bytes]) -> Dict[str, np.ndarray]:
+        """
+        複数件の受信データをまとめて解析する
+
+        大きさがframe_sizeと異なるデータは読み飛ばされる。
+
+        Parameters
+        ----------
+        lines : Sequence[bytes]
+
+            受信データのリスト
+
+        Returns
+        ----------
+        columns : Dict[str, np.ndarray]
+
+            ラベル毎の値の配列
+        """
+        buffer, _ = self.__join_payloads(lines)
+
+        return self.decode_buffer(buffer)
+
+    def __join_payloads(self, lines: Sequence[bytes]) -> Tuple[bytes, List[bool]]:
+        """
+        複数件の受信データから、大きさがframe_sizeと一致するものの解析する部分を連結する
+
+        Parameters
+        ----------
+        lines : Sequence[bytes]
+
+            受信データのリスト
+
+        Returns
+        ----------
+        buffer : bytes
+
+            解析する部分を連結したバイト列
+
+        valid : List[bool]
+
+            各受信データが連結されたかどうか
+        """
+        if self.__encoding == 'hex':
+            expected_length = self.__frame_size * 2
+            payloads = [line[self.__prefix_length:].strip() for line in lines]
+            valid = [len(payload) == expected_length for payload in payloads]
+            buffer = bytes.fromhex(b''.join(payload for payload, is_valid in zip(payloads, valid)
+                                            if is_valid).decode('ascii'))
+        else:
+            payloads = [line[self.__prefix_length:self.__prefix_length + self.__frame_size] for line in lines]
+            valid = [len(payload) == self.__frame_size for payload in payloads]
+            buffer = b''.join(payload for payload, is_valid in zip(payloads, valid) if is_valid)
+
+        return buffer, valid
+
+    def decode_rows(self, lines: Sequence[bytes]) -> List[Optional[Tuple]]:
+        """
+        複数件の受信データをまとめて解析し、1件毎のタプルとして返す
+
+        結果は受信データと同じ順序・件数で並び、大きさがframe_sizeと異なるデータはNoneとなる。
+
+        Parameters
+        ----------
+        lines : Sequence[bytes]
+
+            受信データのリスト
+
+        Returns
+        ----------
+        rows : List[Optional[Tuple]]
+
+            labelsに対応した値のタプルのリスト。解析できなかったデータの位置はNone
+        """
+        buffer, valid = self.__join_payloads(lines)
+        columns = self.decode_buffer(buffer)
+
+        decoded = iter(zip(*(columns[label].tolist() for label in self.labels)))
+
+        return [next(decoded) if is_valid else None for is_valid in valid]
@@ -0,0 +1,736 @@
+from __future__ import annotations
+
+import cv2
+import functools
+import json
+import shutil
+import threading
+import time
+
+from pathlib import Path
+from tss.filemanager import TSSFileManager
+from tss.metrics import MetricsLogger
+from tss.pipeline import RecordingPipeline
+from tss.record import FrameIndexWriter, RecordWriter
+from tss.sensor import BaseSensorObserver, Sample
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+
+class RecordingEngine:
+    """
+    画面を持たない録画エンジン
+
+    カメラの撮影・エンコードと、センサからの入力のフレームへの対応付けを行う。
+    スクリプトや常駐するサービスから、open・start・stop・save・closeの順に呼び出して用いる。
+
+    ```python
+    with tss.RecordingEngine(sensor_observer) as engine:
+        engine.start()
+        time.sleep(60)
+        engine.stop()
+        engine.save(Path('output.tss'))
+    ```
+    """
+    FOURCC = cv2.VideoWriter_fourcc(*'mp4v')
+
+    class NotRecordedError(RuntimeError):
+        """
+        保存する録画が存在しないことを知らせる例外
+        """
+        pass
+
+    def __init__(self,
+                 sensor_observer: Union[BaseSensorObserver, Sequence[BaseSensorObserver]],
+                 camera_id: int = 0,
+                 frame_width: int = 1920,
+                 frame_height: int = 1080,
+                 fps: int = 20,
+                 preview_size: Optional[Tuple[int, int]] = None,
+                 metrics_interval: Optional[float] = None,
+                 work_dir: Path = Path('.'),
+                 video_capture: Optional[Any] = None,
+                 segment_duration: Optional[float] = None,
+                 segment_size: Optional[int] = None) -> None:
+        """
+        Parameters
+        ----------
+        sensor_observer : Union[BaseSensorObserver, Sequence[BaseSensorObserver]]
+
+            センサとの通信を監視するためのクラス。SensorObserverもしくはAsyncSensorObserver
+
+            複数与えた場合、それぞれのセンサの記録は別々のストリームとして保存される
+
+        camera_id : int
+
+            使用するカメラID
+
+        frame_width : int
+
+            フレームの幅
+
+        frame_height : int
+
+            フレームの高さ
+
+        fps : int
+
+            フレームレート
+
+        preview_size : Optional[Tuple[int, int]]
+
+            プレビュー画像の大きさ(幅, 高さ)。Noneの場合はプレビュー画像を作成しない
+
+        metrics_interval : Optional[float]
+
+            録画中の計測値を.tssファイルへ記録する間隔(秒)。Noneの場合は記録しない
+
+        work_dir : Path
+
+            録画中の一時ファイルを書き出すフォルダ
+
+        video_capture : Optional[Any]
+
+            camera_idの代わりに用いるcv2.VideoCaptureもしくは同じメソッドを持つオブジェクト
+
+        segment_duration : Optional[float]
+
+            録画をセグメントに分ける時間(秒)。Noneの場合は時間では分けない
+
+        segment_size : Optional[int]
+
+            録画をセグメントに分ける大きさ(バイト)。Noneの場合は大きさでは分けない
+
+            segment_durationかsegment_sizeを指定した場合、録画は一定の時間もしくは大きさ毎に
+            新しいセグメントへ切り替えられ、完了したセグメントはバックグラウンドで書き出しを終える。
+            異常終了した場合も、完了したセグメントはTSSFileManager.save_segmentsで保存できる
+        """
+        self.__fps = fps
+        self.__metrics_interval = metrics_interval
+        self.__work_dir = work_dir
+        self.__segment_duration = segment_duration
+        self.__segment_size = segment_size
+
+        # ビデオキャプチャ
+        if video_capture is None:
+            video_capture = cv2.VideoCapture(camera_id)
+            video_capture.set(cv2.CAP_PROP_FRAME_WIDTH, frame_width)
+            video_capture.set(cv2.CAP_PROP_FRAME_HEIGHT, frame_height)
+            video_capture.set(cv2.CAP_PROP_FPS, fps)
+
+        self.__video_capture = video_capture
+
+        # 撮影・エンコード・プレビューのパイプライン
+        self.__pipeline = RecordingPipeline(self.__video_capture, preview_size=preview_size)
+
+        self.__is_open = False
+        self.__is_recording = False
+
+        # 録画を開始・終了した時刻(time.monotonic_nsの値)。この間に受信したデータのみが記録される
+        self.__start_timestamp: Optional[int] = None
+        self.__stop_timestamp: Optional[int] = None
+
+        # ストリーム名毎のセンサから取得したデータの書き出し先
+        self.__record_writers: Dict[str, RecordWriter] = {}
+
+        # セグメントの切り替え中に書き出し先が変わらないよう保護する
+        self.__writer_lock = threading.Lock()
+
+        # 録画中のセグメント
+        self.__segment: Optional[Dict[str, Any]] = None
+
+        # セグメントの切り替えを監視するスレッド
+        self.__segment_stop_event = threading.Event()
+        self.__segment_thread: Optional[threading.Thread] = None
+
+        # 完了したセグメントの書き出しを終えるスレッド
+        self.__finalizing_threads: List[threading.Thread] = []
+
+        # 各フレームの撮影時刻の書き出し先
+        self.__frame_index_writer: Optional[FrameIndexWriter] = None
+
+        # 録画中の計測値の書き出し先
+        self.__metrics_logger: Optional[MetricsLogger] = None
+
+        # 録画を終了し、保存を待っている一時ファイル
+        self.__pending: Optional[Dict[str, Any]] = None
+
+        # 記録されたデータの通知先
+        self.__record_observe_methods: List[Callable[[str, List[Sample]], None]] = []
+
+        # ストリーム名毎のセンサオブザーバー
+        if isinstance(sensor_observer, BaseSensorObserver):
+            sensor_observer = [sensor_observer]
+
+        self.__sensor_observers: Dict[str, BaseSensorObserver] = {}
+
+        for observer in sensor_observer:
+            name = observer.name
+
+            # 同じ名前のセンサが複数ある場合は番号を付けて区別する
+            index = 1
+            while name in self.__sensor_observers:
+                index += 1
+                name = f'{observer.name}{index}'
+
+            self.__sensor_observers[name] = observer
+
+        for name, observer in self.__sensor_observers.items():
+            observer.add_batch_observe_method(functools.partial(self.__observe, name))
+
+    def __enter__(self) -> RecordingEngine:
+        self.open()
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    @property
+    def sensor_observers(self) -> Dict[str, BaseSensorObserver]:
+        """
+        Returns
+        ----------
+        sensor_observers : Dict[str, BaseSensorObserver]
+
+            ストリーム名毎のセンサオブザーバー
+        """
+        return dict(self.__sensor_observers)
+
+    @property
+    def is_open(self) -> bool:
+        """
+        Returns
+        ----------
+        is_open : bool
+
+            カメラとセンサの監視を開始しているかどうか
+        """
+        return self.__is_open
+
+    @property
+    def is_recording(self) -> bool:
+        """
+        Returns
+        ----------
+        is_recording : bool
+
+            録画中であるかどうか
+        """
+        return self.__is_recording
+
+    @property
+    def has_pending_recording(self) -> bool:
+        """
+        Returns
+        ----------
+        has_pending_recording : bool
+
+            保存もしくは破棄されていない録画があるかどうか
+        """
+        return self.__pending is not None
+
+    def add_record_observe_method(self, record_observe_method: Callable[[str, List[Sample]], None]) -> None:
+        """
+        録画中に記録されたデータを受け取るメソッドを登録する
+
+        メソッドはセンサ毎の通知用のスレッドから、ストリーム名と記録された入力のリストを引数として呼び出される。
+
+        Parameters
+        ----------
+        record_observe_method : Callable[[str, List[Sample]], None]
+
+            記録されたデータを受け取るメソッド
+        """
+        self.__record_observe_methods.append(record_observe_method)
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        パイプラインと各センサの計測値を取得する。任意のスレッドから呼び出すことができる
+
+        Returns
+        ----------
+        metrics : Dict[str, Any]
+
+            'pipeline'にRecordingPipeline.metricsの値を、
+            'sensors'にストリーム名毎のBaseSensorObserver.metricsの値を持つ辞書
+        """
+        return {
+            'pipeline': self.__pipeline.metrics(),
+            'sensors': self.__sensor_metrics()
+        }
+
+    def __sensor_metrics(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Returns
+        ----------
+        sensor_metrics : Dict[str, Dict[str, Any]]
+
+            ストリーム名毎のセンサの計測値
+        """
+        return {name: observer.metrics() for name, observer in self.__sensor_observers.items()}
+
+    def get_preview(self) -> Optional[Any]:
+        """
+        最新のプレビュー画像を取り出す
+
+        Returns
+        ----------
+        preview : Optional[numpy.ndarray]
+
+            RGB形式に変換・縮小されたプレビュー画像。新しい画像が無い場合、もしくはプレビューを作成しない場合はNone
+        """
+        return self.__pipeline.get_preview()
+
+    def open(self) -> None:
+        """
+        センサの監視とカメラの撮影を開始する
+        """
+        if self.__is_open:
+            return
+
+        for observer in self.__sensor_observers.values():
+            observer.start_observe()
+
+        self.__pipeline.start()
+        self.__is_open = True
+
+    def close(self) -> None:
+        """
+        録画中であれば録画を終了し、センサの監視とカメラの撮影を終了する
+
+        保存されていない録画は破棄される。
+        """
+        if not self.__is_open:
+            return
+
+        if self.__is_recording:
+            self.stop()
+
+        self.discard()
+
+        self.__pipeline.stop()
+        self.__video_capture.release()
+
+        for observer in self.__sensor_observers.values():
+            observer.stop_observe()
+
+        self.__is_open = False
+
+    def __temp_path(self, suffix: str) -> Path:
+        """
+        一時ファイルへのパスを求める
+
+        Parameters
+        ----------
+        suffix : str
+
+            拡張子を含む一時ファイル名の末尾
+
+        Returns
+        ----------
+        path : Path
+
+            一時ファイルへのパス
+        """
+        return self.__work_dir / f'~temp{suffix}'
+
+    @property
+    def is_segmented(self) -> bool:
+        """
+        Returns
+        ----------
+        is_segmented : bool
+
+            録画をセグメントに分けるかどうか
+        """
+        return self.__segment_duration is not None or self.__segment_size is not None
+
+    @property
+    def segments_dir_path(self) -> Path:
+        """
+        Returns
+        ----------
+        segments_dir_path : Path
+
+            セグメントに分けて録画する場合の、セグメントの書き出し先のフォルダ
+        """
+        return self.__temp_path('.segments')
+
+    def start(self) -> None:
+        """
+        録画を開始する
+
+        保存されていない録画は破棄される。
+        """
+        if not self.__is_open:
+            self.open()
+
+        if self.__is_recording:
+            return
+
+        self.discard()
+
+        if self.__metrics_interval is not None:
+            self.__metrics_logger = MetricsLogger(self.__temp_path('.metrics.jsonl'),
+                                                  {'pipeline': self.__pipeline.metrics,
+                                                   'sensors': self.__sensor_metrics},
+                                                  self.__metrics_interval)
+            self.__metrics_logger.start()
+
+        if self.is_segmented:
+            self.segments_dir_path.mkdir(parents=True)
+
+            self.__segment = self.__open_segment(0)
+            self.__segment['frame_offset'] = 0
+            self.__record_writers = self.__segment['record_writers']
+            self.__pipeline.start_recording(self.__segment['video_writer'], self.__segment['frame_index_writer'])
+
+            self.__segment_stop_event.clear()
+            self.__segment_thread = threading.Thread(target=self.__watch_segment, daemon=True)
+            self.__segment_thread.start()
+
+            self.__start_recording_samples()
+            return
+
+        # ビデオライターの準備
+        video_writer = self.__video_writer(self.__temp_path('.mp4'))
+
+        # センサから取得したデータは録画中にストリーム毎に逐次書き出す
+        self.__record_writers = {
+            name: RecordWriter(self.__temp_path(f'.{name}.jsonl'), observer.labels)
+            for name, observer in self.__sensor_observers.items()
+        }
+        self.__frame_index_writer = FrameIndexWriter(self.__temp_path('.frames.jsonl'))
+
+        self.__pipeline.start_recording(video_writer, self.__frame_index_writer)
+        self.__start_recording_samples()
+
+    def __start_recording_samples(self) -> None:
+        """
+        この時刻以降に受信したデータを記録する
+        """
+        self.__stop_timestamp = None
+        self.__start_timestamp = time.monotonic_ns()
+        self.__is_recording = True
+
+    def __video_writer(self, file_path: Path) -> cv2.VideoWriter:
+        """
+        動画の書き出し先を作成する
+
+        Parameters
+        ----------
+        file_path : Path
+
+            動画ファイルへのパス
+
+        Returns
+        ----------
+        video_writer : cv2.VideoWriter
+
+            ビデオライター
+        """
+        return cv2.VideoWriter(str(file_path),
+                               RecordingEngine.FOURCC,
+                               self.__fps,
+                               (int(self.__video_capture.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                                int(self.__video_capture.get(cv2.CAP_PROP_FRAME_HEIGHT))))
+
+    def __open_segment(self, index: int) -> Dict[str, Any]:
+        """
+        セグメントの書き出し先を作成する
+
+        最初のフレーム番号('frame_offset')は、録画の書き出し先を切り替えた時点で設定される。
+
+        Parameters
+        ----------
+        index : int
+
+            セグメントの番号
+
+        Returns
+        ----------
+        segment : Dict[str, Any]
+
+            セグメントのフォルダと各書き出し先
+        """
+        segment_dir_path = self.segments_dir_path / f'{index:04d}'
+        (segment_dir_path / 'sensors').mkdir(parents=True)
+
+        return {
+            'index': index,
+            'dir_path': segment_dir_path,
+            'start_time': time.monotonic(),
+            'video_writer': self.__video_writer(segment_dir_path / 'movie.mp4'),
+            'frame_index_writer': FrameIndexWriter(segment_dir_path / 'frames.jsonl'),
+            'record_writers': {
+                name: RecordWriter(segment_dir_path / 'sensors' / f'{name}.jsonl', observer.labels)
+                for name, observer in self.__sensor_observers.items()
+            }
+        }
+
+    def __segment_size_of(self, segment: Dict[str, Any]) -> int:
+        """
+        セグメントのこれまでに書き出された大きさを求める
+
+        Parameters
+        ----------
+        segment : Dict[str, Any]
+
+            セグメント
+
+        Returns
+        ----------
+        size : int
+
+            動画と記録ファイルの大きさの合計(バイト)
+        """
+        paths = [segment['dir_path'] / 'movie.mp4'] + \
+            [record_writer.file_path for record_writer in segment['record_writers'].values()]
+
+        return sum(path.stat().st_size for path in paths if path.exists())
+
+    def __watch_segment(self) -> None:
+        """
+        録画中のセグメントが一定の時間もしくは大きさに達した場合に、新しいセグメントへ切り替える
+        """
+        while not self.__segment_stop_event.wait(0.5):
+            segment = self.__segment
+
+            if self.__segment_duration is not None and \
+                    time.monotonic() - segment['start_time'] >= self.__segment_duration:
+                self.__roll_segment()
+            elif self.__segment_size is not None and self.__segment_size_of(segment) >= self.__segment_size:
+                self.__roll_segment()
+
+    def __roll_segment(self) -> None:
+        """
+        録画を止めずに新しいセグメントへ切り替え、以前のセグメントの書き出しをバックグラウンドで終える
+        """
+        previous_segment = self.__segment
+
+        segment = self.__open_segment(previous_segment['index'] + 1)
+
+        with self.__writer_lock:
+            self.__record_writers = segment['record_writers']
+
+        previous_encode_thread, first_frame = self.__pipeline.switch_recording(segment['video_writer'],
+                                                                               segment['frame_index_writer'])
+        segment['frame_offset'] = first_frame
+
+        self.__segment = segment
+
+        thread = threading.Thread(target=self.__finalize_segment,
+                                  args=(previous_segment, first_frame - previous_segment['frame_offset'],
+                                        previous_encode_thread),
+                                  daemon=True)
+        thread.start()
+
+        self.__finalizing_threads.append(thread)
+
+    def __finalize_segment(self,
+                           segment: Dict[str, Any],
+                           frame_count: int,
+                           encode_thread: Optional[threading.Thread]) -> None:
+        """
+        セグメントの書き出しを終え、segment.jsonを書き出す
+
+        Parameters
+        ----------
+        segment : Dict[str, Any]
+
+            セグメント
+
+        frame_count : int
+
+            セグメントのフレーム数
+
+        encode_thread : Optional[threading.Thread]
+
+            セグメントの動画のエンコードを行っているスレッド
+        """
+        # エンコード待ちのフレームが書き出され、動画が閉じられるまで待つ
+        if encode_thread is not None:
+            encode_thread.join()
+
+        segment['frame_index_writer'].close()
+
+        for record_writer in segment['record_writers'].values():
+            record_writer.close()
+
+        # segment.jsonはセグメントの書き出しが完了したことを表すため、最後に書き出す
+        with (segment['dir_path'] / 'segment.json').open(mode='w', encoding='utf-8') as f:
+            json.dump({
+                'index': segment['index'],
+                'frame_offset': segment['frame_offset'],
+                'frame_count': frame_count,
+                'streams': {name: record_writer.summary()
+                            for name, record_writer in segment['record_writers'].items()}
+            }, f, indent=4)
+
+    def stop(self) -> None:
+        """
+        録画を終了する
+
+        録画した内容は、saveで保存するかdiscardで破棄するまで一時ファイルとして残る。
+        """
+        if not self.__is_recording:
+            return
+
+        self.__stop_timestamp = time.monotonic_ns()
+        self.__is_recording = False
+
+        # 終了前に受信し、まだ通知されていないデータを書き出してから記録を閉じる
+        for observer in self.__sensor_observers.values():
+            observer.drain(self.__stop_timestamp)
+
+        if self.is_segmented:
+            self.__segment_stop_event.set()
+            self.__segment_thread.join()
+            self.__segment_thread = None
+
+        # エンコード待ちのフレームを書き出してから動画を閉じる
+        self.__pipeline.stop_recording()
+
+        with self.__writer_lock:
+            record_writers = self.__record_writers
+            self.__record_writers = {}
+
+        metrics_file_path: Optional[Path] = None
+
+        if self.__metrics_logger is not None:
+            self.__metrics_logger.stop()
+            metrics_file_path = self.__metrics_logger.file_path
+            self.__metrics_logger = None
+
+        if self.is_segmented:
+            segment = self.__segment
+            self.__segment = None
+
+            self.__finalize_segment(segment, self.__pipeline.current_frame + 1 - segment['frame_offset'], None)
+
+            for thread in self.__finalizing_threads:
+                thread.join()
+
+            self.__finalizing_threads = []
+
+            self.__pending = {
+                'segments_dir_path': self.segments_dir_path,
+                'metrics_file_path': metrics_file_path
+            }
+            return
+
+        for record_writer in record_writers.values():
+            record_writer.close()
+
+        self.__frame_index_writer.close()
+
+        self.__pending = {
+            'movie_file_path': self.__temp_path('.mp4'),
+            'record_file_paths': {name: record_writer.file_path for name, record_writer in record_writers.items()},
+            'frame_index_file_path': self.__frame_index_writer.file_path,
+            'stream_info': {name: record_writer.summary() for name, record_writer in record_writers.items()},
+            'metrics_file_path': metrics_file_path
+        }
+
+        self.__frame_index_writer = None
+
+    def save(self, file_path: Path) -> None:
+        """
+        最後に録画した内容を.tss形式で保存する
+
+        Parameters
+        ----------
+        file_path : Path
+
+            保存先のtss形式のファイルへのパス
+
+        Raises
+        ----------
+        RecordingEngine.NotRecordedError
+
+            保存されていない録画が存在しないことを知らせる例外
+        """
+        if self.__is_recording:
+            self.stop()
+
+        if self.__pending is None:
+            raise RecordingEngine.NotRecordedError()
+
+        pending = self.__pending
+        self.__pending = None
+
+        if 'segments_dir_path' in pending:
+            TSSFileManager(file_path).save_segments(pending['segments_dir_path'],
+                                                    metrics_file_path=pending['metrics_file_path'])
+            return
+
+        TSSFileManager(file_path).save(pending['movie_file_path'], pending['record_file_paths'],
+                                       frame_index_file_path=pending['frame_index_file_path'],
+                                       stream_info=pending['stream_info'],
+                                       metrics_file_path=pending['metrics_file_path'])
+
+    def discard(self) -> None:
+        """
+        保存されていない録画の一時ファイルを削除する
+        """
+        if self.__pending is None:
+            return
+
+        pending = self.__pending
+        self.__pending = None
+
+        if pending['metrics_file_path'] is not None:
+            pending['metrics_file_path'].unlink(missing_ok=True)
+
+        if 'segments_dir_path' in pending:
+            shutil.rmtree(pending['segments_dir_path'], ignore_errors=True)
+            return
+
+        pending['movie_file_path'].unlink(missing_ok=True)
+
+        for record_file_path in pending['record_file_paths'].values():
+            record_file_path.unlink(missing_ok=True)
+
+        pending['frame_index_file_path'].unlink(missing_ok=True)
+
+    def __observe(self, name: str, samples: List[Sample]) -> None:
+        """
+        データが観測された際のメソッド
+
+        データはまとめて通知され、それぞれ受信時刻に撮影されていたフレームに対応付けられる。
+        通知された時点ではなく受信時刻によって、録画の開始から終了までに受信したデータのみが記録される
+
+        Parameters
+        ----------
+        name : str
+
+            データを受信したセンサのストリーム名
+
+        samples : List[Sample]
+
+            受信時刻の付いたデータ
+        """
+        start_timestamp = self.__start_timestamp
+        stop_timestamp = self.__stop_timestamp
+
+        if start_timestamp is None:
+            return
+
+        samples = [sample for sample in samples
+                   if sample.data is not None and sample.timestamp >= start_timestamp and
+                   (stop_timestamp is None or sample.timestamp <= stop_timestamp)]
+
+        if len(samples) == 0:
+            return
+
+        # セグメントの切り替え中は、切り替えが終わるまで書き出しを待つ
+        with self.__writer_lock:
+            record_writer = self.__record_writers.get(name)
+
+            if record_writer is None:
+                return
+
+            for sample in samples:
+                record_writer.write(self.__pipeline.frame_at(sample.timestamp), sample.data, sample.timestamp)
+
+        for record_observe_method in self.__record_observe_methods:
+            record_observe_method(name, samples)
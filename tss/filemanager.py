@@ -1,12 +1,25 @@
 from __future__ import annotations
 
-import cv2
+import csv
+import io
 import json
+import numpy as np
+import os
 import shutil
+import tempfile
 import zipfile
 
+from contextlib import ExitStack
 from pathlib import Path
-from typing import Optional
+from tss.columns import ColumnReader, convert_record_file, merge_statistics
+from tss.mp4 import (keyframe_index, KEYFRAME_INDEX_MEMBER, KEYFRAME_INDEX_VERSION, member_data_offset,
+                     read_keyframe_index, UnsupportedMovieError)
+from tss.record import FrameIndexWriter, read_json_lines, read_record, RecordWriter
+from tss.sensordata import FrameIndex, join_sensor_data, SensorData
+from typing import Any, Dict, List, Optional, Sequence, Tuple, TYPE_CHECKING, Union
+
+if TYPE_CHECKING:
+    from tss.video import SegmentedVideoReader, VideoReader
 
 
 class TSSFileManager:
@@ -14,18 +27,33 @@ class TSSFileManager:
     .tss形式のファイルを管理するためのクラス
     """
 
+    # エクスポート時に一度に書き出す記録の件数
+    EXPORT_CHUNK_SIZE = 10000
+
+    # manifest.jsonに記録されるファイル形式のバージョン
+    FORMAT_VERSION = 2
+
+    # セグメントに分けて録画されたファイルの形式のバージョン
+    SEGMENTED_FORMAT_VERSION = 3
+
+    # センサの記録を列形式で格納したファイルの形式のバージョン
+    COLUMNAR_FORMAT_VERSION = 4
+
+    # センサの記録の格納形式と、アーカイブ内のファイル名の拡張子
+    SENSOR_FORMATS = {'columns': '.columns', 'jsonl': '.jsonl'}
+
+    # manifest.jsonを持たない古い形式のファイルのストリーム名
+    LEGACY_STREAM_NAME = 'data'
+
+    # 保存時にファイルを書き込む単位(バイト)
+    COPY_BUFFER_SIZE = 1024 * 1024
+
     class FileAlreadyExistsError(BaseException):
         """
         ファイルが既に存在していたことを知らせる例外クラス
         """
         pass
 
-    class AutoExtractFailedError(BaseException):
-        """
-        自動解凍に失敗したことを知らせる例外クラス
-        """
-        pass
-
     def __init__(self, file_path: Path) -> None:
         """
         Parameters
@@ -36,36 +64,417 @@ class TSSFileManager:
         """
         self.__file_path: Path = file_path
 
-        self.__extracted_file_path: Optional[Path] = None
+        # ストリーム名毎に読み込み済みの計測データ
+        self.__sensor_data: Dict[str, SensorData] = {}
 
     def save(self,
              movie_file_path: Path,
-             record_file_path: Path,
-             delete_original_files: bool = True) -> None:
+             record_file_path: Union[Path, Dict[str, Path]],
+             delete_original_files: bool = True,
+             frame_index_file_path: Optional[Path] = None,
+             stream_info: Optional[Dict[str, Dict[str, Any]]] = None,
+             metrics_file_path: Optional[Path] = None,
+             sensor_format: str = 'columns') -> None:
         """
         .tss形式のファイルを保存する
 
+        動画は既に圧縮されているため無圧縮で格納し、センサの記録などのテキストのみを圧縮する。
+        無圧縮で格納された動画は、VideoReaderによって解凍せずに読み出される。
+        動画のキーフレームの索引も格納され、VideoReaderはこれを用いて任意のフレームへ正確に移動する。
+
         Parameters
         ----------
         movie_file_path : Path
 
             mp4形式の動画ファイルへのパス
 
-        record_file_path : Path
+        record_file_path : Union[Path, Dict[str, Path]]
 
             センサから取得したデータの記録ファイルへのパス
 
+            拡張子が.jsonlの場合、RecordWriterによって書き出された記録として保存される
+
+            複数のセンサの記録を保存する場合は、ストリーム名をキーとし、
+            RecordWriterによって書き出された記録ファイルへのパスを値とする辞書を与える
+
         delete_original_files : bool
 
             元の動画ファイルとセンサ情報記録ファイルを削除するか
+
+        frame_index_file_path : Optional[Path]
+
+            FrameIndexWriterによって書き出された、各フレームの撮影時刻の記録ファイルへのパス
+
+        stream_info : Optional[Dict[str, Dict[str, Any]]]
+
+            ストリーム名毎の付加情報(RecordWriter.summaryの値など)。manifest.jsonに保存される
+
+        metrics_file_path : Optional[Path]
+
+            MetricsLoggerによって書き出された、録画中の計測値の記録ファイルへのパス
+
+        sensor_format : str
+
+            複数のセンサの記録を保存する場合の格納形式。
+            'columns'の場合はチャンク毎に圧縮した列形式で、'jsonl'の場合は記録ファイルをそのまま格納する
         """
+        if isinstance(record_file_path, dict):
+            record_file_paths = record_file_path
+        else:
+            record_file_paths = {TSSFileManager.LEGACY_STREAM_NAME: record_file_path}
+
         with zipfile.ZipFile(self.__file_path, 'w', compression=zipfile.ZIP_DEFLATED) as zip:
-            zip.write(movie_file_path, arcname='movie.mp4')
-            zip.write(record_file_path, arcname='data.json')
+            self.__write_member(zip, movie_file_path, 'movie.mp4', zipfile.ZIP_STORED)
+
+            movie_index = self.__index_movie(movie_file_path, zip.getinfo('movie.mp4'))
+
+            if isinstance(record_file_path, dict):
+                streams = []
+
+                for name, path in record_file_paths.items():
+                    member = f'sensors/{name}{TSSFileManager.SENSOR_FORMATS[sensor_format]}'
+                    self.__write_record(zip, path, member, sensor_format)
+
+                    info = {'name': name, 'member': member}
+                    info.update((stream_info or {}).get(name, {}))
+                    streams.append(info)
+
+                zip.writestr('manifest.json', json.dumps({
+                    'version': TSSFileManager.COLUMNAR_FORMAT_VERSION if sensor_format == 'columns'
+                    else TSSFileManager.FORMAT_VERSION,
+                    'streams': streams
+                }, indent=4))
+            elif record_file_path.suffix == '.jsonl':
+                zip.write(record_file_path, arcname='data.jsonl')
+            else:
+                zip.write(record_file_path, arcname='data.json')
+
+            if frame_index_file_path is not None:
+                zip.write(frame_index_file_path, arcname='frames.jsonl')
+
+            if metrics_file_path is not None:
+                zip.write(metrics_file_path, arcname='metrics.jsonl')
+
+            self.__write_keyframe_index(zip, {} if movie_index is None else {'movie.mp4': movie_index})
+
+        self.__sensor_data.clear()
 
         if delete_original_files:
             movie_file_path.unlink()
-            record_file_path.unlink()
+
+            for path in record_file_paths.values():
+                path.unlink()
+
+            if frame_index_file_path is not None:
+                frame_index_file_path.unlink()
+
+            if metrics_file_path is not None:
+                metrics_file_path.unlink()
+
+    def save_segments(self,
+                      segments_dir_path: Path,
+                      delete_original_files: bool = True,
+                      metrics_file_path: Optional[Path] = None,
+                      sensor_format: str = 'columns') -> int:
+        """
+        セグメントに分けて録画されたデータを、1つの.tss形式のファイルとして保存する
+
+        segments_dir_path以下の各フォルダが1つのセグメントであり、
+        segment.jsonが書き出されている(書き出しが完了している)セグメントのみが番号順に保存される。
+        録画中に異常終了した場合も、それまでに完了したセグメントはこのメソッドで保存できる。
+        各セグメントの動画はsaveと同様に無圧縮で格納される。
+
+        Parameters
+        ----------
+        segments_dir_path : Path
+
+            RecordingEngineによって書き出されたセグメントのフォルダへのパス
+
+        delete_original_files : bool
+
+            保存後にセグメントのフォルダを削除するか
+
+        metrics_file_path : Optional[Path]
+
+            MetricsLoggerによって書き出された、録画中の計測値の記録ファイルへのパス
+
+        sensor_format : str
+
+            センサの記録の格納形式。saveと同様
+
+        Returns
+        ----------
+        segment_count : int
+
+            保存したセグメントの数
+        """
+        segment_dirs = sorted(path for path in segments_dir_path.iterdir()
+                              if path.is_dir() and (path / 'segment.json').is_file())
+
+        streams: Dict[str, Dict[str, Any]] = {}
+        segments = []
+        movie_indexes: Dict[str, Dict[str, Any]] = {}
+
+        with zipfile.ZipFile(self.__file_path, 'w', compression=zipfile.ZIP_DEFLATED) as zip:
+            for segment_dir in segment_dirs:
+                with (segment_dir / 'segment.json').open(encoding='utf-8') as f:
+                    segment_info = json.load(f)
+
+                prefix = f'segments/{segment_dir.name}/'
+
+                self.__write_member(zip, segment_dir / 'movie.mp4', prefix + 'movie.mp4', zipfile.ZIP_STORED)
+
+                movie_index = self.__index_movie(segment_dir / 'movie.mp4', zip.getinfo(prefix + 'movie.mp4'))
+
+                if movie_index is not None:
+                    movie_indexes[prefix + 'movie.mp4'] = movie_index
+                zip.write(segment_dir / 'frames.jsonl', arcname=prefix + 'frames.jsonl')
+
+                sensors = {}
+
+                for name, info in segment_info['streams'].items():
+                    member = f'{prefix}sensors/{name}{TSSFileManager.SENSOR_FORMATS[sensor_format]}'
+                    self.__write_record(zip, segment_dir / 'sensors' / f'{name}.jsonl', member, sensor_format)
+                    sensors[name] = member
+
+                    stream = streams.setdefault(name, {'name': name, 'labels': info['labels'], 'count': 0})
+                    stream['count'] += info['count']
+
+                segments.append({
+                    'movie': prefix + 'movie.mp4',
+                    'frames': prefix + 'frames.jsonl',
+                    'frame_offset': segment_info['frame_offset'],
+                    'frame_count': segment_info['frame_count'],
+                    'sensors': sensors
+                })
+
+                # 格納し終えたセグメントから削除し、同時に2重に存在するデータを1セグメント分に抑える
+                if delete_original_files:
+                    shutil.rmtree(segment_dir)
+
+            zip.writestr('manifest.json', json.dumps({
+                'version': TSSFileManager.COLUMNAR_FORMAT_VERSION if sensor_format == 'columns'
+                else TSSFileManager.SEGMENTED_FORMAT_VERSION,
+                'streams': list(streams.values()),
+                'segments': segments
+            }, indent=4))
+
+            if metrics_file_path is not None:
+                zip.write(metrics_file_path, arcname='metrics.jsonl')
+
+            self.__write_keyframe_index(zip, movie_indexes)
+
+        self.__sensor_data.clear()
+
+        if delete_original_files:
+            shutil.rmtree(segments_dir_path)
+
+            if metrics_file_path is not None:
+                metrics_file_path.unlink()
+
+        return len(segments)
+
+    def __write_member(self, zip: zipfile.ZipFile, file_path: Path, arcname: str, compress_type: int) -> None:
+        """
+        ファイルをアーカイブへ1度の順次読み出しで書き込む
+
+        Parameters
+        ----------
+        zip : zipfile.ZipFile
+
+            書き込み先のアーカイブ
+
+        file_path : Path
+
+            書き込むファイルへのパス
+
+        arcname : str
+
+            アーカイブ内のファイル名
+
+        compress_type : int
+
+            圧縮方式(zipfile.ZIP_STOREDなど)
+        """
+        info = zipfile.ZipInfo.from_file(file_path, arcname=arcname)
+        info.compress_type = compress_type
+
+        # ZipInfo.file_sizeが設定されているため、4GiBを超える動画は自動的にZIP64形式で書き込まれる
+        with file_path.open(mode='rb') as src, zip.open(info, mode='w') as dest:
+            shutil.copyfileobj(src, dest, TSSFileManager.COPY_BUFFER_SIZE)
+
+    def __write_record(self, zip: zipfile.ZipFile, file_path: Path, arcname: str, sensor_format: str) -> None:
+        """
+        RecordWriterによって書き出された記録ファイルを、指定された形式でアーカイブへ書き込む
+
+        列形式の記録はチャンク毎に圧縮済みのため無圧縮で格納し、読み出し時に解凍せずに直接参照できるようにする。
+
+        Parameters
+        ----------
+        zip : zipfile.ZipFile
+
+            書き込み先のアーカイブ
+
+        file_path : Path
+
+            記録ファイルへのパス
+
+        arcname : str
+
+            アーカイブ内のファイル名
+
+        sensor_format : str
+
+            格納形式。SENSOR_FORMATSのキーのいずれか
+        """
+        if sensor_format not in TSSFileManager.SENSOR_FORMATS:
+            raise ValueError(f'unknown sensor format: {sensor_format}')
+
+        if sensor_format == 'jsonl':
+            zip.write(file_path, arcname=arcname)
+            return
+
+        info = zipfile.ZipInfo(arcname, date_time=zipfile.ZipInfo.from_file(file_path).date_time)
+        info.compress_type = zipfile.ZIP_STORED
+
+        # 変換後の大きさは事前に分からないため、大きな記録に備えて常にZIP64形式で書き込む
+        with file_path.open(encoding='utf-8') as src, zip.open(info, mode='w', force_zip64=True) as dest:
+            convert_record_file(src, dest)
+
+    @staticmethod
+    def __index_movie(movie_file_path: Path, info: zipfile.ZipInfo) -> Optional[Dict[str, Any]]:
+        """
+        動画のキーフレームの索引を作成する
+
+        Parameters
+        ----------
+        movie_file_path : Path
+
+            動画ファイルへのパス
+
+        info : zipfile.ZipInfo
+
+            アーカイブに格納された動画の情報。動画が置き換えられていないことの確認に用いる大きさとCRCを索引に記録する
+
+        Returns
+        ----------
+        index : Optional[Dict[str, Any]]
+
+            動画の索引。サンプル表を扱えない動画の場合はNone
+        """
+        try:
+            with movie_file_path.open(mode='rb') as f:
+                index = keyframe_index(f, movie_file_path.stat().st_size)
+        except UnsupportedMovieError:
+            return None
+
+        index.update(size=info.file_size, crc=info.CRC)
+
+        return index
+
+    @staticmethod
+    def __write_keyframe_index(zip: zipfile.ZipFile, movie_indexes: Dict[str, Dict[str, Any]]) -> None:
+        """
+        キーフレームの索引をアーカイブへ書き込む。索引を作成できた動画が無い場合は書き込まない
+        """
+        if len(movie_indexes) == 0:
+            return
+
+        zip.writestr(KEYFRAME_INDEX_MEMBER, json.dumps({
+            'version': KEYFRAME_INDEX_VERSION,
+            'movies': movie_indexes
+        }))
+
+    def build_keyframe_index(self, force: bool = False) -> int:
+        """
+        索引を持たない既存のファイルに、動画のキーフレームの索引を追加する
+
+        索引はアーカイブの末尾に追記される。古い索引を置き換える場合のみ、アーカイブ全体を同じフォルダ内の一時ファイルへ書き直す。
+
+        Parameters
+        ----------
+        force : bool
+
+            全ての動画の索引が最新である場合も作成し直すかどうか
+
+        Returns
+        ----------
+        indexed_count : int
+
+            索引を作成した動画の数。全ての索引が最新であった場合は0
+
+        Raises
+        ----------
+        FileNotFoundError
+
+            指定されているtssファイルが存在しないことを知らせる例外
+
+        UnsupportedMovieError
+
+            サンプル表を扱えず、索引を作成できない動画であることを知らせる例外
+        """
+        if not self.__file_path.exists():
+            raise FileNotFoundError()
+
+        segments = self.__segments()
+        movie_members = [segment['movie'] for segment in segments] if len(segments) > 0 else ['movie.mp4']
+
+        with zipfile.ZipFile(self.__file_path) as zip:
+            current_index = read_keyframe_index(zip)
+            has_index = KEYFRAME_INDEX_MEMBER in zip.namelist()
+
+            if not force and all(member in current_index for member in movie_members):
+                return 0
+
+            movie_indexes: Dict[str, Dict[str, Any]] = {}
+
+            for member in movie_members:
+                info = zip.getinfo(member)
+
+                if info.compress_type == zipfile.ZIP_STORED:
+                    with self.__file_path.open(mode='rb') as f:
+                        movie_index = keyframe_index(f, info.file_size, member_data_offset(self.__file_path, info))
+                else:
+                    with zip.open(info) as src, tempfile.TemporaryFile() as f:
+                        shutil.copyfileobj(src, f, TSSFileManager.COPY_BUFFER_SIZE)
+                        movie_index = keyframe_index(f, info.file_size)
+
+                movie_index.update(size=info.file_size, crc=info.CRC)
+                movie_indexes[member] = movie_index
+
+        if not has_index:
+            with zipfile.ZipFile(self.__file_path, 'a', compression=zipfile.ZIP_DEFLATED) as zip:
+                self.__write_keyframe_index(zip, movie_indexes)
+
+            return len(movie_indexes)
+
+        # zip形式では既存のメンバーを置き換えられないため、古い索引以外を書き写したアーカイブを作る
+        fd, temp_path = tempfile.mkstemp(prefix='~tss-index-', suffix='.tss', dir=self.__file_path.parent)
+        os.close(fd)
+
+        try:
+            with zipfile.ZipFile(self.__file_path) as src_zip, \
+                    zipfile.ZipFile(temp_path, 'w', compression=zipfile.ZIP_DEFLATED) as dest_zip:
+                for info in src_zip.infolist():
+                    if info.filename == KEYFRAME_INDEX_MEMBER:
+                        continue
+
+                    dest_info = zipfile.ZipInfo(info.filename, date_time=info.date_time)
+                    dest_info.compress_type = info.compress_type
+                    dest_info.external_attr = info.external_attr
+                    dest_info.file_size = info.file_size
+
+                    with src_zip.open(info) as src, dest_zip.open(dest_info, mode='w') as dest:
+                        shutil.copyfileobj(src, dest, TSSFileManager.COPY_BUFFER_SIZE)
+
+                self.__write_keyframe_index(dest_zip, movie_indexes)
+
+            os.replace(temp_path, self.__file_path)
+        except BaseException:
+            Path(temp_path).unlink(missing_ok=True)
+            raise
+
+        return len(movie_indexes)
 
     def extract(self, dir_path: Path, exists_ok: bool = False) -> None:
         """
@@ -103,33 +512,102 @@ class TSSFileManager:
         with zipfile.ZipFile(self.__file_path) as zip:
             zip.extractall(dir_path)
 
-        self.__extracted_file_path = dir_path
+    def read_manifest(self) -> Optional[Dict[str, Any]]:
+        """
+        アーカイブの構成を記したmanifest.jsonを読み込む
 
-    def exportAsCSV(self,
-                    file_path: Path,
-                    start_frame: Optional[int] = None,
-                    end_frame: Optional[int] = None,
-                    exists_ok: bool = False) -> None:
+        Returns
+        ----------
+        manifest : Optional[Dict[str, Any]]
+
+            アーカイブの構成。manifest.jsonを持たない古い形式のファイルの場合はNone
+
+        Raises
+        ----------
+        FileNotFoundError
+
+            指定されているtssファイルが存在しないことを知らせる例外
         """
-        計測データをCSV形式で出力する
+        if not self.__file_path.exists():
+            raise FileNotFoundError()
 
-        Parameters
+        with zipfile.ZipFile(self.__file_path) as zip:
+            if 'manifest.json' not in zip.namelist():
+                return None
+
+            with zip.open('manifest.json') as member:
+                return json.load(member)
+
+    def __segments(self) -> List[Dict[str, Any]]:
+        """
+        セグメントに分けて録画されたファイルの各セグメントの情報を取得する
+
+        Returns
         ----------
-        file_path : Path
+        segments : List[Dict[str, Any]]
 
-            出力先のファイルへのパス
+            セグメントの情報のリスト。セグメントに分けられていないファイルの場合は空
+        """
+        manifest = self.read_manifest()
 
-        start_frame : Optional[int]
+        if manifest is None:
+            return []
 
-            出力する範囲の開始フレーム番号
+        return manifest.get('segments', [])
 
-        end_frame : Optional[int]
+    def __stream_members(self) -> Dict[str, List[str]]:
+        """
+        ストリーム名と、その記録を持つアーカイブ内のファイル名の対応を求める
 
-            出力する範囲の終了フレーム番号
+        Returns
+        ----------
+        members : Dict[str, List[str]]
 
-        exists_ok : bool
+            ストリーム名をキーとし、アーカイブ内のファイル名のリストを値とする辞書。
+            セグメントに分けられている場合は、セグメントの順にファイル名が並ぶ
+        """
+        manifest = self.read_manifest()
 
-            指定されたファイルが存在している場合に上書きするかどうか
+        if manifest is not None and 'segments' in manifest:
+            return {stream['name']: [segment['sensors'][stream['name']] for segment in manifest['segments']
+                                     if stream['name'] in segment['sensors']]
+                    for stream in manifest['streams']}
+
+        if manifest is not None:
+            return {stream['name']: [stream['member']] for stream in manifest['streams']}
+
+        with zipfile.ZipFile(self.__file_path) as zip:
+            json_lines = 'data.jsonl' in zip.namelist()
+
+        return {TSSFileManager.LEGACY_STREAM_NAME: ['data.jsonl' if json_lines else 'data.json']}
+
+    def stream_names(self) -> List[str]:
+        """
+        記録されているセンサのストリーム名を取得する
+
+        Returns
+        ----------
+        stream_names : List[str]
+
+            ストリーム名のリスト。先頭のストリームがstreamを省略した場合に用いられる
+        """
+        return list(self.__stream_members().keys())
+
+    def read_record(self, stream: Optional[str] = None) -> Dict[str, Any]:
+        """
+        アーカイブを解凍せずに記録ファイルを読み込む
+
+        Parameters
+        ----------
+        stream : Optional[str]
+
+            読み込むストリーム名。Noneの場合は先頭のストリーム
+
+        Returns
+        ----------
+        record : Dict[str, Any]
+
+            labelsとdataをキーに持つ記録
 
         Raises
         ----------
@@ -137,100 +615,789 @@ class TSSFileManager:
 
             指定されているtssファイルが存在しないことを知らせる例外
 
-        AutoExtractFailedError
-
-            ~tempディレクトリが既に存在しており，自動解凍に失敗したことを知らせる例外
-
-        FileAlreadyExistsError
+        KeyError
 
-            出力先として指定されたファイルが既に存在していたことを知らせる例外     
+            指定されたストリームが存在しないことを知らせる例外
         """
-        if self.__extracted_file_path is None:
-            try:
-                self.extract(Path('~temp'), exists_ok=True)
-            except FileNotFoundError as e:
-                raise e
+        member_names = self.__member_names(stream)
 
-        with (self.__extracted_file_path / 'data.json').open(mode='r') as f:
-            data = json.load(f)
+        if self.__is_columnar(member_names):
+            sensor_data = self.sensor_data(stream)
+            frames = sensor_data.frames.tolist()
+            times = sensor_data.times.tolist() if sensor_data.times is not None else None
 
-        shutil.rmtree(Path('~temp'))
+            data = []
 
-        csv = ','.join(data['labels']) + '\n'
+            for i, row in enumerate(sensor_data.rows()):
+                data.append({'frame': frames[i], 'data': list(row)} if times is None else
+                            {'frame': frames[i], 'data': list(row), 'time': times[i]})
 
-        if start_frame is None:
-            start_frame = -1
+            return {'labels': list(sensor_data.labels), 'data': data}
 
-        if end_frame is None:
-            end_frame = data['data'][-1]['frame']
+        record: Dict[str, Any] = {'labels': [], 'data': []}
 
-        for record in data['data']:
-            if start_frame <= record['frame'] <= end_frame:
-                csv += ','.join(map(str, record['data'])) + '\n'
+        # セグメントに分けられている場合は、各セグメントの記録を順に連結する
+        with zipfile.ZipFile(self.__file_path) as zip:
+            for member_name in member_names:
+                with zip.open(member_name) as member:
+                    with io.TextIOWrapper(member, encoding='utf-8') as f:
+                        segment_record = read_record(f, json_lines=member_name.endswith('.jsonl'))
 
-        if file_path.exists() and not exists_ok:
-            raise TSSFileManager.FileAlreadyExistsError()
+                record['labels'] = segment_record['labels']
+                record['data'].extend(segment_record['data'])
 
-        with file_path.open(mode='w') as f:
-            f.write(csv)
+        return record
 
-    def exportAsMD(self, folder_path: Path, exists_ok: bool = False) -> None:
+    def sensor_data(self, stream: Optional[str] = None) -> SensorData:
         """
-        結果を.md形式で出力する
+        計測データを列指向の形式で取得する
+
+        一度読み込んだデータは保持され、2回目以降は再利用される。
 
         Parameters
         ----------
-        folder_path : Path
+        stream : Optional[str]
 
-            出力先のフォルダへのパス
+            取得するストリーム名。Noneの場合は先頭のストリーム
 
-        exists_ok : bool
+        Returns
+        ----------
+        sensor_data : SensorData
 
-            出力先として指定されたフォルダが既に存在している場合に上書きするか
+            フレーム番号の配列とラベル毎の配列を持つ計測データ
+
+        Raises
+        ----------
+        FileNotFoundError
+
+            指定されているtssファイルが存在しないことを知らせる例外
         """
-        if self.__extracted_file_path is None:
-            try:
-                self.extract(Path('~temp'), exists_ok=True)
-            except FileNotFoundError as e:
-                raise e
+        if stream is None:
+            stream = self.stream_names()[0]
 
-        if (folder_path / 'img').is_dir() or (folder_path / (self.__file_path.stem + '.md')).is_file():
-            if exists_ok:
-                shutil.rmtree((folder_path / 'img'), ignore_errors=True)
-                (folder_path / (self.__file_path.stem + '.md')).unlink(missing_ok=True)
+        if stream not in self.__sensor_data:
+            member_names = self.__member_names(stream)
+
+            if self.__is_columnar(member_names):
+                self.__sensor_data[stream] = self.__concatenate(self.__read_columns(member_names,
+                                                                                    lambda reader: reader.read()))
             else:
-                shutil.rmtree('~temp')
-                raise TSSFileManager.FileAlreadyExistsError()
+                self.__sensor_data[stream] = SensorData.from_record(self.read_record(stream))
 
-        (folder_path / 'img').mkdir(exist_ok=True)
+        return self.__sensor_data[stream]
 
-        with (self.__extracted_file_path / 'data.json').open(mode='r') as f:
-            data = json.load(f)
+    def read_sensor_data(self,
+                         stream: Optional[str] = None,
+                         start_frame: Optional[int] = None,
+                         end_frame: Optional[int] = None,
+                         where: Optional[Dict[str, Tuple[Optional[float], Optional[float]]]] = None) -> SensorData:
+        """
+        条件に合う計測データのみを読み込む
 
-        video_capture = cv2.VideoCapture(
-            str(self.__extracted_file_path / 'movie.mp4'))
+        列形式で格納された記録では、各チャンクのフレーム番号の範囲と値の最小値・最大値から
+        条件に合う記録を含まないチャンクを展開せずに読み飛ばす。それ以外の形式ではsensor_dataから取り出す。
 
-        with (folder_path / (self.__file_path.stem + '.md')).open(mode='w') as f:
-            f.write('# ' + self.__file_path.stem + '\n')
+        Parameters
+        ----------
+        stream : Optional[str]
 
-            for record in data['data']:
-                frame_no = record['frame']
+            取得するストリーム名。Noneの場合は先頭のストリーム
 
-                video_capture.set(cv2.CAP_PROP_POS_FRAMES, frame_no)
+        start_frame : Optional[int]
 
-                _, frame = video_capture.read()
+            範囲の開始フレーム番号。Noneの場合は先頭から
 
-                cv2.imwrite(
-                    str(folder_path / f'img/frame{frame_no}.png'), frame)
+        end_frame : Optional[int]
 
-                f.write(f'## frame{frame_no}\n')
+            範囲の終了フレーム番号(このフレームを含む)。Noneの場合は末尾まで
 
-                f.write(f'![frame{frame_no}](img/frame{frame_no}.png)\n')
+        where : Optional[Dict[str, Tuple[Optional[float], Optional[float]]]]
 
-                f.write('|{}|\n'.format('|'.join(data['labels'])))
-                f.write('| :--- |' + ' :--- |' *
-                        (len(data['labels']) - 1) + '\n')
-                f.write('|{}|\n'.format('|'.join(map(str, record['data']))))
+            ラベルと、値の下限・上限(どちらも含む。Noneの場合は制限しない)の組。全ての条件を満たす記録のみを取得する
 
-        video_capture.release()
-        shutil.rmtree('~temp')
+        Returns
+        ----------
+        sensor_data : SensorData
+
+            条件に合う計測データ
+
+        Raises
+        ----------
+        FileNotFoundError
+
+            指定されているtssファイルが存在しないことを知らせる例外
+        """
+        if stream is None:
+            stream = self.stream_names()[0]
+
+        member_names = self.__member_names(stream)
+
+        # 全体を読み込み済みの場合や、列形式ではない場合は読み込んだデータから取り出す
+        if stream in self.__sensor_data or not self.__is_columnar(member_names):
+            sensor_data = self.sensor_data(stream).frame_range(start_frame, end_frame)
+
+            if where:
+                mask = np.ones(len(sensor_data), dtype=bool)
+
+                for label, (lower, upper) in where.items():
+                    if lower is not None:
+                        mask &= sensor_data[label] >= lower
+                    if upper is not None:
+                        mask &= sensor_data[label] <= upper
+
+                sensor_data = sensor_data.filter(mask)
+
+            return sensor_data
+
+        return self.__concatenate(self.__read_columns(member_names,
+                                                      lambda reader: reader.read(start_frame, end_frame, where)))
+
+    def sensor_summary(self, stream: Optional[str] = None) -> Dict[str, Any]:
+        """
+        計測データのラベル・件数と、数値のラベル毎の最小値・最大値・平均値を取得する
+
+        列形式で格納された記録では、チャンク毎の統計値から記録を展開せずに求める。
+
+        Parameters
+        ----------
+        stream : Optional[str]
+
+            取得するストリーム名。Noneの場合は先頭のストリーム
+
+        Returns
+        ----------
+        summary : Dict[str, Any]
+
+            labels・sample_count・statsをキーに持つ辞書。statsはラベル毎の最小値・最大値・平均値の組
+        """
+        if stream is None:
+            stream = self.stream_names()[0]
+
+        member_names = self.__member_names(stream)
+
+        if not self.__is_columnar(member_names) or stream in self.__sensor_data:
+            sensor_data = self.sensor_data(stream)
+
+            stats: Dict[str, Tuple[Any, Any, Any]] = {}
+
+            if len(sensor_data) > 0:
+                for label in sensor_data.labels:
+                    column = sensor_data[label]
+
+                    if not np.issubdtype(column.dtype, np.number):
+                        continue
+
+                    # 列形式の統計値と同様にNaNは無視する
+                    values = column[np.isfinite(column)] if column.dtype.kind == 'f' else column
+
+                    if values.size == 0:
+                        stats[label] = (None, None, None)
+                    else:
+                        stats[label] = (values.min().item(), values.max().item(), values.mean().item())
+
+            return {'labels': list(sensor_data.labels), 'sample_count': len(sensor_data), 'stats': stats}
+
+        summaries = self.__read_columns(member_names, lambda reader: (reader.labels, reader.count, reader.chunks))
+
+        labels = list(summaries[0][0])
+        sample_count = sum(count for _, count, _ in summaries)
+
+        # セグメント毎のチャンクの統計値をまとめて結合する
+        stats = merge_statistics(labels, [chunk for _, _, chunks in summaries for chunk in chunks])
+
+        return {'labels': labels, 'sample_count': sample_count, 'stats': stats}
+
+    def __member_names(self, stream: Optional[str]) -> List[str]:
+        """
+        ストリームの記録を持つアーカイブ内のファイル名を取得する
+
+        Parameters
+        ----------
+        stream : Optional[str]
+
+            ストリーム名。Noneの場合は先頭のストリーム
+
+        Returns
+        ----------
+        member_names : List[str]
+
+            アーカイブ内のファイル名のリスト
+        """
+        members = self.__stream_members()
+
+        return members[stream] if stream is not None else next(iter(members.values()))
+
+    @staticmethod
+    def __is_columnar(member_names: List[str]) -> bool:
+        """
+        記録が列形式で格納されているか判定する
+        """
+        return len(member_names) > 0 and all(name.endswith(TSSFileManager.SENSOR_FORMATS['columns'])
+                                             for name in member_names)
+
+    def __read_columns(self, member_names: List[str], function: Any) -> List[Any]:
+        """
+        列形式の記録を順に開き、それぞれに関数を適用する
+
+        無圧縮で格納された記録はアーカイブから直接読み、必要なチャンクのみを読み出す。
+
+        Parameters
+        ----------
+        member_names : List[str]
+
+            アーカイブ内のファイル名のリスト
+
+        function : Callable[[ColumnReader], Any]
+
+            各記録のColumnReaderを受け取る関数
+
+        Returns
+        ----------
+        results : List[Any]
+
+            記録毎の関数の戻り値
+        """
+        results = []
+
+        with zipfile.ZipFile(self.__file_path) as zip, ExitStack() as stack:
+            archive = None
+
+            for member_name in member_names:
+                info = zip.getinfo(member_name)
+
+                if info.compress_type == zipfile.ZIP_STORED:
+                    if archive is None:
+                        archive = stack.enter_context(self.__file_path.open(mode='rb'))
+
+                    reader = ColumnReader(archive, member_data_offset(self.__file_path, info))
+                else:
+                    # 再圧縮されたアーカイブでは、記録全体を展開してから読む
+                    reader = ColumnReader(io.BytesIO(zip.read(info)))
+
+                results.append(function(reader))
+
+        return results
+
+    @staticmethod
+    def __concatenate(parts: List[SensorData]) -> SensorData:
+        """
+        セグメント毎に読み込んだ計測データを連結する
+        """
+        # 該当する記録の無いセグメントは配列の型が定まらないため、連結から除く
+        parts = [part for part in parts if len(part) > 0] or parts[:1]
+
+        if len(parts) == 1:
+            return parts[0]
+
+        first = parts[0]
+
+        return SensorData(first.labels,
+                          np.concatenate([part.frames for part in parts]),
+                          {label: np.concatenate([part[label] for part in parts]) for label in first.labels},
+                          None if first.times is None else np.concatenate([part.times for part in parts]))
+
+    def joined_sensor_data(self,
+                           streams: Optional[Sequence[str]] = None,
+                           on: Optional[str] = None) -> SensorData:
+        """
+        複数のストリームを時刻で揃えて結合した計測データを取得する
+
+        基準となるストリームの各記録に対し、他のストリームからはその時刻以前で最新の記録が対応付けられる。
+        ラベルは'ストリーム名.ラベル'となる。
+
+        Parameters
+        ----------
+        streams : Optional[Sequence[str]]
+
+            結合するストリーム名。Noneの場合は全てのストリーム
+
+        on : Optional[str]
+
+            基準となるストリーム名。Noneの場合はstreamsの先頭
+
+        Returns
+        ----------
+        sensor_data : SensorData
+
+            結合された計測データ
+        """
+        if streams is None:
+            streams = self.stream_names()
+
+        if on is None:
+            on = streams[0]
+
+        return join_sensor_data({stream: self.sensor_data(stream) for stream in streams}, on)
+
+    def frame_index(self) -> Optional[FrameIndex]:
+        """
+        各フレームの撮影時刻の索引を取得する
+
+        Returns
+        ----------
+        frame_index : Optional[FrameIndex]
+
+            フレームと時刻を対応付ける索引。撮影時刻が記録されていないファイルの場合はNone
+
+        Raises
+        ----------
+        FileNotFoundError
+
+            指定されているtssファイルが存在しないことを知らせる例外
+        """
+        if not self.__file_path.exists():
+            raise FileNotFoundError()
+
+        segments = self.__segments()
+
+        if len(segments) > 0:
+            member_names = [segment['frames'] for segment in segments]
+        else:
+            member_names = ['frames.jsonl']
+
+        timestamps: List[int] = []
+
+        with zipfile.ZipFile(self.__file_path) as zip:
+            if any(member_name not in zip.namelist() for member_name in member_names):
+                return None
+
+            for member_name in member_names:
+                with zip.open(member_name) as member:
+                    with io.TextIOWrapper(member, encoding='utf-8') as f:
+                        timestamps.extend(read_json_lines(f)[1])
+
+        return FrameIndex(np.asarray(timestamps, dtype=np.int64))
+
+    def read_metrics(self) -> Optional[List[Dict[str, Any]]]:
+        """
+        録画中に記録された計測値を読み込む
+
+        Returns
+        ----------
+        metrics : Optional[List[Dict[str, Any]]]
+
+            一定の間隔で記録された計測値のリスト。計測値が記録されていないファイルの場合はNone
+
+        Raises
+        ----------
+        FileNotFoundError
+
+            指定されているtssファイルが存在しないことを知らせる例外
+        """
+        if not self.__file_path.exists():
+            raise FileNotFoundError()
+
+        with zipfile.ZipFile(self.__file_path) as zip:
+            if 'metrics.jsonl' not in zip.namelist():
+                return None
+
+            with zip.open('metrics.jsonl') as member:
+                with io.TextIOWrapper(member, encoding='utf-8') as f:
+                    _, entries = read_json_lines(f)
+
+        return entries
+
+    def open_video(self) -> Union[VideoReader, SegmentedVideoReader]:
+        """
+        アーカイブを解凍せずに動画を開く
+
+        セグメントに分けて録画されたファイルの場合は、全てのセグメントを連続した1つの動画として開く。
+
+        Returns
+        ----------
+        video_reader : Union[VideoReader, SegmentedVideoReader]
+
+            動画を読み出すためのクラス。使用後はreleaseする必要がある
+
+        Raises
+        ----------
+        FileNotFoundError
+
+            指定されているtssファイルが存在しないことを知らせる例外
+        """
+        if not self.__file_path.exists():
+            raise FileNotFoundError()
+
+        # 動画を扱う場合のみcv2を読み込む
+        from tss.video import open_archive_video
+
+        return open_archive_video(self.__file_path)
+
+    def exportClip(self,
+                   file_path: Path,
+                   start_frame: int,
+                   end_frame: Optional[int] = None,
+                   exists_ok: bool = False) -> Dict[str, int]:
+        """
+        指定されたフレーム範囲を、新しい.tss形式のファイルとして出力する
+
+        出力されるファイルのフレーム番号はstart_frameを0として数え直され、
+        全てのストリームの記録とフレームの撮影時刻も範囲内のもののみが同じ番号で保存される。
+        動画は範囲内の最初のキーフレーム以降を復号せずに書き写し、それより前の不完全なGOPのみを再エンコードする。
+
+        Parameters
+        ----------
+        file_path : Path
+
+            出力先の.tss形式のファイルへのパス
+
+        start_frame : int
+
+            範囲の開始フレーム番号
+
+        end_frame : Optional[int]
+
+            範囲の終了フレーム番号(このフレームを含む)。Noneの場合は末尾まで
+
+        exists_ok : bool
+
+            指定されたファイルが存在している場合に上書きするかどうか
+
+        Returns
+        ----------
+        result : Dict[str, int]
+
+            出力したフレーム数(frame_count)と、そのうち書き写したフレーム数(copied_frames)・
+            再エンコードしたフレーム数(encoded_frames)
+
+        Raises
+        ----------
+        FileNotFoundError
+
+            指定されているtssファイルが存在しないことを知らせる例外
+
+        FileAlreadyExistsError
+
+            出力先として指定されたファイルが既に存在していたことを知らせる例外
+
+        ValueError
+
+            開始フレーム番号が負である、もしくは範囲に含まれるフレームが無いことを知らせる例外
+        """
+        if not self.__file_path.exists():
+            raise FileNotFoundError()
+
+        if file_path.exists() and not exists_ok:
+            raise TSSFileManager.FileAlreadyExistsError()
+
+        if start_frame < 0:
+            raise ValueError(f'negative start frame: {start_frame}')
+
+        # 動画を扱う場合のみcv2を読み込む
+        from tss.clip import clip_movie
+
+        with tempfile.TemporaryDirectory(prefix='~tss-clip-', dir=file_path.parent) as temp_dir:
+            temp_path = Path(temp_dir)
+
+            result = clip_movie(self.__file_path, start_frame, np.iinfo(np.int64).max if end_frame is None else end_frame,
+                                temp_path / 'movie.mp4', temp_path)
+
+            frame_count = result['copied_frames'] + result['encoded_frames']
+            last_frame = start_frame + frame_count - 1
+
+            frame_index_file_path = None
+            frame_index = self.frame_index()
+
+            if frame_index is not None:
+                frame_index_file_path = temp_path / 'frames.jsonl'
+
+                with FrameIndexWriter(frame_index_file_path) as frame_index_writer:
+                    for timestamp in frame_index.timestamps[start_frame:last_frame + 1].tolist():
+                        frame_index_writer.write(timestamp)
+
+            record_file_paths: Dict[str, Path] = {}
+            stream_info: Dict[str, Dict[str, Any]] = {}
+
+            for stream in self.stream_names():
+                sensor_data = self.read_sensor_data(stream, start_frame, last_frame)
+
+                record_file_path = temp_path / f'{stream}.jsonl'
+                times = sensor_data.times.tolist() if sensor_data.times is not None else [None] * len(sensor_data)
+
+                with RecordWriter(record_file_path, sensor_data.labels) as record_writer:
+                    for frame, timestamp, row in zip((sensor_data.frames - start_frame).tolist(), times,
+                                                     sensor_data.rows()):
+                        record_writer.write(frame, row, timestamp)
+
+                record_file_paths[stream] = record_file_path
+                stream_info[stream] = record_writer.summary()
+
+            TSSFileManager(file_path).save(temp_path / 'movie.mp4', record_file_paths,
+                                           delete_original_files=False,
+                                           frame_index_file_path=frame_index_file_path,
+                                           stream_info=stream_info)
+
+        result['frame_count'] = frame_count
+
+        return result
+
+    def __export_data(self,
+                      stream: Optional[str],
+                      start_frame: Optional[int],
+                      end_frame: Optional[int],
+                      aggregate: Optional[Sequence[str]],
+                      interval: Optional[float]) -> SensorData:
+        """
+        出力する範囲の計測データを取得し、指定された場合は集計する
+
+        Parameters
+        ----------
+        stream : Optional[str]
+
+            ストリーム名。Noneの場合は先頭のストリーム
+
+        start_frame : Optional[int]
+
+            範囲の開始フレーム番号
+
+        end_frame : Optional[int]
+
+            範囲の終了フレーム番号
+
+        aggregate : Optional[Sequence[str]]
+
+            集計方法。Noneの場合は集計しない
+
+        interval : Optional[float]
+
+            集計する区間の長さ(秒)。Noneの場合はフレーム毎に集計する
+
+        Returns
+        ----------
+        sensor_data : SensorData
+
+            出力する計測データ
+        """
+        sensor_data = self.read_sensor_data(stream, start_frame, end_frame)
+
+        if aggregate is None:
+            return sensor_data
+
+        return sensor_data.resample(aggregate, interval=None if interval is None else int(interval * 1e9))
+
+    def exportAsCSV(self,
+                    file_path: Path,
+                    start_frame: Optional[int] = None,
+                    end_frame: Optional[int] = None,
+                    exists_ok: bool = False,
+                    stream: Optional[str] = None,
+                    aggregate: Optional[Sequence[str]] = None,
+                    interval: Optional[float] = None) -> None:
+        """
+        計測データをCSV形式で出力する
+
+        aggregateを指定した場合は、フレーム毎もしくはinterval秒毎に集計した結果を、
+        フレーム番号(時間毎の場合は区間の開始時刻も)の列と共に出力する。
+
+        Parameters
+        ----------
+        file_path : Path
+
+            出力先のファイルへのパス
+
+        start_frame : Optional[int]
+
+            出力する範囲の開始フレーム番号
+
+        end_frame : Optional[int]
+
+            出力する範囲の終了フレーム番号
+
+        exists_ok : bool
+
+            指定されたファイルが存在している場合に上書きするかどうか
+
+        stream : Optional[str]
+
+            出力するストリーム名。Noneの場合は先頭のストリーム
+
+        aggregate : Optional[Sequence[str]]
+
+            集計方法(SensorData.RESAMPLE_FUNCTIONSの要素)。Noneの場合は集計せずに全ての記録を出力する
+
+        interval : Optional[float]
+
+            集計する区間の長さ(秒)。Noneの場合はフレーム毎に集計する
+
+        Raises
+        ----------
+        FileNotFoundError
+
+            指定されているtssファイルが存在しないことを知らせる例外
+
+        FileAlreadyExistsError
+
+            出力先として指定されたファイルが既に存在していたことを知らせる例外
+        """
+        if file_path.exists() and not exists_ok:
+            raise TSSFileManager.FileAlreadyExistsError()
+
+        sensor_data = self.__export_data(stream, start_frame, end_frame, aggregate, interval)
+
+        with file_path.open(mode='w', newline='') as f:
+            writer = csv.writer(f, lineterminator='\n')
+
+            if aggregate is None:
+                writer.writerow(sensor_data.labels)
+            elif sensor_data.times is None:
+                writer.writerow(('frame',) + sensor_data.labels)
+            else:
+                writer.writerow(('frame', 'time') + sensor_data.labels)
+
+            # 全体を文字列として組み立てずに、一定件数ずつ書き出す
+            for start in range(0, len(sensor_data), TSSFileManager.EXPORT_CHUNK_SIZE):
+                chunk = sensor_data.take(slice(start, start + TSSFileManager.EXPORT_CHUNK_SIZE))
+
+                if aggregate is None:
+                    writer.writerows(chunk.rows())
+                elif chunk.times is None:
+                    writer.writerows(zip(chunk.frames.tolist(), *(chunk[label].tolist() for label in chunk.labels)))
+                else:
+                    writer.writerows(zip(chunk.frames.tolist(), chunk.times.tolist(),
+                                         *(chunk[label].tolist() for label in chunk.labels)))
+
+    def exportAsNPZ(self,
+                    file_path: Path,
+                    start_frame: Optional[int] = None,
+                    end_frame: Optional[int] = None,
+                    compressed: bool = False,
+                    exists_ok: bool = False,
+                    stream: Optional[str] = None,
+                    aggregate: Optional[Sequence[str]] = None,
+                    interval: Optional[float] = None) -> None:
+        """
+        計測データをNumPyの.npz形式で出力する
+
+        フレーム番号が'frame'として、各ラベルのデータがラベル名で格納される。
+        numpy.loadで読み込むことができる。
+        aggregateを指定した場合は集計した結果が格納され、時間毎の場合は区間の開始時刻が'time'として格納される。
+
+        Parameters
+        ----------
+        file_path : Path
+
+            出力先のファイルへのパス
+
+        start_frame : Optional[int]
+
+            出力する範囲の開始フレーム番号
+
+        end_frame : Optional[int]
+
+            出力する範囲の終了フレーム番号
+
+        compressed : bool
+
+            圧縮して保存するかどうか
+
+        exists_ok : bool
+
+            指定されたファイルが存在している場合に上書きするかどうか
+
+        stream : Optional[str]
+
+            出力するストリーム名。Noneの場合は先頭のストリーム
+
+        aggregate : Optional[Sequence[str]]
+
+            集計方法(SensorData.RESAMPLE_FUNCTIONSの要素)。Noneの場合は集計せずに全ての記録を出力する
+
+        interval : Optional[float]
+
+            集計する区間の長さ(秒)。Noneの場合はフレーム毎に集計する
+
+        Raises
+        ----------
+        FileNotFoundError
+
+            指定されているtssファイルが存在しないことを知らせる例外
+
+        FileAlreadyExistsError
+
+            出力先として指定されたファイルが既に存在していたことを知らせる例外
+        """
+        if file_path.exists() and not exists_ok:
+            raise TSSFileManager.FileAlreadyExistsError()
+
+        sensor_data = self.__export_data(stream, start_frame, end_frame, aggregate, interval)
+
+        arrays = {'frame': sensor_data.frames}
+
+        if aggregate is not None and sensor_data.times is not None:
+            arrays['time'] = sensor_data.times
+
+        arrays.update(sensor_data.columns)
+
+        with file_path.open(mode='wb') as f:
+            if compressed:
+                np.savez_compressed(f, **arrays)
+            else:
+                np.savez(f, **arrays)
+
+    def exportAsMD(self,
+                   folder_path: Path,
+                   exists_ok: bool = False,
+                   image_format: str = 'png',
+                   workers: Optional[int] = None,
+                   processes: int = 1) -> None:
+        """
+        結果を.md形式で出力する
+
+        動画は1度だけ順にデコードされ、同じフレームで受信した記録は同じ画像を参照する。
+
+        Parameters
+        ----------
+        folder_path : Path
+
+            出力先のフォルダへのパス
+
+        exists_ok : bool
+
+            出力先として指定されたフォルダが既に存在している場合に上書きするか
+
+        image_format : str
+
+            フレーム画像の形式。'png'もしくは'jpg'
+
+        workers : Optional[int]
+
+            画像のエンコードを行うスレッド数。Noneの場合は自動で決定される
+
+        processes : int
+
+            動画のデコードを分担するプロセス数
+        """
+        from tss.frameexport import export_frames, image_name
+
+        if (folder_path / 'img').is_dir() or (folder_path / (self.__file_path.stem + '.md')).is_file():
+            if exists_ok:
+                shutil.rmtree((folder_path / 'img'), ignore_errors=True)
+                (folder_path / (self.__file_path.stem + '.md')).unlink(missing_ok=True)
+            else:
+                raise TSSFileManager.FileAlreadyExistsError()
+
+        (folder_path / 'img').mkdir(exist_ok=True)
+
+        sensor_data = self.sensor_data()
+
+        # 最初のフレームより前に受信した記録は最初のフレームの画像を参照する
+        video_frames = np.maximum(sensor_data.frames, 0)
+
+        export_frames(self.__file_path, video_frames, folder_path / 'img',
+                      image_format=image_format, workers=workers, processes=processes)
+
+        header = '|{}|\n'.format('|'.join(sensor_data.labels)) + \
+            '| :--- |' + ' :--- |' * (len(sensor_data.labels) - 1) + '\n'
+
+        with (folder_path / (self.__file_path.stem + '.md')).open(mode='w') as f:
+            f.write('# ' + self.__file_path.stem + '\n')
+
+            for frame_no, video_frame_no, row in zip(sensor_data.frames.tolist(),
+                                                     video_frames.tolist(),
+                                                     sensor_data.rows()):
+                image = 'img/' + image_name(video_frame_no, image_format)
+
+                f.write(f'## frame{frame_no}\n')
+                f.write(f'![frame{frame_no}]({image})\n')
+                f.write(header)
+                f.write('|{}|\n'.format('|'.join(map(str, row))))
@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import cv2
+import numpy as np
+import os
+
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from tss.video import open_archive_video
+from typing import Deque, Dict, List, Optional, Sequence
+
+
+# 画像形式毎のcv2.imwriteに与えるパラメータ
+IMAGE_WRITE_PARAMS: Dict[str, List[int]] = {
+    'png': [cv2.IMWRITE_PNG_COMPRESSION, 1],
+    'jpg': [cv2.IMWRITE_JPEG_QUALITY, 90]
+}
+
+
+def image_name(frame_no: int, image_format: str) -> str:
+    """
+    フレーム画像のファイル名を返す
+
+    Parameters
+    ----------
+    frame_no : int
+
+        フレーム番号
+
+    image_format : str
+
+        画像形式
+
+    Returns
+    ----------
+    name : str
+
+        画像のファイル名
+    """
+    return f'frame{frame_no}.{image_format}'
+
+
+def export_frames(archive_path: Path,
+                  frame_numbers: Sequence[int],
+                  output_dir: Path,
+                  image_format: str = 'png',
+                  workers: Optional[int] = None,
+                  processes: int = 1) -> List[int]:
+    """
+    .tss形式のファイル内の動画から、指定されたフレームを画像として書き出す
+
+    動画は先頭から1度だけ順にデコードされ、各フレームは1度だけ取り出される。
+    画像のエンコードはスレッドプールで並列に行われる。
+    processesが2以上の場合は、フレーム範囲を分割して複数のプロセスで処理する。
+
+    Parameters
+    ----------
+    archive_path : Path
+
+        tss形式のファイルへのパス
+
+    frame_numbers : Sequence[int]
+
+        書き出すフレーム番号。重複していても1度だけ書き出される
+
+    output_dir : Path
+
+        画像の出力先のフォルダへのパス
+
+    image_format : str
+
+        画像形式。IMAGE_WRITE_PARAMSのキーのいずれか
+
+    workers : Optional[int]
+
+        各プロセスでエンコードを行うスレッド数。Noneの場合は自動で決定される
+
+    processes : int
+
+        デコードを分担するプロセス数
+
+    Returns
+    ----------
+    exported_frames : List[int]
+
+        書き出すことができたフレーム番号
+    """
+    targets = np.unique(np.asarray(frame_numbers, dtype=np.int64)).tolist()
+
+    if processes <= 1 or len(targets) < processes:
+        return _export_frame_range(archive_path, targets, output_dir, image_format, workers)
+
+    # 連続したフレーム範囲毎にプロセスへ割り当てる
+    ranges = [chunk.tolist() for chunk in np.array_split(np.asarray(targets), processes)]
+
+    exported_frames: List[int] = []
+
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        futures = [executor.submit(_export_frame_range, archive_path, frame_range,
+                                   output_dir, image_format, workers)
+                   for frame_range in ranges]
+
+        for future in futures:
+            exported_frames.extend(future.result())
+
+    return exported_frames
+
+
+def _export_frame_range(archive_path: Path,
+                        frame_numbers: List[int],
+                        output_dir: Path,
+                        image_format: str,
+                        workers: Optional[int]) -> List[int]:
+    """
+    昇順に並んだフレームを順にデコードし、スレッドプールで画像として書き出す
+
+    Parameters
+    ----------
+    archive_path : Path
+
+        tss形式のファイルへのパス
+
+    frame_numbers : List[int]
+
+        書き出すフレーム番号
+
+    output_dir : Path
+
+        画像の出力先のフォルダへのパス
+
+    image_format : str
+
+        画像形式
+
+    workers : Optional[int]
+
+        エンコードを行うスレッド数
+
+    Returns
+    ----------
+    exported_frames : List[int]
+
+        書き出すことができたフレーム番号
+    """
+    params = IMAGE_WRITE_PARAMS[image_format]
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    exported_frames: List[int] = []
+
+    with ThreadPoolExecutor(max_workers=workers) as executor, open_archive_video(archive_path) as video_reader:
+        # デコード済みのフレームがメモリに溜まり過ぎないよう、未完了のエンコード数を制限する
+        max_pending = workers * 2
+        pending: Deque[Future] = deque()
+
+        for frame_no, frame in video_reader.read_frames(frame_numbers):
+            if len(pending) >= max_pending:
+                pending.popleft().result()
+
+            pending.append(executor.submit(
+                cv2.imwrite, str(output_dir / image_name(frame_no, image_format)), frame, params))
+
+            exported_frames.append(frame_no)
+
+        for future in pending:
+            future.result()
+
+    return exported_frames
@@ -0,0 +1,105 @@
+import threading
+import tkinter as tk
+import tkinter.ttk as ttk
+
+from collections import deque
+from tss.sensor import Sample
+from typing import Deque, List, Tuple
+
+
+class LogView(ttk.Treeview):
+    """
+    直近のセンサからの入力のみを表示するログ画面
+
+    入力は任意のスレッドからリングバッファへ追加され、
+    画面は一定の間隔でTkのスレッドからまとめて更新される。
+    表示される行数は最大max_rows行に保たれるため、録画時間に関わらず更新の負荷は一定である。
+    """
+
+    def __init__(self,
+                 master: tk.Misc,
+                 labels: Tuple[str, ...],
+                 max_rows: int = 200,
+                 refresh_interval: int = 100) -> None:
+        """
+        Parameters
+        ----------
+        master : tk.Misc
+
+            親ウィジェット
+
+        labels : Tuple[str, ...]
+
+            表示するデータのラベル
+
+        max_rows : int
+
+            表示する最大の行数
+
+        refresh_interval : int
+
+            画面を更新する間隔(ミリ秒)
+        """
+        super().__init__(master)
+
+        self.__max_rows = max_rows
+        self.__refresh_interval = refresh_interval
+
+        self.__buffer: Deque[Tuple] = deque(maxlen=max_rows)
+        self.__lock = threading.Lock()
+
+        # 前回の更新以降に追加された入力の件数
+        self.__pending_count = 0
+
+        self['columns'] = tuple(
+            [i for i in range(len(labels))])
+        self['show'] = 'headings'
+
+        for index, label in enumerate(labels):
+            self.column(index, width=75)
+            self.heading(index, text=label)
+
+        self.after(self.__refresh_interval, self.__refresh)
+
+    def push(self, samples: List[Sample]) -> None:
+        """
+        入力を追加する。任意のスレッドから呼び出すことができる
+
+        Parameters
+        ----------
+        samples : List[Sample]
+
+            受信時刻の付いたセンサからの入力
+        """
+        with self.__lock:
+            for sample in samples:
+                self.__buffer.append(sample.data)
+
+            self.__pending_count += len(samples)
+
+    def __refresh(self) -> None:
+        """
+        前回の更新以降に追加された入力をまとめて画面へ反映する
+        """
+        with self.__lock:
+            pending_count = min(self.__pending_count, self.__max_rows)
+            self.__pending_count = 0
+
+            rows = list(self.__buffer)[len(self.__buffer) - pending_count:]
+
+        if pending_count > 0:
+            children = self.get_children()
+
+            # 行数が上限を超える分だけ古い行を削除する
+            overflow = len(children) + pending_count - self.__max_rows
+
+            if overflow > 0:
+                self.delete(*children[:overflow])
+
+            item = ''
+            for row in rows:
+                item = self.insert('', 'end', values=row)
+
+            self.see(item)
+
+        self.after(self.__refresh_interval, self.__refresh)
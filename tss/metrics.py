@@ -0,0 +1,224 @@
+from __future__ import annotations
+
+import threading
+import time
+
+from collections import deque
+from pathlib import Path
+from tss.record import JsonLinesWriter
+from typing import Any, Callable, Deque, Dict, Optional
+
+
+class RateMeter:
+    """
+    直近の一定時間に発生した事象の頻度を求めるクラス
+    """
+
+    def __init__(self, window: float = 1.0) -> None:
+        """
+        Parameters
+        ----------
+        window : float
+
+            頻度を求める時間幅(秒)
+        """
+        self.__window = int(window * 1e9)
+
+        self.__timestamps: Deque[int] = deque()
+        self.__count = 0
+        self.__lock = threading.Lock()
+
+    @property
+    def count(self) -> int:
+        """
+        Returns
+        ----------
+        count : int
+
+            これまでに発生した事象の総数
+        """
+        return self.__count
+
+    def mark(self, timestamp: Optional[int] = None) -> None:
+        """
+        事象の発生を記録する
+
+        Parameters
+        ----------
+        timestamp : Optional[int]
+
+            発生時刻(time.monotonic_nsの値)。Noneの場合は現在時刻
+        """
+        if timestamp is None:
+            timestamp = time.monotonic_ns()
+
+        with self.__lock:
+            self.__timestamps.append(timestamp)
+            self.__count += 1
+
+            self.__expire(timestamp)
+
+    def __expire(self, now: int) -> None:
+        """
+        時間幅から外れた記録を捨てる
+        """
+        while self.__timestamps and self.__timestamps[0] < now - self.__window:
+            self.__timestamps.popleft()
+
+    @property
+    def rate(self) -> float:
+        """
+        Returns
+        ----------
+        rate : float
+
+            直近の時間幅における1秒あたりの発生数
+        """
+        with self.__lock:
+            self.__expire(time.monotonic_ns())
+
+            if len(self.__timestamps) < 2:
+                return 0.0
+
+            span = self.__timestamps[-1] - self.__timestamps[0]
+
+            return (len(self.__timestamps) - 1) * 1e9 / span if span > 0 else 0.0
+
+
+class LatencyMeter:
+    """
+    直近の一定件数の処理時間を保持し、統計値を求めるクラス
+    """
+
+    def __init__(self, window: int = 256) -> None:
+        """
+        Parameters
+        ----------
+        window : int
+
+            統計値を求める件数
+        """
+        self.__durations: Deque[int] = deque(maxlen=window)
+        self.__count = 0
+        self.__lock = threading.Lock()
+
+    def record(self, duration: int) -> None:
+        """
+        処理時間を記録する
+
+        Parameters
+        ----------
+        duration : int
+
+            処理時間(ナノ秒)
+        """
+        with self.__lock:
+            self.__durations.append(duration)
+            self.__count += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Returns
+        ----------
+        snapshot : Dict[str, Any]
+
+            記録の総数と、直近の処理時間の最新値・平均値・最大値(ミリ秒)
+        """
+        with self.__lock:
+            durations = list(self.__durations)
+            count = self.__count
+
+        if len(durations) == 0:
+            return {'count': count, 'last_ms': None, 'mean_ms': None, 'max_ms': None}
+
+        return {
+            'count': count,
+            'last_ms': durations[-1] / 1e6,
+            'mean_ms': sum(durations) / len(durations) / 1e6,
+            'max_ms': max(durations) / 1e6
+        }
+
+
+class MetricsLogger:
+    """
+    計測値を一定の間隔でJSON Lines形式のファイルへ書き出すクラス
+
+    各行には書き出した時刻(time.monotonic_nsの値)と、計測値の取得元毎の値が含まれる。
+    """
+
+    def __init__(self,
+                 file_path: Path,
+                 sources: Dict[str, Callable[[], Dict[str, Any]]],
+                 interval: float = 1.0) -> None:
+        """
+        Parameters
+        ----------
+        file_path : Path
+
+            書き出し先のファイルへのパス
+
+        sources : Dict[str, Callable[[], Dict[str, Any]]]
+
+            名前毎の計測値を返す関数(RecordingPipeline.metricsなど)
+
+        interval : float
+
+            書き出す間隔(秒)
+        """
+        self.__sources = sources
+        self.__interval = interval
+
+        self.__writer = JsonLinesWriter(file_path, {'clock': 'monotonic_ns', 'interval': interval}, chunk_size=1)
+
+        self.__stop_event = threading.Event()
+        self.__thread: Optional[threading.Thread] = None
+
+    @property
+    def file_path(self) -> Path:
+        """
+        Returns
+        ----------
+        file_path : Path
+
+            書き出し先のファイルへのパス
+        """
+        return self.__writer.file_path
+
+    def write(self) -> None:
+        """
+        現在の計測値を1行書き出す
+        """
+        entry: Dict[str, Any] = {'time': time.monotonic_ns()}
+
+        for name, source in self.__sources.items():
+            entry[name] = source()
+
+        self.__writer.write_object(entry)
+
+    def start(self) -> None:
+        """
+        書き出しを開始する
+        """
+        self.__stop_event.clear()
+        self.__thread = threading.Thread(target=self.__run, daemon=True)
+        self.__thread.start()
+
+    def stop(self) -> None:
+        """
+        最後の計測値を書き出し、ファイルを閉じる
+        """
+        self.__stop_event.set()
+
+        if self.__thread is not None:
+            self.__thread.join()
+            self.__thread = None
+
+        self.write()
+        self.__writer.close()
+
+    def __run(self) -> None:
+        """
+        一定の間隔で計測値を書き出す
+        """
+        while not self.__stop_event.wait(self.__interval):
+            self.write()
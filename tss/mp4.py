@@ -0,0 +1,913 @@
+from __future__ import annotations
+
+import json
+import numpy as np
+import struct
+import zipfile
+
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Sequence, Tuple
+
+
+# ローカルファイルヘッダの固定長部分の大きさ
+LOCAL_HEADER_SIZE = 30
+
+# サンプルを書き写す際に一度に読み出す最大の大きさ(バイト)
+COPY_BUFFER_SIZE = 1024 * 1024
+
+# キーフレームの索引を格納するアーカイブ内のファイル名
+KEYFRAME_INDEX_MEMBER = 'keyframes.json'
+
+# キーフレームの索引の形式のバージョン
+KEYFRAME_INDEX_VERSION = 1
+
+
+class UnsupportedMovieError(ValueError):
+    """
+    サンプル表を扱えない動画であることを知らせる例外クラス
+    """
+    pass
+
+
+def member_data_offset(archive_path: Path, info: zipfile.ZipInfo) -> int:
+    """
+    アーカイブ内でメンバーのデータが始まる位置を求める
+
+    Parameters
+    ----------
+    archive_path : Path
+
+        zip形式のファイルへのパス
+
+    info : zipfile.ZipInfo
+
+        メンバーの情報
+
+    Returns
+    ----------
+    offset : int
+
+        データの開始位置
+    """
+    with archive_path.open(mode='rb') as f:
+        f.seek(info.header_offset)
+        header = f.read(LOCAL_HEADER_SIZE)
+
+    file_name_length, extra_length = struct.unpack('<HH', header[26:30])
+
+    return info.header_offset + LOCAL_HEADER_SIZE + file_name_length + extra_length
+
+
+class Mp4Track:
+    """
+    MP4形式の動画の映像トラックのサンプル表
+
+    各サンプル(フレーム)のファイル内の位置・大きさ・長さと、キーフレームであるかを配列として保持する。
+    位置はread_trackに与えたファイルの先頭からの位置である。
+    """
+
+    def __init__(self,
+                 timescale: int,
+                 width: int,
+                 height: int,
+                 sample_entry: bytes,
+                 offsets: np.ndarray,
+                 sizes: np.ndarray,
+                 durations: np.ndarray,
+                 sync: np.ndarray,
+                 has_composition_offsets: bool = False) -> None:
+        """
+        Parameters
+        ----------
+        timescale : int
+
+            1秒あたりの時間の単位数
+
+        width : int
+
+            映像の幅
+
+        height : int
+
+            映像の高さ
+
+        sample_entry : bytes
+
+            符号化の設定を記したstsdボックス全体
+
+        offsets : np.ndarray
+
+            各サンプルのファイル内の位置
+
+        sizes : np.ndarray
+
+            各サンプルの大きさ
+
+        durations : np.ndarray
+
+            各サンプルの長さ(timescale単位)
+
+        sync : np.ndarray
+
+            各サンプルがキーフレームであるか
+
+        has_composition_offsets : bool
+
+            表示順と復号順が異なる(Bフレームを含む)か
+        """
+        self.__timescale = timescale
+        self.__width = width
+        self.__height = height
+        self.__sample_entry = sample_entry
+        self.__offsets = np.asarray(offsets, dtype=np.int64)
+        self.__sizes = np.asarray(sizes, dtype=np.int64)
+        self.__durations = np.asarray(durations, dtype=np.int64)
+        self.__sync = np.asarray(sync, dtype=bool)
+        self.__has_composition_offsets = has_composition_offsets
+
+    @property
+    def timescale(self) -> int:
+        """
+        Returns
+        ----------
+        timescale : int
+
+            1秒あたりの時間の単位数
+        """
+        return self.__timescale
+
+    @property
+    def width(self) -> int:
+        """
+        Returns
+        ----------
+        width : int
+
+            映像の幅
+        """
+        return self.__width
+
+    @property
+    def height(self) -> int:
+        """
+        Returns
+        ----------
+        height : int
+
+            映像の高さ
+        """
+        return self.__height
+
+    @property
+    def sample_entry(self) -> bytes:
+        """
+        Returns
+        ----------
+        sample_entry : bytes
+
+            符号化の設定を記したstsdボックス全体
+        """
+        return self.__sample_entry
+
+    @property
+    def offsets(self) -> np.ndarray:
+        """
+        Returns
+        ----------
+        offsets : np.ndarray
+
+            各サンプルのファイル内の位置
+        """
+        return self.__offsets
+
+    @property
+    def sizes(self) -> np.ndarray:
+        """
+        Returns
+        ----------
+        sizes : np.ndarray
+
+            各サンプルの大きさ
+        """
+        return self.__sizes
+
+    @property
+    def durations(self) -> np.ndarray:
+        """
+        Returns
+        ----------
+        durations : np.ndarray
+
+            各サンプルの長さ(timescale単位)
+        """
+        return self.__durations
+
+    @property
+    def sync(self) -> np.ndarray:
+        """
+        Returns
+        ----------
+        sync : np.ndarray
+
+            各サンプルがキーフレームであるか
+        """
+        return self.__sync
+
+    @property
+    def has_composition_offsets(self) -> bool:
+        """
+        Returns
+        ----------
+        has_composition_offsets : bool
+
+            表示順と復号順が異なる(Bフレームを含む)か
+        """
+        return self.__has_composition_offsets
+
+    def __len__(self) -> int:
+        return len(self.__sizes)
+
+    def is_compatible(self, other: Mp4Track) -> bool:
+        """
+        サンプルを同じトラックへ混在させることができるか判定する
+
+        Parameters
+        ----------
+        other : Mp4Track
+
+            比較するトラック
+
+        Returns
+        ----------
+        compatible : bool
+
+            復号に必要な設定・時間の単位・映像の大きさが等しく、どちらもBフレームを含まない場合はTrue
+        """
+        return _decoding_entry(self.__sample_entry) == _decoding_entry(other.sample_entry) and \
+            self.__timescale == other.timescale and \
+            (self.__width, self.__height) == (other.width, other.height) and \
+            not self.__has_composition_offsets and not other.has_composition_offsets
+
+
+def _decoding_entry(sample_entry: bytes) -> bytes:
+    """
+    stsdボックスから、復号に影響しないビットレートの統計を取り除く
+
+    エンコーダはビットレートの実測値をesdsとbtrtに書き込むため、同じ設定で符号化した動画でもstsdは一致しない。
+
+    Parameters
+    ----------
+    sample_entry : bytes
+
+        stsdボックス全体
+
+    Returns
+    ----------
+    sample_entry : bytes
+
+        btrtを取り除き、esdsの最大・平均ビットレートを0としたstsdボックス
+    """
+    # stsdのヘッダ(8バイト)・バージョンとフラグ・件数の後に、映像のサンプルエントリが続く
+    entry_start = 16
+    # 映像のサンプルエントリのヘッダと固定長部分(8 + 78バイト)の後に子ボックスが続く
+    children_start = entry_start + 8 + 78
+
+    if len(sample_entry) < children_start:
+        return sample_entry
+
+    entry_end = entry_start + struct.unpack_from('>I', sample_entry, entry_start)[0]
+    children = []
+
+    for box_type, boxes in sorted(_children(sample_entry, children_start, entry_end).items()):
+        if box_type == b'btrt':
+            continue
+
+        for start, end in boxes:
+            box = bytearray(sample_entry[start:end])
+
+            if box_type == b'esds':
+                position = _find_descriptor(box, 12, len(box), 0x04)
+
+                # DecoderConfigDescriptorのobjectTypeIndication・streamType・bufferSizeDBに続くビットレート
+                if position is not None and position + 13 <= len(box):
+                    box[position + 5:position + 13] = bytes(8)
+
+            children.append(bytes(box))
+
+    return sample_entry[:children_start] + b''.join(children)
+
+
+def _find_descriptor(data: bytearray, start: int, end: int, tag: int) -> Optional[int]:
+    """
+    MPEG-4の記述子の中から指定されたタグの記述子を探す
+
+    Parameters
+    ----------
+    data : bytearray
+
+        記述子を含むデータ
+
+    start : int
+
+        探索の開始位置
+
+    end : int
+
+        探索の終了位置
+
+    tag : int
+
+        探す記述子のタグ
+
+    Returns
+    ----------
+    position : Optional[int]
+
+        記述子の内容の開始位置。見つからない場合はNone
+    """
+    position = start
+
+    while position + 2 <= end:
+        descriptor_tag = data[position]
+        position += 1
+
+        # 長さは上位ビットが続きを示す可変長で記録されている
+        length = 0
+
+        for _ in range(4):
+            byte = data[position]
+            position += 1
+            length = (length << 7) | (byte & 0x7F)
+
+            if not byte & 0x80:
+                break
+
+        if descriptor_tag == tag:
+            return position
+
+        if descriptor_tag == 0x03:
+            # ES_Descriptorの内容は、ES_ID・フラグと、フラグに応じた任意の項目の後に記述子を持つ
+            flags = data[position + 2]
+            inner = position + 3
+
+            if flags & 0x80:
+                inner += 2
+            if flags & 0x40:
+                inner += 1 + data[inner]
+            if flags & 0x20:
+                inner += 2
+
+            return _find_descriptor(data, inner, position + length, tag)
+
+        position += length
+
+    return None
+
+
+def _read_boxes(file: BinaryIO, start: int, end: int) -> Iterator[Tuple[bytes, int, int]]:
+    """
+    指定された範囲に並んでいるボックスを列挙する
+
+    Parameters
+    ----------
+    file : BinaryIO
+
+        MP4形式のファイル
+
+    start : int
+
+        範囲の開始位置
+
+    end : int
+
+        範囲の終了位置
+
+    Returns
+    ----------
+    boxes : Iterator[Tuple[bytes, int, int]]
+
+        ボックスの種類・内容の開始位置・ボックスの終了位置の組
+    """
+    offset = start
+
+    while offset + 8 <= end:
+        file.seek(offset)
+        size, box_type = struct.unpack('>I4s', file.read(8))
+        header_size = 8
+
+        if size == 1:
+            size = struct.unpack('>Q', file.read(8))[0]
+            header_size = 16
+        elif size == 0:
+            size = end - offset
+
+        if size < header_size:
+            raise UnsupportedMovieError(f'invalid box size: {box_type!r}')
+
+        yield box_type, offset + header_size, offset + size
+
+        offset += size
+
+
+def _children(data: bytes, start: int, end: int) -> Dict[bytes, List[Tuple[int, int]]]:
+    """
+    ボックスの内容に含まれる子ボックスを、種類毎のボックス全体の範囲として求める
+
+    Parameters
+    ----------
+    data : bytes
+
+        ボックスを含むデータ
+
+    start : int
+
+        内容の開始位置
+
+    end : int
+
+        内容の終了位置
+
+    Returns
+    ----------
+    children : Dict[bytes, List[Tuple[int, int]]]
+
+        種類をキーとし、ボックス全体の開始位置と終了位置の組のリストを値とする辞書
+    """
+    boxes: Dict[bytes, List[Tuple[int, int]]] = {}
+    offset = start
+
+    while offset + 8 <= end:
+        size, box_type = struct.unpack_from('>I4s', data, offset)
+        header_size = 8
+
+        if size == 1:
+            size = struct.unpack_from('>Q', data, offset + 8)[0]
+            header_size = 16
+        elif size == 0:
+            size = end - offset
+
+        if size < header_size:
+            raise UnsupportedMovieError(f'invalid box size: {box_type!r}')
+
+        boxes.setdefault(box_type, []).append((offset, offset + size))
+
+        offset += size
+
+    return boxes
+
+
+def _content(data: bytes, box: Tuple[int, int]) -> Tuple[int, int]:
+    """
+    ボックス全体の範囲から、ヘッダを除いた内容の範囲を求める
+    """
+    start, end = box
+    header_size = 16 if struct.unpack_from('>I', data, start)[0] == 1 else 8
+
+    return start + header_size, end
+
+
+def read_track(file: BinaryIO, size: int, offset: int = 0) -> Mp4Track:
+    """
+    MP4形式の動画から、最初の映像トラックのサンプル表を読み込む
+
+    Parameters
+    ----------
+    file : BinaryIO
+
+        動画ファイル。seekできる必要がある
+
+    size : int
+
+        動画ファイルの大きさ
+
+    offset : int
+
+        ファイル内で動画が始まる位置。アーカイブに無圧縮で格納された動画を直接読む場合に指定する
+
+    Returns
+    ----------
+    track : Mp4Track
+
+        映像トラックのサンプル表
+
+    Raises
+    ----------
+    UnsupportedMovieError
+
+        moovボックスや映像トラックを持たない、断片化された、もしくはボックスが壊れている・途中で切れている動画であることを知らせる例外
+    """
+    # ボックスの大きさや件数が不正な場合、解析中にKeyErrorやstruct.errorなどが送出されるため、まとめて扱えない動画とする
+    try:
+        return _read_track(file, size, offset)
+    except UnsupportedMovieError:
+        raise
+    except (KeyError, IndexError, ValueError, struct.error) as e:
+        raise UnsupportedMovieError(f'malformed movie: {e!r}') from e
+
+
+def _read_track(file: BinaryIO, size: int, offset: int) -> Mp4Track:
+    """
+    MP4形式の動画から、最初の映像トラックのサンプル表を読み込む
+    """
+    moov: Optional[bytes] = None
+
+    for box_type, start, end in _read_boxes(file, offset, offset + size):
+        if box_type == b'moov':
+            file.seek(start)
+            moov = file.read(end - start)
+        elif box_type == b'moof':
+            raise UnsupportedMovieError('fragmented movies are not supported')
+
+    if moov is None:
+        raise UnsupportedMovieError('moov box not found')
+
+    for trak in _children(moov, 0, len(moov)).get(b'trak', []):
+        trak_children = _children(moov, *_content(moov, trak))
+        mdia_children = _children(moov, *_content(moov, trak_children[b'mdia'][0]))
+
+        hdlr_start, _ = _content(moov, mdia_children[b'hdlr'][0])
+
+        if moov[hdlr_start + 8:hdlr_start + 12] != b'vide':
+            continue
+
+        return _read_video_track(moov, trak_children, mdia_children, size, offset)
+
+    raise UnsupportedMovieError('video track not found')
+
+
+def _read_video_track(moov: bytes,
+                      trak_children: Dict[bytes, List[Tuple[int, int]]],
+                      mdia_children: Dict[bytes, List[Tuple[int, int]]],
+                      size: int,
+                      offset: int) -> Mp4Track:
+    """
+    映像トラックのボックスからサンプル表を組み立てる
+    """
+    tkhd_start, tkhd_end = _content(moov, trak_children[b'tkhd'][0])
+    width, height = struct.unpack_from('>II', moov, tkhd_end - 8)
+
+    mdhd_start, _ = _content(moov, mdia_children[b'mdhd'][0])
+
+    if moov[mdhd_start] == 1:
+        timescale = struct.unpack_from('>I', moov, mdhd_start + 20)[0]
+    else:
+        timescale = struct.unpack_from('>I', moov, mdhd_start + 12)[0]
+
+    minf_children = _children(moov, *_content(moov, mdia_children[b'minf'][0]))
+    stbl = _children(moov, *_content(moov, minf_children[b'stbl'][0]))
+
+    stsd_start, stsd_end = stbl[b'stsd'][0]
+    sample_entry = moov[stsd_start:stsd_end]
+
+    # 各サンプルの大きさ
+    stsz_start, _ = _content(moov, stbl[b'stsz'][0])
+    uniform_size, sample_count = struct.unpack_from('>II', moov, stsz_start + 4)
+
+    if uniform_size != 0:
+        if uniform_size * sample_count > size:
+            raise UnsupportedMovieError('sample data exceeds movie size')
+
+        sizes = np.full(sample_count, uniform_size, dtype=np.int64)
+    else:
+        sizes = np.frombuffer(moov, dtype='>u4', count=sample_count, offset=stsz_start + 12).astype(np.int64)
+
+    # 各サンプルの長さ
+    stts_start, _ = _content(moov, stbl[b'stts'][0])
+    stts_count = struct.unpack_from('>I', moov, stts_start + 4)[0]
+    stts = np.frombuffer(moov, dtype='>u4', count=stts_count * 2, offset=stts_start + 8).astype(np.int64).reshape(-1, 2)
+    durations = _repeat(stts[:, 1], stts[:, 0], sample_count)
+
+    # キーフレーム。stssが無い場合は全てのサンプルがキーフレームである
+    if b'stss' in stbl:
+        stss_start, _ = _content(moov, stbl[b'stss'][0])
+        stss_count = struct.unpack_from('>I', moov, stss_start + 4)[0]
+        sync_samples = np.frombuffer(moov, dtype='>u4', count=stss_count, offset=stss_start + 8).astype(np.int64)
+
+        sync = np.zeros(sample_count, dtype=bool)
+        sync[sync_samples[sync_samples <= sample_count] - 1] = True
+    else:
+        sync = np.ones(sample_count, dtype=bool)
+
+    # チャンクの位置
+    if b'stco' in stbl:
+        stco_start, _ = _content(moov, stbl[b'stco'][0])
+        chunk_count = struct.unpack_from('>I', moov, stco_start + 4)[0]
+        chunk_offsets = np.frombuffer(moov, dtype='>u4', count=chunk_count, offset=stco_start + 8).astype(np.int64)
+    else:
+        co64_start, _ = _content(moov, stbl[b'co64'][0])
+        chunk_count = struct.unpack_from('>I', moov, co64_start + 4)[0]
+        chunk_offsets = np.frombuffer(moov, dtype='>u8', count=chunk_count, offset=co64_start + 8).astype(np.int64)
+
+    # チャンク毎のサンプル数
+    stsc_start, _ = _content(moov, stbl[b'stsc'][0])
+    stsc_count = struct.unpack_from('>I', moov, stsc_start + 4)[0]
+    stsc = np.frombuffer(moov, dtype='>u4', count=stsc_count * 3, offset=stsc_start + 8).astype(np.int64).reshape(-1, 3)
+
+    first_chunks = np.append(stsc[:, 0], chunk_count + 1)
+    samples_per_chunk = _repeat(stsc[:, 1], np.diff(first_chunks), chunk_count)
+
+    # サンプル毎にチャンクの位置とチャンク内の位置を足し合わせる
+    chunk_of_sample = _repeat(np.arange(chunk_count), samples_per_chunk, sample_count)
+    size_before = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+    first_sample_of_chunk = np.concatenate(([0], np.cumsum(samples_per_chunk)[:-1]))[:chunk_count]
+
+    offsets = offset + chunk_offsets[chunk_of_sample] + size_before - size_before[first_sample_of_chunk[chunk_of_sample]]
+
+    return Mp4Track(timescale, width >> 16, height >> 16, sample_entry, offsets, sizes, durations, sync,
+                    has_composition_offsets=b'ctts' in stbl)
+
+
+def _repeat(values: np.ndarray, counts: np.ndarray, limit: int) -> np.ndarray:
+    """
+    各値を指定された回数ずつ繰り返した配列の先頭を求める
+
+    壊れた表の件数によって巨大な配列を確保しないよう、limit件を超える部分は作成しない。
+
+    Parameters
+    ----------
+    values : np.ndarray
+
+        繰り返す値
+
+    counts : np.ndarray
+
+        各値を繰り返す回数
+
+    limit : int
+
+        求める最大の件数
+
+    Returns
+    ----------
+    repeated : np.ndarray
+
+        繰り返した配列の先頭limit件
+    """
+    if np.any(counts < 0):
+        raise UnsupportedMovieError('negative entry count')
+
+    ends = np.minimum(np.cumsum(counts), limit)
+
+    return np.repeat(values, np.diff(np.concatenate(([0], ends))))
+
+
+def keyframe_index(file: BinaryIO, size: int, offset: int = 0) -> Dict[str, Any]:
+    """
+    動画のサンプル表から、フレーム数とキーフレームのフレーム番号を求める
+
+    Parameters
+    ----------
+    file : BinaryIO
+
+        動画ファイル。seekできる必要がある
+
+    size : int
+
+        動画ファイルの大きさ
+
+    offset : int
+
+        ファイル内で動画が始まる位置
+
+    Returns
+    ----------
+    index : Dict[str, Any]
+
+        frame_countとkeyframes(キーフレームのフレーム番号の昇順のリスト)をキーに持つ索引
+
+    Raises
+    ----------
+    UnsupportedMovieError
+
+        サンプル表を扱えない動画や、復号順と表示順が異なりフレーム番号を求められない動画であることを知らせる例外
+    """
+    track = read_track(file, size, offset)
+
+    if track.has_composition_offsets:
+        raise UnsupportedMovieError('movies with reordered frames are not supported')
+
+    return {'frame_count': len(track), 'keyframes': np.flatnonzero(track.sync).tolist()}
+
+
+def read_keyframe_index(zip: zipfile.ZipFile) -> Dict[str, Dict[str, Any]]:
+    """
+    アーカイブに格納されているキーフレームの索引を読み込む
+
+    索引を作成した時点から動画が置き換えられている(大きさかCRCが異なる)場合、その動画の索引は含まれない。
+
+    Parameters
+    ----------
+    zip : zipfile.ZipFile
+
+        .tss形式のファイル
+
+    Returns
+    ----------
+    index : Dict[str, Dict[str, Any]]
+
+        アーカイブ内の動画のファイル名をキーとし、frame_countとkeyframesを持つ索引を値とする辞書。
+        索引が格納されていない場合は空
+    """
+    if KEYFRAME_INDEX_MEMBER not in zip.namelist():
+        return {}
+
+    with zip.open(KEYFRAME_INDEX_MEMBER) as member:
+        content = json.load(member)
+
+    if content.get('version') != KEYFRAME_INDEX_VERSION:
+        return {}
+
+    names = set(zip.namelist())
+    index = {}
+
+    for name, entry in content['movies'].items():
+        if name not in names:
+            continue
+
+        info = zip.getinfo(name)
+
+        if entry['size'] == info.file_size and entry['crc'] == info.CRC:
+            index[name] = entry
+
+    return index
+
+
+def _box(box_type: bytes, *payloads: bytes) -> bytes:
+    """
+    ボックスを組み立てる
+    """
+    payload = b''.join(payloads)
+
+    return struct.pack('>I4s', len(payload) + 8, box_type) + payload
+
+
+def _full_box(box_type: bytes, version: int, flags: int, *payloads: bytes) -> bytes:
+    """
+    バージョンとフラグを持つボックスを組み立てる
+    """
+    return _box(box_type, struct.pack('>I', (version << 24) | flags), *payloads)
+
+
+# 変換を行わない表示行列
+IDENTITY_MATRIX = struct.pack('>9I', 0x00010000, 0, 0, 0, 0x00010000, 0, 0, 0, 0x40000000)
+
+# 動画全体の時間の単位数
+MOVIE_TIMESCALE = 1000
+
+
+def write_movie(file_path: Path,
+                template: Mp4Track,
+                sources: Sequence[BinaryIO],
+                samples: Sequence[Tuple[int, int, int]],
+                durations: np.ndarray,
+                sync: np.ndarray) -> None:
+    """
+    他の動画から取り出したサンプルを並べて、1つの映像トラックを持つMP4形式の動画を書き出す
+
+    サンプルの内容は復号も再符号化もされずにそのまま書き写される。
+
+    Parameters
+    ----------
+    file_path : Path
+
+        書き出し先のファイルへのパス
+
+    template : Mp4Track
+
+        符号化の設定・時間の単位・映像の大きさを引き継ぐトラック
+
+    sources : Sequence[BinaryIO]
+
+        サンプルを読み出すファイル
+
+    samples : Sequence[Tuple[int, int, int]]
+
+        各サンプルのsourcesにおける番号・位置・大きさの組
+
+    durations : np.ndarray
+
+        各サンプルの長さ(templateのtimescale単位)
+
+    sync : np.ndarray
+
+        各サンプルがキーフレームであるか
+    """
+    sizes = np.asarray([size for _, _, size in samples], dtype=np.int64)
+
+    with file_path.open(mode='wb') as f:
+        f.write(_box(b'ftyp', b'isom', struct.pack('>I', 512), b'isom', b'iso2', b'mp41'))
+
+        # 4GiBを超えても書き出せるよう、mdatは常に64bitの大きさを持つヘッダで書き出す
+        mdat_start = f.tell()
+        f.write(struct.pack('>I4sQ', 1, b'mdat', 16 + int(sizes.sum())))
+
+        data_offset = f.tell()
+
+        for source_no, offset, size in _coalesce(samples):
+            source = sources[source_no]
+            source.seek(offset)
+
+            while size > 0:
+                chunk = source.read(min(size, COPY_BUFFER_SIZE))
+
+                if len(chunk) == 0:
+                    raise UnsupportedMovieError('unexpected end of sample data')
+
+                f.write(chunk)
+                size -= len(chunk)
+
+        if f.tell() != mdat_start + 16 + int(sizes.sum()):
+            raise UnsupportedMovieError('sample data size mismatch')
+
+        f.write(_moov(template, sizes, np.asarray(durations, dtype=np.int64), np.asarray(sync, dtype=bool), data_offset))
+
+
+def _coalesce(samples: Sequence[Tuple[int, int, int]]) -> Iterator[Tuple[int, int, int]]:
+    """
+    同じファイル内で連続しているサンプルを1つの範囲にまとめる
+    """
+    current: Optional[List[int]] = None
+
+    for source_no, offset, size in samples:
+        if current is not None and current[0] == source_no and current[1] + current[2] == offset:
+            current[2] += size
+            continue
+
+        if current is not None:
+            yield current[0], current[1], current[2]
+
+        current = [source_no, offset, size]
+
+    if current is not None:
+        yield current[0], current[1], current[2]
+
+
+def _moov(template: Mp4Track, sizes: np.ndarray, durations: np.ndarray, sync: np.ndarray, data_offset: int) -> bytes:
+    """
+    全てのサンプルを1つのチャンクとして持つmoovボックスを組み立てる
+    """
+    sample_count = len(sizes)
+    media_duration = int(durations.sum())
+    movie_duration = media_duration * MOVIE_TIMESCALE // template.timescale
+
+    def time_fields(timescale: int, duration: int) -> Tuple[int, bytes]:
+        if duration > 0xFFFFFFFF:
+            return 1, struct.pack('>QQIQ', 0, 0, timescale, duration)
+
+        return 0, struct.pack('>IIII', 0, 0, timescale, duration)
+
+    mvhd_version, mvhd_times = time_fields(MOVIE_TIMESCALE, movie_duration)
+    mvhd = _full_box(b'mvhd', mvhd_version, 0, mvhd_times,
+                     struct.pack('>IH10x', 0x00010000, 0x0100), IDENTITY_MATRIX, bytes(24), struct.pack('>I', 2))
+
+    if movie_duration > 0xFFFFFFFF:
+        tkhd_times = struct.pack('>QQI4xQ', 0, 0, 1, movie_duration)
+        tkhd_version = 1
+    else:
+        tkhd_times = struct.pack('>III4xI', 0, 0, 1, movie_duration)
+        tkhd_version = 0
+
+    tkhd = _full_box(b'tkhd', tkhd_version, 3, tkhd_times, struct.pack('>8xhhh2x', 0, 0, 0), IDENTITY_MATRIX,
+                     struct.pack('>II', template.width << 16, template.height << 16))
+
+    mdhd_version, mdhd_times = time_fields(template.timescale, media_duration)
+    mdhd = _full_box(b'mdhd', mdhd_version, 0, mdhd_times, struct.pack('>HH', 0x55C4, 0))
+    hdlr = _full_box(b'hdlr', 0, 0, struct.pack('>I4s12x', 0, b'vide'), b'VideoHandler\x00')
+
+    vmhd = _full_box(b'vmhd', 0, 1, bytes(8))
+    dinf = _box(b'dinf', _full_box(b'dref', 0, 0, struct.pack('>I', 1), _full_box(b'url ', 0, 1)))
+
+    # 同じ長さが続くサンプルをまとめる
+    if sample_count > 0:
+        change = np.flatnonzero(np.diff(durations)) + 1
+        starts = np.concatenate(([0], change))
+        counts = np.diff(np.append(starts, sample_count))
+        stts_entries = np.column_stack((counts, durations[starts])).astype('>u4')
+    else:
+        stts_entries = np.zeros((0, 2), dtype='>u4')
+
+    stts = _full_box(b'stts', 0, 0, struct.pack('>I', len(stts_entries)), stts_entries.tobytes())
+
+    tables = [template.sample_entry, stts]
+
+    if not np.all(sync):
+        sync_samples = (np.flatnonzero(sync) + 1).astype('>u4')
+        tables.append(_full_box(b'stss', 0, 0, struct.pack('>I', len(sync_samples)), sync_samples.tobytes()))
+
+    chunk_count = 1 if sample_count > 0 else 0
+
+    tables.append(_full_box(b'stsc', 0, 0, struct.pack('>I', chunk_count),
+                            struct.pack('>III', 1, sample_count, 1) if chunk_count > 0 else b''))
+    tables.append(_full_box(b'stsz', 0, 0, struct.pack('>II', 0, sample_count), sizes.astype('>u4').tobytes()))
+
+    if data_offset > 0xFFFFFFFF:
+        tables.append(_full_box(b'co64', 0, 0, struct.pack('>I', chunk_count), struct.pack('>Q', data_offset) * chunk_count))
+    else:
+        tables.append(_full_box(b'stco', 0, 0, struct.pack('>I', chunk_count), struct.pack('>I', data_offset) * chunk_count))
+
+    stbl = _box(b'stbl', *tables)
+    minf = _box(b'minf', vmhd, dinf, stbl)
+    mdia = _box(b'mdia', mdhd, hdlr, minf)
+    trak = _box(b'trak', tkhd, mdia)
+
+    return _box(b'moov', mvhd, trak)
@@ -0,0 +1,417 @@
+from __future__ import annotations
+
+import bisect
+import cv2
+import queue
+import threading
+import time
+
+from array import array
+from tss.metrics import LatencyMeter, RateMeter
+from tss.record import FrameIndexWriter
+from typing import Any, Dict, Optional, Tuple
+
+
+def put_latest(target_queue: queue.Queue, item: Any) -> bool:
+    """
+    キューが満杯の場合は最も古い要素を捨てて要素を追加する
+
+    Parameters
+    ----------
+    target_queue : queue.Queue
+
+        追加先のキュー
+
+    item : Any
+
+        追加する要素
+
+    Returns
+    ----------
+    discarded : bool
+
+        古い要素を捨てたかどうか
+    """
+    discarded = False
+
+    while True:
+        try:
+            target_queue.put_nowait(item)
+            return discarded
+        except queue.Full:
+            try:
+                target_queue.get_nowait()
+                discarded = True
+            except queue.Empty:
+                pass
+
+
+class RecordingPipeline:
+    """
+    撮影・エンコード・プレビューを別々のスレッドで行うパイプライン
+
+    各段は上限付きのキューで接続されている。
+    録画されるフレームはプレビューの処理を待つことはなく、
+    負荷が高い場合はプレビューのフレームから先に捨てられる。
+    """
+
+    # 録画用のキューを閉じるための番兵
+    __END_OF_STREAM = None
+
+    def __init__(self,
+                 video_capture: Any,
+                 preview_size: Optional[Tuple[int, int]] = (960, 540),
+                 encode_queue_size: int = 64) -> None:
+        """
+        Parameters
+        ----------
+        video_capture : Any
+
+            フレームを読み出すためのcv2.VideoCaptureもしくは同じreadメソッドを持つオブジェクト
+
+        preview_size : Optional[Tuple[int, int]]
+
+            プレビュー画像の大きさ(幅, 高さ)。Noneの場合はプレビュー段を動かさない
+
+        encode_queue_size : int
+
+            エンコード待ちのフレームを保持するキューの大きさ
+        """
+        self.__video_capture = video_capture
+        self.__preview_size = preview_size
+        self.__encode_queue_size = encode_queue_size
+
+        self.__lock = threading.Lock()
+
+        # 撮影時刻の参照はエンコード待ちでブロックされないよう別のロックで保護する
+        self.__timestamp_lock = threading.Lock()
+
+        self.__is_running = False
+        self.__capture_thread: Optional[threading.Thread] = None
+        self.__preview_thread: Optional[threading.Thread] = None
+
+        # 撮影段からプレビュー段へ渡す生のフレーム
+        self.__raw_preview_queue: queue.Queue = queue.Queue(maxsize=1)
+
+        # プレビュー段で変換済みの画像
+        self.__preview_queue: queue.Queue = queue.Queue(maxsize=1)
+
+        # 録画中のみ存在するエンコード段
+        self.__encode_queue: Optional[queue.Queue] = None
+        self.__encode_thread: Optional[threading.Thread] = None
+
+        self.__current_frame = -1
+
+        # 録画中の各フレームの撮影時刻
+        self.__frame_timestamps = array('q')
+
+        # 実行中の計測値
+        self.__capture_rate = RateMeter()
+        self.__capture_failures = 0
+        self.__encode_latency = LatencyMeter()
+        self.__preview_latency = LatencyMeter()
+        self.__preview_dropped = 0
+
+    @property
+    def is_recording(self) -> bool:
+        """
+        Returns
+        ----------
+        is_recording : bool
+
+            録画中であるかどうか
+        """
+        return self.__encode_queue is not None
+
+    @property
+    def current_frame(self) -> int:
+        """
+        Returns
+        ----------
+        current_frame : int
+
+            最後に録画用のキューへ渡されたフレームの番号。録画開始直後は-1
+        """
+        return self.__current_frame
+
+    @property
+    def frame_timestamps(self) -> array:
+        """
+        Returns
+        ----------
+        frame_timestamps : array
+
+            録画中、もしくは最後に録画した各フレームの撮影時刻(time.monotonic_nsの値)
+        """
+        return self.__frame_timestamps
+
+    def frame_at(self, timestamp: int) -> int:
+        """
+        指定された時刻に表示されていたフレームの番号を二分探索で求める
+
+        Parameters
+        ----------
+        timestamp : int
+
+            時刻(time.monotonic_nsの値)
+
+        Returns
+        ----------
+        frame : int
+
+            その時刻以前に撮影された最後のフレームの番号。最初のフレームより前の場合は-1
+        """
+        with self.__timestamp_lock:
+            return bisect.bisect_right(self.__frame_timestamps, timestamp) - 1
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        各段の計測値を取得する。任意のスレッドから呼び出すことができる
+
+        Returns
+        ----------
+        metrics : Dict[str, Any]
+
+            以下の計測値
+
+            capture_fps : 直近1秒間の撮影のフレームレート
+            captured_frames : 撮影したフレームの総数
+            capture_failures : フレームの読み出しに失敗した回数
+            recorded_frames : 録画用のキューへ渡したフレーム数
+            encode_queue_depth : エンコード待ちのフレーム数
+            encode_latency : 1フレームの書き出しにかかった時間
+            preview_latency : 撮影からプレビュー画像の変換が終わるまでの時間
+            preview_dropped : 変換が間に合わず捨てられたプレビューのフレーム数
+        """
+        encode_queue = self.__encode_queue
+
+        return {
+            'capture_fps': self.__capture_rate.rate,
+            'captured_frames': self.__capture_rate.count,
+            'capture_failures': self.__capture_failures,
+            'recorded_frames': self.__current_frame + 1,
+            'encode_queue_depth': encode_queue.qsize() if encode_queue is not None else 0,
+            'encode_latency': self.__encode_latency.snapshot(),
+            'preview_latency': self.__preview_latency.snapshot(),
+            'preview_dropped': self.__preview_dropped
+        }
+
+    def start(self) -> None:
+        """
+        撮影段とプレビュー段のスレッドを開始する
+        """
+        self.__is_running = True
+
+        self.__capture_thread = threading.Thread(target=self.__capture, daemon=True)
+        self.__capture_thread.start()
+
+        if self.__preview_size is not None:
+            self.__preview_thread = threading.Thread(target=self.__preview, daemon=True)
+            self.__preview_thread.start()
+
+    def stop(self) -> None:
+        """
+        録画中であれば録画を終了し、全てのスレッドを終了する
+        """
+        self.stop_recording()
+
+        self.__is_running = False
+
+        if self.__capture_thread is not None:
+            self.__capture_thread.join()
+
+        if self.__preview_thread is not None:
+            self.__preview_thread.join()
+            self.__preview_thread = None
+
+    def start_recording(self,
+                        video_writer: Any,
+                        frame_index_writer: Optional[FrameIndexWriter] = None) -> None:
+        """
+        録画を開始する
+
+        Parameters
+        ----------
+        video_writer : Any
+
+            フレームを書き出すためのcv2.VideoWriterもしくは同じwriteメソッドを持つオブジェクト
+
+        frame_index_writer : Optional[FrameIndexWriter]
+
+            書き出した各フレームの撮影時刻の書き出し先
+        """
+        encode_queue: queue.Queue = queue.Queue(maxsize=self.__encode_queue_size)
+
+        self.__encode_thread = threading.Thread(target=self.__encode,
+                                                args=(encode_queue, video_writer, frame_index_writer),
+                                                daemon=True)
+        self.__encode_thread.start()
+
+        with self.__lock, self.__timestamp_lock:
+            self.__current_frame = -1
+            self.__frame_timestamps = array('q')
+            self.__encode_queue = encode_queue
+
+    def switch_recording(self,
+                         video_writer: Any,
+                         frame_index_writer: Optional[FrameIndexWriter] = None) -> Tuple[threading.Thread, int]:
+        """
+        録画を止めずに書き出し先を切り替える
+
+        切り替え以降に撮影されたフレームは新しい書き出し先へ渡される。フレーム番号と撮影時刻は引き継がれる。
+        以前の書き出し先のエンコード待ちのフレームは、返されるスレッドで引き続き書き出される。
+
+        Parameters
+        ----------
+        video_writer : Any
+
+            新しいフレームの書き出し先
+
+        frame_index_writer : Optional[FrameIndexWriter]
+
+            新しい撮影時刻の書き出し先
+
+        Returns
+        ----------
+        previous_encode_thread : threading.Thread
+
+            以前の書き出し先へのエンコードを行っているスレッド。終了した時点で以前の動画は閉じられている
+
+        first_frame : int
+
+            新しい書き出し先へ最初に渡されるフレームの番号
+        """
+        encode_queue: queue.Queue = queue.Queue(maxsize=self.__encode_queue_size)
+
+        encode_thread = threading.Thread(target=self.__encode,
+                                         args=(encode_queue, video_writer, frame_index_writer),
+                                         daemon=True)
+        encode_thread.start()
+
+        with self.__lock:
+            previous_queue = self.__encode_queue
+            previous_thread = self.__encode_thread
+
+            self.__encode_queue = encode_queue
+            self.__encode_thread = encode_thread
+
+            first_frame = self.__current_frame + 1
+
+        previous_queue.put(RecordingPipeline.__END_OF_STREAM)
+
+        return previous_thread, first_frame
+
+    def stop_recording(self) -> None:
+        """
+        録画を終了する
+
+        エンコード待ちのフレームが全て書き出されるまで待機する。
+        """
+        with self.__lock:
+            encode_queue = self.__encode_queue
+            self.__encode_queue = None
+
+        if encode_queue is None:
+            return
+
+        encode_queue.put(RecordingPipeline.__END_OF_STREAM)
+
+        self.__encode_thread.join()
+        self.__encode_thread = None
+
+    def get_preview(self) -> Optional[Any]:
+        """
+        最新のプレビュー画像を取り出す
+
+        Returns
+        ----------
+        preview : Optional[numpy.ndarray]
+
+            RGB形式に変換・縮小されたプレビュー画像。新しい画像が無い場合はNone
+        """
+        try:
+            return self.__preview_queue.get_nowait()
+        except queue.Empty:
+            return None
+
+    def __capture(self) -> None:
+        """
+        撮影段。カメラからフレームを読み出し、エンコード段とプレビュー段へ渡す
+        """
+        while self.__is_running:
+            ret, frame = self.__video_capture.read()
+            timestamp = time.monotonic_ns()
+
+            if not ret:
+                self.__capture_failures += 1
+                time.sleep(0.001)
+                continue
+
+            self.__capture_rate.mark(timestamp)
+
+            with self.__lock:
+                if self.__encode_queue is not None:
+                    self.__encode_queue.put((timestamp, frame))
+                    self.__current_frame += 1
+
+                    with self.__timestamp_lock:
+                        self.__frame_timestamps.append(timestamp)
+
+            if self.__preview_size is not None and put_latest(self.__raw_preview_queue, (timestamp, frame)):
+                self.__preview_dropped += 1
+
+    def __preview(self) -> None:
+        """
+        プレビュー段。フレームを表示用に変換する
+        """
+        while self.__is_running:
+            try:
+                timestamp, frame = self.__raw_preview_queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+            preview = cv2.cvtColor(cv2.resize(frame, self.__preview_size,
+                                              interpolation=cv2.INTER_AREA),
+                                   cv2.COLOR_BGR2RGB)
+
+            put_latest(self.__preview_queue, preview)
+
+            self.__preview_latency.record(time.monotonic_ns() - timestamp)
+
+    def __encode(self,
+                 encode_queue: queue.Queue,
+                 video_writer: Any,
+                 frame_index_writer: Optional[FrameIndexWriter]) -> None:
+        """
+        エンコード段。録画用のキューからフレームを取り出し書き出す
+
+        Parameters
+        ----------
+        encode_queue : queue.Queue
+
+            録画用のキュー
+
+        video_writer : Any
+
+            フレームを書き出すためのオブジェクト
+
+        frame_index_writer : Optional[FrameIndexWriter]
+
+            書き出した各フレームの撮影時刻の書き出し先
+        """
+        while True:
+            item = encode_queue.get()
+
+            if item is RecordingPipeline.__END_OF_STREAM:
+                break
+
+            timestamp, frame = item
+
+            start_time = time.monotonic_ns()
+            video_writer.write(frame)
+            self.__encode_latency.record(time.monotonic_ns() - start_time)
+
+            if frame_index_writer is not None:
+                frame_index_writer.write(timestamp)
+
+        video_writer.release()
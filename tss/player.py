@@ -1,8 +1,441 @@
+import cv2
+import threading
 import tkinter as tk
+import tkinter.ttk as ttk
+
+from collections import OrderedDict
+from pathlib import Path
+from PIL import Image, ImageTk  # type: ignore
+from tkinter import filedialog
+from tss import TSSFileManager
+from tss import VideoReader
+from typing import Any, Optional, Tuple
+
+
+class FrameCache:
+    """
+    デコード済みのフレームを保持するLRUキャッシュ
+    """
+
+    def __init__(self, capacity: int) -> None:
+        """
+        Parameters
+        ----------
+        capacity : int
+
+            保持する最大のフレーム数
+        """
+        self.__capacity = capacity
+        self.__frames: OrderedDict = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def __contains__(self, frame_no: int) -> bool:
+        with self.__lock:
+            return frame_no in self.__frames
+
+    def get(self, frame_no: int) -> Optional[Any]:
+        """
+        フレームを取り出す
+
+        Parameters
+        ----------
+        frame_no : int
+
+            フレーム番号
+
+        Returns
+        ----------
+        frame : Optional[numpy.ndarray]
+
+            保持されているフレーム。保持されていない場合はNone
+        """
+        with self.__lock:
+            frame = self.__frames.get(frame_no)
+
+            if frame is not None:
+                self.__frames.move_to_end(frame_no)
+
+            return frame
+
+    def put(self, frame_no: int, frame: Any) -> None:
+        """
+        フレームを追加し、上限を超えた場合は最も長く使われていないフレームを捨てる
+
+        Parameters
+        ----------
+        frame_no : int
+
+            フレーム番号
+
+        frame : numpy.ndarray
+
+            フレーム
+        """
+        with self.__lock:
+            self.__frames[frame_no] = frame
+            self.__frames.move_to_end(frame_no)
+
+            while len(self.__frames) > self.__capacity:
+                self.__frames.popitem(last=False)
+
+
+class ReadAheadLoader:
+    """
+    再生方向に先回りしてフレームをデコードし、キャッシュへ追加するクラス
+
+    専用のスレッドで動作し、目標のフレームが変わるたびに読み込む範囲を選び直す。
+    """
+
+    def __init__(self,
+                 video_reader: VideoReader,
+                 cache: FrameCache,
+                 frame_count: int,
+                 display_size: Tuple[int, int],
+                 read_ahead: int = 32) -> None:
+        """
+        Parameters
+        ----------
+        video_reader : VideoReader
+
+            このクラス専用の動画の読み出し元
+
+        cache : FrameCache
+
+            デコードしたフレームの追加先
+
+        frame_count : int
+
+            動画の総フレーム数
+
+        display_size : Tuple[int, int]
+
+            表示用に縮小する大きさ(幅, 高さ)
+
+        read_ahead : int
+
+            先回りしてデコードするフレーム数
+        """
+        self.__video_reader = video_reader
+        self.__cache = cache
+        self.__frame_count = frame_count
+        self.__display_size = display_size
+        self.__read_ahead = read_ahead
+
+        self.__target = 0
+        self.__direction = 1
+
+        self.__event = threading.Event()
+        self.__is_running = False
+        self.__thread: Optional[threading.Thread] = None
+
+    def request(self, frame_no: int, direction: int) -> None:
+        """
+        目標のフレームと再生方向を指定する
+
+        Parameters
+        ----------
+        frame_no : int
+
+            目標のフレーム番号
+
+        direction : int
+
+            再生方向。順方向は1、逆方向は-1
+        """
+        self.__target = frame_no
+        self.__direction = direction
+        self.__event.set()
+
+    def start(self) -> None:
+        """
+        読み込みを開始する
+        """
+        self.__is_running = True
+        self.__thread = threading.Thread(target=self.__load, daemon=True)
+        self.__thread.start()
+
+    def stop(self) -> None:
+        """
+        読み込みを終了する
+        """
+        self.__is_running = False
+        self.__event.set()
+
+        if self.__thread is not None:
+            self.__thread.join()
+
+        self.__video_reader.release()
+
+    def __next_frame(self) -> Optional[int]:
+        """
+        次にデコードするべきフレームを求める
+
+        Returns
+        ----------
+        frame_no : Optional[int]
+
+            デコードするフレーム番号。先回りする範囲が全てキャッシュされている場合はNone
+        """
+        target = self.__target
+
+        if self.__direction >= 0:
+            window = range(target, min(target + self.__read_ahead, self.__frame_count))
+        else:
+            window = range(max(0, target - self.__read_ahead), target + 1)
+
+        for frame_no in window:
+            if frame_no not in self.__cache:
+                return frame_no
+
+        return None
+
+    def __load(self) -> None:
+        """
+        目標のフレームの周辺を順にデコードする
+        """
+        while self.__is_running:
+            frame_no = self.__next_frame()
+
+            if frame_no is None:
+                self.__event.wait(0.1)
+                self.__event.clear()
+                continue
+
+            frame = self.__video_reader.read(frame_no)
+
+            if frame is None:
+                # 読み出せないフレームは黒い画像として扱い、同じフレームを読み直し続けないようにする
+                self.__cache.put(frame_no, Image.new('RGB', self.__display_size))
+                continue
+
+            image = Image.fromarray(cv2.cvtColor(
+                cv2.resize(frame, self.__display_size, interpolation=cv2.INTER_AREA),
+                cv2.COLOR_BGR2RGB))
+
+            self.__cache.put(frame_no, image)
 
 
 class Player(tk.Tk):
     """
     .tssファイルに保存されているデータを再生するプレイヤー
     """
-    pass
+
+    # 表示する画像の大きさ
+    DISPLAY_SIZE = (960, 540)
+
+    # キャッシュするフレーム数
+    CACHE_SIZE = 256
+
+    # 先回りしてデコードするフレーム数
+    READ_AHEAD = 48
+
+    def __init__(self, file_path: Optional[Path] = None) -> None:
+        """
+        Parameters
+        ----------
+        file_path : Optional[Path]
+
+            再生するtss形式のファイルへのパス。Noneの場合はファイルを選択する画面を表示する
+        """
+        super().__init__()
+
+        self.title('TSS Player')
+
+        self.resizable(width=False, height=False)
+
+        if file_path is None:
+            file_path_str = filedialog.askopenfilename(filetypes=[('tss file', '*.tss')])
+
+            if file_path_str == '':
+                self.destroy()
+                return
+
+            file_path = Path(file_path_str)
+
+        self.title(file_path.name)
+
+        self.__file_manager = TSSFileManager(file_path)
+
+        video_reader = self.__file_manager.open_video()
+
+        self.__frame_count = video_reader.frame_count
+        self.__fps = video_reader.fps or 20.0
+
+        self.__stream_names = self.__file_manager.stream_names()
+        self.__stream = self.__stream_names[0]
+
+        self.__cache = FrameCache(Player.CACHE_SIZE)
+        self.__loader = ReadAheadLoader(video_reader, self.__cache, self.__frame_count,
+                                        Player.DISPLAY_SIZE, Player.READ_AHEAD)
+
+        self.__current_frame = 0
+        self.__displayed_frame: Optional[int] = None
+        self.__direction = 1
+        self.__is_playing = False
+
+        self.__create_widgets()
+
+        self.__loader.start()
+        self.__loader.request(0, 1)
+
+        self.__update()
+
+        self.mainloop()
+
+        self.__loader.stop()
+
+    def __create_widgets(self) -> None:
+        """
+        ウィジェットを配置する
+        """
+        # 動画画面
+        self.__canvas = tk.Canvas(self, width=Player.DISPLAY_SIZE[0], height=Player.DISPLAY_SIZE[1],
+                                  background='#000000')
+        self.__canvas.grid(row=0, column=0, columnspan=5)
+
+        # シークバー
+        scale = ttk.Scale(self, from_=0, to=max(0, self.__frame_count - 1),
+                          orient=tk.HORIZONTAL, length=Player.DISPLAY_SIZE[0],
+                          command=self.__on_scrubbed)
+        scale.grid(row=1, column=0, columnspan=5)
+        self.__scale = scale
+
+        # 操作ボタン
+        tk.Button(self, text=u'◀◀', width=6, command=lambda: self.__step(-1)).grid(row=2, column=0)
+
+        self.__play_button_label = tk.StringVar(value=u'再生')
+        tk.Button(self, textvariable=self.__play_button_label, width=6,
+                  command=self.__on_play_button_clicked).grid(row=2, column=1)
+
+        tk.Button(self, text=u'▶▶', width=6, command=lambda: self.__step(1)).grid(row=2, column=2)
+
+        self.__frame_label = tk.StringVar()
+        tk.Label(self, textvariable=self.__frame_label, width=24).grid(row=2, column=3)
+
+        # 表示するセンサの選択
+        stream_box = ttk.Combobox(self, values=self.__stream_names, state='readonly', width=16)
+        stream_box.set(self.__stream)
+        stream_box.bind('<<ComboboxSelected>>', lambda _: self.__on_stream_selected(stream_box.get()))
+        stream_box.grid(row=2, column=4)
+
+        # 現在のフレームで受信したデータ
+        self.__tree_view = ttk.Treeview(self, height=6, show='headings')
+        self.__tree_view.grid(row=3, column=0, columnspan=5, sticky=tk.EW)
+
+        self.__set_columns()
+
+        self.bind('<Left>', lambda _: self.__step(-1))
+        self.bind('<Right>', lambda _: self.__step(1))
+        self.bind('<space>', lambda _: self.__on_play_button_clicked())
+
+    def __set_columns(self) -> None:
+        """
+        選択されているセンサのラベルを表の列として設定する
+        """
+        labels = self.__file_manager.sensor_data(self.__stream).labels
+
+        self.__tree_view['columns'] = tuple(range(len(labels)))
+
+        for index, label in enumerate(labels):
+            self.__tree_view.column(index, width=75)
+            self.__tree_view.heading(index, text=label)
+
+    def __on_stream_selected(self, stream: str) -> None:
+        """
+        表示するセンサが選択された場合の処理
+        """
+        self.__stream = stream
+        self.__set_columns()
+        self.__displayed_frame = None
+
+    def __on_scrubbed(self, value: str) -> None:
+        """
+        シークバーが操作された場合の処理
+        """
+        frame_no = int(float(value))
+
+        if frame_no != self.__current_frame:
+            self.__direction = 1 if frame_no >= self.__current_frame else -1
+            self.__seek(frame_no)
+
+    def __on_play_button_clicked(self) -> None:
+        """
+        再生・停止ボタンが押された場合の処理
+        """
+        self.__is_playing = not self.__is_playing
+        self.__direction = 1
+        self.__play_button_label.set(u'停止' if self.__is_playing else u'再生')
+
+    def __step(self, direction: int) -> None:
+        """
+        1フレーム進める、もしくは戻す
+
+        Parameters
+        ----------
+        direction : int
+
+            進める場合は1、戻す場合は-1
+        """
+        self.__direction = direction
+        self.__seek(self.__current_frame + direction)
+
+    def __seek(self, frame_no: int) -> None:
+        """
+        表示するフレームを変更する
+
+        Parameters
+        ----------
+        frame_no : int
+
+            フレーム番号
+        """
+        self.__current_frame = min(max(frame_no, 0), max(0, self.__frame_count - 1))
+        self.__loader.request(self.__current_frame, self.__direction)
+
+    def __update(self) -> None:
+        """
+        画面の更新及び再生を行う
+        """
+        if self.__displayed_frame != self.__current_frame:
+            image = self.__cache.get(self.__current_frame)
+
+            if image is not None:
+                self.__show(self.__current_frame, image)
+
+        if self.__is_playing and self.__displayed_frame == self.__current_frame:
+            if self.__current_frame + 1 < self.__frame_count:
+                self.__seek(self.__current_frame + 1)
+            else:
+                self.__on_play_button_clicked()
+
+        self.after(max(1, int(1000 / self.__fps)), self.__update)
+
+    def __show(self, frame_no: int, image: Any) -> None:
+        """
+        フレームとそのフレームで受信したデータを表示する
+
+        Parameters
+        ----------
+        frame_no : int
+
+            フレーム番号
+
+        image : PIL.Image.Image
+
+            表示する画像
+        """
+        self.__buffer = ImageTk.PhotoImage(image)
+        self.__canvas.create_image(0, 0, image=self.__buffer, anchor=tk.NW)
+
+        self.__scale.set(frame_no)
+        self.__frame_label.set(f'{frame_no + 1} / {self.__frame_count}')
+
+        # フレームで受信したデータは二分探索で求める
+        records = self.__file_manager.sensor_data(self.__stream).at_frame(frame_no)
+
+        self.__tree_view.delete(*self.__tree_view.get_children())
+
+        for row in records.rows():
+            self.__tree_view.insert('', 'end', values=row)
+
+        self.__displayed_frame = frame_no
@@ -0,0 +1,325 @@
+from __future__ import annotations
+
+import json
+import threading
+
+from pathlib import Path
+from typing import IO, Any, Dict, List, Optional, Tuple
+
+
+class JsonLinesWriter:
+    """
+    JSON Lines形式のファイルへ逐次書き込むためのクラス
+
+    1行目にはヘッダが、2行目以降には1行につき1件の要素が書き込まれる。
+    要素はchunk_size件ごとにまとめてファイルへ書き出されるため、
+    書き込む件数に関わらずメモリ使用量は一定に保たれる。
+    """
+
+    def __init__(self, file_path: Path, header: Dict[str, Any], chunk_size: int = 256) -> None:
+        """
+        Parameters
+        ----------
+        file_path : Path
+
+            書き出し先のファイルへのパス
+
+        header : Dict[str, Any]
+
+            1行目に書き込まれるヘッダ
+
+        chunk_size : int
+
+            まとめて書き出す要素の件数
+        """
+        self.__file_path = file_path
+        self.__chunk_size = chunk_size
+
+        self.__buffer: List[str] = []
+        self.__lock = threading.Lock()
+
+        self.__file: Optional[IO[str]] = file_path.open(mode='w')
+        self.__file.write(json.dumps(header) + '\n')
+        self.__file.flush()
+
+    @property
+    def file_path(self) -> Path:
+        """
+        Returns
+        ----------
+        file_path : Path
+
+            書き出し先のファイルへのパス
+        """
+        return self.__file_path
+
+    @property
+    def closed(self) -> bool:
+        """
+        Returns
+        ----------
+        closed : bool
+
+            ファイルが閉じられているかどうか
+        """
+        return self.__file is None
+
+    def write_object(self, obj: Any) -> None:
+        """
+        要素を1件追加する
+
+        閉じられた後に呼び出された場合、要素は無視される。
+
+        Parameters
+        ----------
+        obj : Any
+
+            JSONに変換可能な要素
+        """
+        line = json.dumps(obj) + '\n'
+
+        with self.__lock:
+            if self.__file is None:
+                return
+
+            self.__buffer.append(line)
+
+            if len(self.__buffer) >= self.__chunk_size:
+                self.__flush()
+
+    def flush(self) -> None:
+        """
+        バッファに溜まっている要素をファイルへ書き出す
+        """
+        with self.__lock:
+            if self.__file is not None:
+                self.__flush()
+
+    def close(self) -> None:
+        """
+        バッファに溜まっている要素を書き出し、ファイルを閉じる
+        """
+        with self.__lock:
+            if self.__file is None:
+                return
+
+            self.__flush()
+            self.__file.close()
+            self.__file = None
+
+    def __flush(self) -> None:
+        """
+        ロックを取得した状態でバッファを書き出す
+        """
+        self.__file.writelines(self.__buffer)
+        self.__file.flush()
+        self.__buffer.clear()
+
+    def __enter__(self) -> JsonLinesWriter:
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+
+class RecordWriter(JsonLinesWriter):
+    """
+    センサから取得したデータを逐次ファイルへ書き出すためのクラス
+
+    1行目にはラベルを持つヘッダが、2行目以降には1行につき1件の記録が書き込まれる。
+    """
+
+    def __init__(self, file_path: Path, labels: Tuple[str, ...], chunk_size: int = 256) -> None:
+        """
+        Parameters
+        ----------
+        file_path : Path
+
+            書き出し先のファイルへのパス
+
+        labels : Tuple[str, ...]
+
+            記録されるデータのラベル
+
+        chunk_size : int
+
+            まとめて書き出す記録の件数
+        """
+        super().__init__(file_path, {'labels': list(labels)}, chunk_size)
+
+        self.__labels = labels
+
+        self.__count = 0
+        self.__first_timestamp: Optional[int] = None
+        self.__last_timestamp: Optional[int] = None
+
+    @property
+    def count(self) -> int:
+        """
+        Returns
+        ----------
+        count : int
+
+            書き込まれた記録の件数
+        """
+        return self.__count
+
+    @property
+    def rate(self) -> Optional[float]:
+        """
+        Returns
+        ----------
+        rate : Optional[float]
+
+            受信時刻から求めた1秒あたりの記録の件数。求められない場合はNone
+        """
+        if self.__first_timestamp is None or self.__last_timestamp == self.__first_timestamp:
+            return None
+
+        return (self.__count - 1) * 1e9 / (self.__last_timestamp - self.__first_timestamp)
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Returns
+        ----------
+        summary : Dict[str, Any]
+
+            ラベル・記録の件数・1秒あたりの記録の件数をまとめた情報
+        """
+        return {
+            'labels': list(self.__labels),
+            'count': self.__count,
+            'rate': self.rate
+        }
+
+    def write(self, frame: int, data: Tuple, timestamp: Optional[int] = None) -> None:
+        """
+        記録を1件追加する
+
+        閉じられた後に呼び出された場合、記録は無視される。
+
+        Parameters
+        ----------
+        frame : int
+
+            データを受信した時点のフレーム番号
+
+        data : Tuple
+
+            センサから取得したデータ
+
+        timestamp : Optional[int]
+
+            データを受信した時刻(time.monotonic_nsの値)
+        """
+        self.__count += 1
+
+        if timestamp is None:
+            self.write_object({'frame': frame, 'data': list(data)})
+            return
+
+        if self.__first_timestamp is None:
+            self.__first_timestamp = timestamp
+
+        self.__last_timestamp = timestamp
+
+        self.write_object({'frame': frame, 'time': timestamp, 'data': list(data)})
+
+
+class FrameIndexWriter(JsonLinesWriter):
+    """
+    録画した各フレームの撮影時刻を逐次ファイルへ書き出すためのクラス
+
+    1行目には時計の情報を持つヘッダが、2行目以降にはフレーム順に撮影時刻が書き込まれる。
+    """
+
+    def __init__(self, file_path: Path, chunk_size: int = 256) -> None:
+        """
+        Parameters
+        ----------
+        file_path : Path
+
+            書き出し先のファイルへのパス
+
+        chunk_size : int
+
+            まとめて書き出す撮影時刻の件数
+        """
+        super().__init__(file_path, {'clock': 'monotonic_ns'}, chunk_size)
+
+    def write(self, timestamp: int) -> None:
+        """
+        次のフレームの撮影時刻を追加する
+
+        Parameters
+        ----------
+        timestamp : int
+
+            撮影時刻(time.monotonic_nsの値)
+        """
+        self.write_object(timestamp)
+
+
+def read_json_lines(file: IO[str]) -> Tuple[Dict[str, Any], List[Any]]:
+    """
+    JsonLinesWriterによって書き出されたファイルを読み込む
+
+    Parameters
+    ----------
+    file : IO[str]
+
+        読み込むファイル
+
+    Returns
+    ----------
+    header : Dict[str, Any]
+
+        ヘッダ
+
+    objects : List[Any]
+
+        要素のリスト
+    """
+    header = json.loads(file.readline())
+
+    objects = []
+
+    for line in file:
+        # 書き込み途中で中断された最終行は読み飛ばす
+        if not line.endswith('\n'):
+            break
+
+        objects.append(json.loads(line))
+
+    return header, objects
+
+
+def read_record(file: IO[str], json_lines: bool) -> Dict[str, Any]:
+    """
+    記録ファイルを読み込む
+
+    Parameters
+    ----------
+    file : IO[str]
+
+        記録ファイル
+
+    json_lines : bool
+
+        RecordWriterによって書き出されたJSON Lines形式のファイルであるかどうか
+
+    Returns
+    ----------
+    record : Dict[str, Any]
+
+        labelsとdataをキーに持つ記録
+    """
+    if not json_lines:
+        return json.load(file)
+
+    header, data = read_json_lines(file)
+
+    return {
+        'labels': header['labels'],
+        'data': data
+    }
@@ -1,67 +1,93 @@
-import cv2
-import json
 import tkinter as tk
 import tkinter.ttk as ttk
 
 from pathlib import Path
 from PIL import Image, ImageTk  # type: ignore
 from tkinter import filedialog
-from tss import SensorObserver
-from tss import TSSFileManager
-from typing import Optional, Tuple
+from tss import BaseSensorObserver
+from tss import LogView
+from tss import RecordingEngine
+from tss import Sample
+from typing import Any, Dict, List, Optional, Sequence, Union
 
 
 class Recorder(tk.Frame):
     """
     レコーダー
+
+    撮影と記録はRecordingEngineが行い、このクラスはプレビューとログの表示及び録画の操作のみを行う。
     """
-    FOURCC = cv2.VideoWriter_fourcc(*'mp4v')
+
+    # プレビュー画像の大きさ
+    PREVIEW_SIZE = (960, 540)
+
+    # プレビューを更新する間隔(ミリ秒)
+    PREVIEW_INTERVAL = 33
+
+    # ログ画面に表示する最大の行数
+    LOG_MAX_ROWS = 200
+
+    # ログ画面を更新する間隔(ミリ秒)
+    LOG_REFRESH_INTERVAL = 100
 
     def __init__(self,
-                 sensor_observer: SensorObserver,
+                 sensor_observer: Union[BaseSensorObserver, Sequence[BaseSensorObserver]],
                  camera_id: int = 0,
                  frame_width: int = 1920,
                  frame_height: int = 1080,
-                 fps: int = 20) -> None:
+                 fps: int = 20,
+                 metrics_interval: Optional[float] = None,
+                 segment_duration: Optional[float] = None,
+                 segment_size: Optional[int] = None) -> None:
         """
         Parameters
         ----------
-        sensor_observer : SensorObserver
+        sensor_observer : Union[BaseSensorObserver, Sequence[BaseSensorObserver]]
 
-            センサとの通信を監視するためのクラス
+            センサとの通信を監視するためのクラス。SensorObserverもしくはAsyncSensorObserver
+
+            複数与えた場合、それぞれのセンサの記録は別々のストリームとして保存される
 
         camera_id : int
 
             使用するカメラID
-        """
-        super().__init__(tk.Tk('TSS Recorder'))
-        self.pack()
 
-        self.master.resizable(width=False, height=False)  # type: ignore
+        metrics_interval : Optional[float]
 
-        self.__fps = fps
+            録画中の計測値を.tssファイルへ記録する間隔(秒)。Noneの場合は記録しない
 
-        # ビデオキャプチャ
-        self.__video_capture: cv2.VideoCapture = cv2.VideoCapture(camera_id)
-        self.__video_capture.set(cv2.CAP_PROP_FRAME_WIDTH, frame_width)
-        self.__video_capture.set(cv2.CAP_PROP_FRAME_HEIGHT, frame_height)
-        self.__video_capture.set(cv2.CAP_PROP_FPS, fps)
+        segment_duration : Optional[float]
 
-        # ビデオライター
-        self.__video_writer: Optional[cv2.VideoWriter] = None
+            録画をセグメントに分ける時間(秒)。Noneの場合は時間では分けない
 
-        # 現在録音中であるかのフラグ
-        self.__is_recording: bool = False
+        segment_size : Optional[int]
 
-        # センサオブザーバー
-        self.__sensor_observer = sensor_observer
+            録画をセグメントに分ける大きさ(バイト)。Noneの場合は大きさでは分けない
+        """
+        super().__init__(tk.Tk('TSS Recorder'))
+        self.pack()
+
+        self.master.resizable(width=False, height=False)  # type: ignore
+
+        # 録画エンジン
+        self.__engine = RecordingEngine(sensor_observer,
+                                        camera_id=camera_id,
+                                        frame_width=frame_width,
+                                        frame_height=frame_height,
+                                        fps=fps,
+                                        preview_size=Recorder.PREVIEW_SIZE,
+                                        metrics_interval=metrics_interval,
+                                        segment_duration=segment_duration,
+                                        segment_size=segment_size)
 
         # ウィジェットの作成・配置
         self.__create_widgets()
 
-        # センサオブザーバーの立ち上げ
-        self.__sensor_observer.add_observe_method(self.__observe)
-        self.__sensor_observer.start_observe()
+        # 記録されたデータをログ画面へ渡す
+        self.__engine.add_record_observe_method(self.__on_recorded)
+
+        # センサの監視と撮影の開始
+        self.__engine.open()
 
         # update
         self.__update()
@@ -72,6 +98,29 @@ class Recorder(tk.Frame):
         # メインループを抜けたら終了処理
         self.__exit()
 
+    @property
+    def engine(self) -> RecordingEngine:
+        """
+        Returns
+        ----------
+        engine : RecordingEngine
+
+            撮影と記録を行う録画エンジン
+        """
+        return self.__engine
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        パイプラインと各センサの計測値を取得する。任意のスレッドから呼び出すことができる
+
+        Returns
+        ----------
+        metrics : Dict[str, Any]
+
+            RecordingEngine.metricsの値
+        """
+        return self.__engine.metrics()
+
     def __create_widgets(self) -> None:
         """
         ウィジェットを配置する
@@ -100,112 +149,88 @@ class Recorder(tk.Frame):
             self, width=1200, height=270, background='#cccccc')
         log_frame.grid(row=1, column=0, columnspan=2)
 
-        # ログ用テーブル
-        self.__tree_view = ttk.Treeview(log_frame)
+        # センサ毎のタブ
+        notebook = ttk.Notebook(log_frame)
 
-        self.__tree_view['columns'] = tuple(
-            [i for i in range(len(self.__sensor_observer.labels))])
-        self.__tree_view['show'] = 'headings'
+        # ログ用テーブル。直近の入力のみを一定の間隔で表示する
+        self.__log_views: Dict[str, LogView] = {}
 
-        for index, label in enumerate(self.__sensor_observer.labels):
-            self.__tree_view.column(index, width=75)
-            self.__tree_view.heading(index, text=label)
+        for name, observer in self.__engine.sensor_observers.items():
+            log_view = LogView(notebook, observer.labels,
+                               max_rows=Recorder.LOG_MAX_ROWS,
+                               refresh_interval=Recorder.LOG_REFRESH_INTERVAL)
 
-        self.__tree_view.place(relx=0.5, rely=0.5, anchor=tk.CENTER)
+            notebook.add(log_view, text=name)
+            self.__log_views[name] = log_view
+
+        notebook.place(relx=0.5, rely=0.5, anchor=tk.CENTER)
 
     def __update(self) -> None:
         """
-        画面の更新及び録画を行う
-        """
-        _, frame = self.__video_capture.read()
+        画面の更新を行う
 
-        if self.__is_recording:
-            self.__video_writer.write(frame)
-            self.__current_frame += 1
+        撮影と録画は録画エンジンのスレッドで行われるため、ここでは最新のプレビュー画像を表示するのみ
+        """
+        preview = self.__engine.get_preview()
 
-        self.__buffer = ImageTk.PhotoImage(Image.fromarray(
-            cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)).resize((960, 540)))
+        if preview is not None:
+            self.__buffer = ImageTk.PhotoImage(Image.fromarray(preview))
 
-        self.__preview_canvas.create_image(0, 0,
-                                           image=self.__buffer,
-                                           anchor=tk.NW)
+            self.__preview_canvas.create_image(0, 0,
+                                               image=self.__buffer,
+                                               anchor=tk.NW)
 
-        self.master.after(1, self.__update)
+        self.master.after(Recorder.PREVIEW_INTERVAL, self.__update)
 
     def __on_recording_button_clicked(self) -> None:
         """
         録画・録画停止ボタンが押された場合の処理
         """
-        if self.__is_recording:
+        if self.__engine.is_recording:
             self.__recording_button_label.set(u'録画開始')
             self.__finish_recording()
         else:
             self.__recording_button_label.set(u'録画停止')
-            self.__start_recording()
+            self.__engine.start()
 
-    def __observe(self, data: Optional[Tuple]) -> None:
-        """
-        データが観測された際のメソッド
+    def __on_recorded(self, name: str, samples: List[Sample]) -> None:
         """
-        if self.__is_recording:
-            if data is None:
-                return
+        録画中にデータが記録された際のメソッド
 
-            self.__record['data'].append({
-                'frame': self.__current_frame,
-                'data': list(data)
-            })
+        Parameters
+        ----------
+        name : str
 
-            self.__tree_view.insert('', 'end', values=data)
+            データを受信したセンサのストリーム名
 
-    def __start_recording(self) -> None:
-        """
-        録画を開始する
-        """
-        # ビデオライターの準備
-        self.__video_writer = cv2.VideoWriter('~temp.mp4',
-                                              Recorder.FOURCC,
-                                              self.__fps,
-                                              (int(self.__video_capture.get(cv2.CAP_PROP_FRAME_WIDTH)),
-                                               int(self.__video_capture.get(cv2.CAP_PROP_FRAME_HEIGHT))))
-
-        self.__record = {
-            'labels': self.__sensor_observer.labels,
-            'data': [
-            ]
-        }
+        samples : List[Sample]
 
-        self.__current_frame = -1
-        self.__is_recording = True
+            記録された受信時刻の付いたデータ
+        """
+        # ログ画面はTkのスレッドで更新されるため、ここではバッファへ追加するのみ
+        self.__log_views[name].push(samples)
 
     def __finish_recording(self) -> None:
         """
-        録画を終了する
+        録画を終了し、保存先を選択して保存する
         """
-        self.__is_recording = False
-        self.__video_writer = None
+        self.__engine.stop()
 
         # 記録したデータをtss形式で保存する
         file_path_str: str = filedialog.asksaveasfilename(
             filetypes=[('tss file', '*.tss')], initialfile=u'output.tss')
 
         if file_path_str == '':
-            Path('~temp.mp4').unlink()
+            self.__engine.discard()
             return
 
-        # センサから取得したデータの記録をjson形式で保存する
-        with Path('~temp.json').open(mode='w') as f:
-            json.dump(self.__record, f, indent=4)
-
-        tss_file_manager = TSSFileManager(Path(file_path_str))
-        tss_file_manager.save(Path('~temp.mp4'), Path('~temp.json'))
+        self.__engine.save(Path(file_path_str))
 
     def __exit(self) -> None:
         """
         終了処理
         """
-        if self.__is_recording:
+        if self.__engine.is_recording:
             self.__finish_recording()
 
-        self.__video_capture.release()
-        self.__sensor_observer.stop_observe()
+        self.__engine.close()
@@ -1,21 +1,153 @@
+import queue
 import threading
+import time
 
 from abc import ABCMeta, abstractmethod
-from typing import Callable, List, Optional, Tuple
+from tss.metrics import LatencyMeter, RateMeter
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
 
 
-class SensorObserver(metaclass=ABCMeta):
+class Sample(NamedTuple):
     """
-    センサとの通信を監視するためのクラス
+    受信時刻の付いたセンサからの入力
+    """
+
+    # 受信した時刻(time.monotonic_nsの値)
+    timestamp: int
+
+    # labelsに対応したデータ
+    data: Tuple
+
+
+class BatchSubscription:
+    """
+    センサからの入力をまとめて受け取るメソッドの登録情報
+    """
+
+    def __init__(self,
+                 batch_observe_method: Callable[[List[Sample]], None],
+                 batch_size: int,
+                 interval: float) -> None:
+        """
+        Parameters
+        ----------
+        batch_observe_method : Callable[[List[Sample]], None]
+
+            入力をまとめて受け取るメソッド
+
+        batch_size : int
+
+            まとめる入力の最大件数
+
+        interval : float
+
+            入力をまとめる最大の時間(秒)
+        """
+        self.batch_observe_method = batch_observe_method
+        self.batch_size = batch_size
+        self.interval = interval
+
+        self.samples: List[Sample] = []
+        self.deadline: Optional[float] = None
+
+    def append(self, sample: Sample) -> None:
+        """
+        入力を追加し、件数が上限に達した場合は通知する
+
+        Parameters
+        ----------
+        sample : Sample
+
+            センサからの入力
+        """
+        if self.deadline is None:
+            self.deadline = time.monotonic() + self.interval
+
+        self.samples.append(sample)
+
+        if len(self.samples) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        溜まっている入力を通知する
+        """
+        if len(self.samples) == 0:
+            return
+
+        samples = self.samples
+
+        self.samples = []
+        self.deadline = None
+
+        self.batch_observe_method(samples)
+
+
+class BaseSensorObserver(metaclass=ABCMeta):
+    """
+    センサとの通信を監視するクラスの基底クラス
+
+    読み出したデータは上限付きのキューへ追加され、通知用のスレッドから
+    登録されているメソッドへ通知される。
+    通知先の処理が遅い場合でも読み出しは止まらず、キューが溢れた場合はoverflow_policyに従う。
     """
 
-    def __init__(self, labels: Tuple[str, ...]) -> None:
+    # キューが溢れた場合の方針
+    # block: 空きができるまで読み出しを待機する
+    # drop_oldest: 最も古い入力を捨てる
+    # drop_newest: 新しい入力を捨てる
+    OVERFLOW_POLICIES = ('block', 'drop_oldest', 'drop_newest')
+
+    def __init__(self,
+                 labels: Tuple[str, ...],
+                 queue_size: int = 4096,
+                 overflow_policy: str = 'drop_oldest',
+                 name: Optional[str] = None) -> None:
+        """
+        Parameters
+        ----------
+        labels : Tuple[str, ...]
+
+            取得されるデータのラベル
+
+        queue_size : int
+
+            通知待ちの入力を保持するキューの大きさ
+
+        overflow_policy : str
+
+            キューが溢れた場合の方針。OVERFLOW_POLICIESのいずれか
+
+        name : Optional[str]
+
+            記録される際のストリーム名。Noneの場合はクラス名
+        """
+        if overflow_policy not in BaseSensorObserver.OVERFLOW_POLICIES:
+            raise ValueError(f'unknown overflow policy: {overflow_policy}')
+
         self.__labels = labels
+        self.__name = name if name is not None else type(self).__name__
         self.__observe_methods: List[Callable[[Tuple], None]] = []
+        self.__sample_observe_methods: List[Callable[[Sample], None]] = []
+        self.__batch_subscriptions: List[BatchSubscription] = []
+
+        self.__overflow_policy = overflow_policy
+        self.__queue: queue.Queue = queue.Queue(maxsize=queue_size)
+
+        self.__dropped_count = 0
+
+        # 実行中の計測値
+        self.__sample_rate = RateMeter()
+        self.__callback_latency = LatencyMeter()
 
         self.__is_observing = False
+        self.__is_dispatching = False
 
-        self.__observing_thread: Optional[threading.Thread] = None
+        self.__dispatching_thread: Optional[threading.Thread] = None
+
+        # drainで通知の完了を待っている要求。対象とする受信時刻の上限と、完了を知らせるイベントの組
+        self.__drain_requests: List[Tuple[int, threading.Event]] = []
+        self.__drain_lock = threading.Lock()
 
     @property
     def labels(self) -> Tuple[str, ...]:
@@ -28,6 +160,17 @@ class SensorObserver(metaclass=ABCMeta):
         """
         return self.__labels
 
+    @property
+    def name(self) -> str:
+        """
+        Returns
+        ----------
+        name : str
+
+            記録される際のストリーム名
+        """
+        return self.__name
+
     @property
     def is_observing(self) -> bool:
         """
@@ -39,27 +182,305 @@ class SensorObserver(metaclass=ABCMeta):
         """
         return self.__is_observing
 
-    def __observe(self) -> None:
+    @property
+    def dropped_count(self) -> int:
         """
-        センサとの通信を監視し、入力があった際に通知する。
+        Returns
+        ----------
+        dropped_count : int
+
+            キューが溢れたために捨てられた入力の件数。
+            overflow_policyが'block'の場合は、監視の終了までにキューへ追加できなかった入力の件数
         """
-        while self.__is_observing:
-            data = self.read_data()
+        return self.__dropped_count
 
-            self.__notity(data)
+    @property
+    def queue_depth(self) -> int:
+        """
+        Returns
+        ----------
+        queue_depth : int
 
-    def __notity(self, data: Tuple) -> None:
+            通知待ちの入力の件数
         """
+        return self.__queue.qsize()
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        監視の計測値を取得する。任意のスレッドから呼び出すことができる
+
+        Returns
+        ----------
+        metrics : Dict[str, Any]
+
+            以下の計測値
+
+            sample_rate : 直近1秒間の1秒あたりの入力数
+            received_samples : キューへ渡された入力の総数
+            queue_depth : 通知待ちの入力の件数
+            queue_size : キューの大きさ
+            dropped_count : キューが溢れたために捨てられた入力の件数
+            callback_latency : 1件の入力の通知にかかった時間
+        """
+        return {
+            'sample_rate': self.__sample_rate.rate,
+            'received_samples': self.__sample_rate.count,
+            'queue_depth': self.__queue.qsize(),
+            'queue_size': self.__queue.maxsize,
+            'dropped_count': self.__dropped_count,
+            'callback_latency': self.__callback_latency.snapshot()
+        }
+
+    def _offer(self, sample: Sample, timeout: Optional[float] = None) -> bool:
+        """
+        入力をキューへ追加する
+
         Parameters
         ----------
-        data : Tuple
+        sample : Sample
+
+            受信時刻の付いたセンサからの入力
+
+        timeout : Optional[float]
+
+            overflow_policyが'block'の場合に空きを待つ時間(秒)。Noneの場合は待機しない
+
+        Returns
+        ----------
+        accepted : bool
+
+            入力が追加されたか、方針に従って処理されたか。
+            'block'の場合にキューが満杯のままであればFalse
+        """
+        if self.__overflow_policy == 'block':
+            try:
+                if timeout is None:
+                    self.__queue.put_nowait(sample)
+                else:
+                    self.__queue.put(sample, timeout=timeout)
+
+                self.__sample_rate.mark(sample.timestamp)
+                return True
+            except queue.Full:
+                return False
+
+        self.__sample_rate.mark(sample.timestamp)
+
+        try:
+            self.__queue.put_nowait(sample)
+            return True
+        except queue.Full:
+            self.__dropped_count += 1
+
+        if self.__overflow_policy == 'drop_oldest':
+            try:
+                self.__queue.get_nowait()
+            except queue.Empty:
+                pass
+
+            try:
+                self.__queue.put_nowait(sample)
+            except queue.Full:
+                pass
+
+        return True
+
+    def _abandon(self, sample: Sample) -> None:
+        """
+        監視の終了によって空きを待てなくなった入力を、最後にもう一度キューへ追加する。
+        追加できなかった場合は捨てられた入力として数える
+
+        Parameters
+        ----------
+        sample : Sample
+
+            'block'の方針でキューへ追加できずに保持していた入力
+        """
+        if not self._offer(sample):
+            self.__dropped_count += 1
+
+    def _start_dispatching(self) -> None:
+        """
+        監視中の状態にし、通知用のスレッドを開始する
+        """
+        self.__dispatching_thread = threading.Thread(target=self.__dispatch)
+
+        self.__is_observing = True
+        self.__is_dispatching = True
+        self.__dispatching_thread.start()
+
+    def _end_observing(self) -> None:
+        """
+        監視中の状態を解除する
+        """
+        self.__is_observing = False
+
+    def _join_dispatching(self) -> None:
+        """
+        通知待ちの入力が全て通知され、通知用のスレッドが終了するまで待機する
+        """
+        self.__is_observing = False
+        self.__is_dispatching = False
+
+        # 入力を待っている通知用のスレッドを起こす
+        try:
+            self.__queue.put_nowait(None)
+        except queue.Full:
+            pass
+
+        if self.__dispatching_thread is not None:
+            self.__dispatching_thread.join()
+            self.__dispatching_thread = None
+
+    def drain(self, timestamp: Optional[int] = None, timeout: Optional[float] = 1.0) -> bool:
+        """
+        指定された時刻までに受信した入力が、まとめて受け取るメソッドも含めて全て通知されるまで待機する
+
+        Parameters
+        ----------
+        timestamp : Optional[int]
+
+            受信時刻(time.monotonic_nsの値)の上限。Noneの場合は呼び出した時刻
+
+        timeout : Optional[float]
+
+            待機する最大の時間(秒)。Noneの場合は完了するまで待機する
+
+        Returns
+        ----------
+        drained : bool
+
+            時間内に通知が完了した場合はTrue。監視中でない場合は待機せずにTrue
+        """
+        dispatching_thread = self.__dispatching_thread
+
+        # 通知用のスレッド自身から呼び出された場合は、待機すると終わらないため何もしない
+        if dispatching_thread is None or dispatching_thread is threading.current_thread():
+            return True
+
+        if timestamp is None:
+            timestamp = time.monotonic_ns()
+
+        event = threading.Event()
+
+        with self.__drain_lock:
+            self.__drain_requests.append((timestamp, event))
+
+        # 入力を待っている通知用のスレッドを起こす
+        try:
+            self.__queue.put_nowait(None)
+        except queue.Full:
+            pass
+
+        return event.wait(timeout)
+
+    def __complete_drains(self, last_timestamp: Optional[int]) -> None:
+        """
+        通知が完了したdrainの要求に対し、溜まっている入力をまとめて通知してから完了を知らせる
+
+        Parameters
+        ----------
+        last_timestamp : Optional[int]
+
+            最後に通知した入力の受信時刻
+        """
+        with self.__drain_lock:
+            if len(self.__drain_requests) == 0:
+                return
+
+            # 入力は受信順にキューへ追加されるため、要求の時刻以降の入力を通知したか、キューが空であれば完了している
+            is_empty = self.__queue.empty()
+
+            completed = [(timestamp, event) for timestamp, event in self.__drain_requests
+                         if is_empty or (last_timestamp is not None and timestamp <= last_timestamp)]
+
+            if len(completed) == 0:
+                return
+
+            self.__drain_requests = [request for request in self.__drain_requests if request not in completed]
+
+        for subscription in self.__batch_subscriptions:
+            subscription.flush()
+
+        for _, event in completed:
+            event.set()
 
-            センサからの入力。
+    def __dispatch(self) -> None:
+        """
+        キューから入力を取り出し、登録されているメソッドへ通知する。
+        """
+        last_timestamp: Optional[int] = None
+
+        while self.__is_dispatching or not self.__queue.empty():
+            try:
+                sample = self.__queue.get(timeout=self.__next_timeout())
+            except queue.Empty:
+                sample = None
+
+            if sample is not None:
+                start_time = time.monotonic_ns()
+                self.__notity(sample)
+                self.__callback_latency.record(time.monotonic_ns() - start_time)
+
+                last_timestamp = sample.timestamp
+
+            now = time.monotonic()
+
+            for subscription in self.__batch_subscriptions:
+                if subscription.deadline is not None and subscription.deadline <= now:
+                    start_time = time.monotonic_ns()
+                    subscription.flush()
+                    self.__callback_latency.record(time.monotonic_ns() - start_time)
+
+            self.__complete_drains(last_timestamp)
+
+        for subscription in self.__batch_subscriptions:
+            subscription.flush()
+
+        # 終了までに完了しなかった要求も、全ての入力を通知し終えたため完了とする
+        with self.__drain_lock:
+            requests = self.__drain_requests
+            self.__drain_requests = []
+
+        for _, event in requests:
+            event.set()
+
+    def __next_timeout(self) -> float:
+        """
+        次にまとめて通知する必要がある時刻までの時間を求める
+
+        Returns
+        ----------
+        timeout : float
+
+            キューの待機時間(秒)
+        """
+        deadlines = [subscription.deadline for subscription in self.__batch_subscriptions
+                     if subscription.deadline is not None]
+
+        if len(deadlines) == 0:
+            return 0.1
+
+        return min(0.1, max(0.0, min(deadlines) - time.monotonic()))
+
+    def __notity(self, sample: Sample) -> None:
+        """
+        Parameters
+        ----------
+        sample : Sample
+
+            受信時刻の付いたセンサからの入力。
 
             labelsに対応したデータが格納されている必要がある。
         """
         for observe_method in self.__observe_methods:
-            observe_method(data)
+            observe_method(sample.data)
+
+        for sample_observe_method in self.__sample_observe_methods:
+            sample_observe_method(sample)
+
+        for subscription in self.__batch_subscriptions:
+            subscription.append(sample)
 
     def add_observe_method(self, observe_method: Callable[[Tuple], None]) -> None:
         """
@@ -73,21 +494,127 @@ class SensorObserver(metaclass=ABCMeta):
         """
         self.__observe_methods.append(observe_method)
 
+    def add_sample_observe_method(self, sample_observe_method: Callable[[Sample], None]) -> None:
+        """
+        センサからの入力があった際に、受信時刻と共に呼び出されるメソッドを追加する
+
+        Parameters
+        ----------
+        sample_observe_method : Callable[[Sample], None]
+
+            センサからの入力が合った際に呼び出されるメソッド
+        """
+        self.__sample_observe_methods.append(sample_observe_method)
+
+    def add_batch_observe_method(self,
+                                 batch_observe_method: Callable[[List[Sample]], None],
+                                 batch_size: int = 64,
+                                 interval: float = 0.1) -> None:
+        """
+        センサからの入力をまとめて受け取るメソッドを追加する
+
+        入力がbatch_size件溜まるか、最初の入力からinterval秒経過した時点で呼び出される。
+
+        Parameters
+        ----------
+        batch_observe_method : Callable[[List[Sample]], None]
+
+            受信時刻の付いた入力のリストを受け取るメソッド
+
+        batch_size : int
+
+            まとめる入力の最大件数
+
+        interval : float
+
+            入力をまとめる最大の時間(秒)
+        """
+        self.__batch_subscriptions.append(
+            BatchSubscription(batch_observe_method, batch_size, interval))
+
+    @abstractmethod
+    def start_observe(self) -> None:
+        """
+        センサとの通信の監視を開始する
+        """
+        pass
+
+    @abstractmethod
+    def stop_observe(self) -> None:
+        """
+        センサとの通信の監視を終了する
+        """
+        pass
+
+
+class SensorObserver(BaseSensorObserver):
+    """
+    センサとの通信を監視するためのクラス
+
+    センサからの読み出しは専用のスレッドで行われる。
+    """
+
+    def __init__(self,
+                 labels: Tuple[str, ...],
+                 queue_size: int = 4096,
+                 overflow_policy: str = 'drop_oldest',
+                 name: Optional[str] = None) -> None:
+        """
+        Parameters
+        ----------
+        labels : Tuple[str, ...]
+
+            取得されるデータのラベル
+
+        queue_size : int
+
+            通知待ちの入力を保持するキューの大きさ
+
+        overflow_policy : str
+
+            キューが溢れた場合の方針。OVERFLOW_POLICIESのいずれか
+
+        name : Optional[str]
+
+            記録される際のストリーム名。Noneの場合はクラス名
+        """
+        super().__init__(labels, queue_size, overflow_policy, name)
+
+        self.__observing_thread: Optional[threading.Thread] = None
+
+    def __observe(self) -> None:
+        """
+        センサとの通信を監視し、入力があった際にキューへ追加する。
+        """
+        while self.is_observing:
+            data = self.read_data()
+            timestamp = time.monotonic_ns()
+
+            sample = Sample(timestamp, data)
+
+            while not self._offer(sample, timeout=0.1):
+                if not self.is_observing:
+                    self._abandon(sample)
+                    break
+
     def start_observe(self) -> None:
         """
         センサとの通信の監視を開始する
         """
         self.__observing_thread = threading.Thread(target=self.__observe)
 
-        self.__is_observing = True
+        self._start_dispatching()
         self.__observing_thread.start()
 
     def stop_observe(self) -> None:
         """
         センサとの通信の監視を終了する
+
+        通知待ちの入力は全て通知されてから終了する。
         """
-        self.__is_observing = False
+        self._end_observing()
         self.__observing_thread.join()
+        self._join_dispatching()
 
     @abstractmethod
     def read_data(self) -> Tuple:
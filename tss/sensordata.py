@@ -0,0 +1,680 @@
+from __future__ import annotations
+
+import numpy as np
+
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+
+class SensorData:
+    """
+    計測データを列指向で保持するクラス
+
+    フレーム番号の配列と、ラベル毎の型付き配列を持つ。
+    フレーム番号は昇順に並んでいるため、範囲の指定は二分探索で解決される。
+    """
+
+    AGGREGATE_FUNCTIONS: Dict[str, Callable[[np.ndarray], Any]] = {
+        'mean': np.mean,
+        'min': np.min,
+        'max': np.max,
+        'sum': np.sum,
+        'std': np.std,
+        'median': np.median
+    }
+
+    # resampleで用いることができる集計方法
+    RESAMPLE_FUNCTIONS = ('mean', 'min', 'max', 'sum', 'first', 'last', 'count')
+
+    def __init__(self,
+                 labels: Sequence[str],
+                 frames: np.ndarray,
+                 columns: Dict[str, np.ndarray],
+                 times: Optional[np.ndarray] = None) -> None:
+        """
+        Parameters
+        ----------
+        labels : Sequence[str]
+
+            データのラベル
+
+        frames : np.ndarray
+
+            各記録を受信したフレーム番号
+
+        columns : Dict[str, np.ndarray]
+
+            ラベル毎のデータ。各配列の長さはframesと等しい必要がある
+
+        times : Optional[np.ndarray]
+
+            各記録を受信した時刻(time.monotonic_nsの値)。記録されていない場合はNone
+        """
+        self.__labels: Tuple[str, ...] = tuple(labels)
+        self.__frames = np.asarray(frames, dtype=np.int64)
+        self.__columns = {label: np.asarray(columns[label]) for label in self.__labels}
+        self.__times = None if times is None else np.asarray(times, dtype=np.int64)
+
+        # 記録は通常フレーム順に並んでいるが、そうでない場合は並べ替える
+        if self.__frames.size > 1 and np.any(self.__frames[1:] < self.__frames[:-1]):
+            if self.__times is None:
+                order = np.argsort(self.__frames, kind='stable')
+            else:
+                order = np.lexsort((self.__times, self.__frames))
+
+            self.__frames = self.__frames[order]
+            self.__columns = {label: column[order] for label, column in self.__columns.items()}
+
+            if self.__times is not None:
+                self.__times = self.__times[order]
+
+    @classmethod
+    def from_record(cls, record: Dict[str, Any]) -> SensorData:
+        """
+        labelsとdataをキーに持つ記録から生成する
+
+        Parameters
+        ----------
+        record : Dict[str, Any]
+
+            TSSFileManager.read_recordで読み込んだ記録
+
+        Returns
+        ----------
+        sensor_data : SensorData
+
+            列指向に変換された計測データ
+        """
+        labels = record['labels']
+        records = record['data']
+
+        frames = np.fromiter((r['frame'] for r in records), dtype=np.int64, count=len(records))
+
+        if len(records) == 0:
+            values: Iterable[Sequence[Any]] = [() for _ in labels]
+        else:
+            values = zip(*(r['data'] for r in records))
+
+        columns = {label: np.asarray(column) for label, column in zip(labels, values)}
+
+        times = None
+
+        if len(records) > 0 and 'time' in records[0]:
+            times = np.fromiter((r['time'] for r in records), dtype=np.int64, count=len(records))
+
+        return cls(labels, frames, columns, times)
+
+    @property
+    def labels(self) -> Tuple[str, ...]:
+        """
+        Returns
+        ----------
+        labels : Tuple[str, ...]
+
+            データのラベル
+        """
+        return self.__labels
+
+    @property
+    def frames(self) -> np.ndarray:
+        """
+        Returns
+        ----------
+        frames : np.ndarray
+
+            各記録を受信したフレーム番号
+        """
+        return self.__frames
+
+    @property
+    def times(self) -> Optional[np.ndarray]:
+        """
+        Returns
+        ----------
+        times : Optional[np.ndarray]
+
+            各記録を受信した時刻(time.monotonic_nsの値)。記録されていない場合はNone
+        """
+        return self.__times
+
+    @property
+    def columns(self) -> Dict[str, np.ndarray]:
+        """
+        Returns
+        ----------
+        columns : Dict[str, np.ndarray]
+
+            ラベル毎のデータ
+        """
+        return self.__columns
+
+    def __len__(self) -> int:
+        return int(self.__frames.size)
+
+    def __getitem__(self, label: str) -> np.ndarray:
+        return self.__columns[label]
+
+    def rows(self) -> Iterator[Tuple[Any, ...]]:
+        """
+        記録を1件ずつタプルとして返す
+
+        Returns
+        ----------
+        rows : Iterator[Tuple[Any, ...]]
+
+            labelsに対応したデータのタプル
+        """
+        return zip(*(self.__columns[label].tolist() for label in self.__labels))
+
+    def frame_slice(self, start_frame: Optional[int] = None, end_frame: Optional[int] = None) -> slice:
+        """
+        指定されたフレーム範囲に含まれる記録の位置を二分探索で求める
+
+        Parameters
+        ----------
+        start_frame : Optional[int]
+
+            範囲の開始フレーム番号。Noneの場合は先頭から
+
+        end_frame : Optional[int]
+
+            範囲の終了フレーム番号(このフレームを含む)。Noneの場合は末尾まで
+
+        Returns
+        ----------
+        index : slice
+
+            範囲に含まれる記録の位置
+        """
+        start = 0 if start_frame is None else int(np.searchsorted(self.__frames, start_frame, side='left'))
+        end = len(self) if end_frame is None else int(np.searchsorted(self.__frames, end_frame, side='right'))
+
+        return slice(start, max(start, end))
+
+    def frame_range(self, start_frame: Optional[int] = None, end_frame: Optional[int] = None) -> SensorData:
+        """
+        指定されたフレーム範囲に含まれる記録を取り出す
+
+        Parameters
+        ----------
+        start_frame : Optional[int]
+
+            範囲の開始フレーム番号。Noneの場合は先頭から
+
+        end_frame : Optional[int]
+
+            範囲の終了フレーム番号(このフレームを含む)。Noneの場合は末尾まで
+
+        Returns
+        ----------
+        sensor_data : SensorData
+
+            範囲に含まれる記録。配列はコピーされずに元のデータを参照する
+        """
+        return self.take(self.frame_slice(start_frame, end_frame))
+
+    def time_slice(self, start_time: Optional[int] = None, end_time: Optional[int] = None) -> slice:
+        """
+        指定された時間範囲に受信した記録の位置を二分探索で求める
+
+        Parameters
+        ----------
+        start_time : Optional[int]
+
+            範囲の開始時刻(time.monotonic_nsの値)。Noneの場合は先頭から
+
+        end_time : Optional[int]
+
+            範囲の終了時刻(この時刻を含む)。Noneの場合は末尾まで
+
+        Returns
+        ----------
+        index : slice
+
+            範囲に含まれる記録の位置
+
+        Raises
+        ----------
+        ValueError
+
+            受信時刻が記録されていないことを知らせる例外
+        """
+        if self.__times is None:
+            raise ValueError('times are not recorded')
+
+        start = 0 if start_time is None else int(np.searchsorted(self.__times, start_time, side='left'))
+        end = len(self) if end_time is None else int(np.searchsorted(self.__times, end_time, side='right'))
+
+        return slice(start, max(start, end))
+
+    def time_range(self, start_time: Optional[int] = None, end_time: Optional[int] = None) -> SensorData:
+        """
+        指定された時間範囲に受信した記録を取り出す
+
+        Parameters
+        ----------
+        start_time : Optional[int]
+
+            範囲の開始時刻(time.monotonic_nsの値)。Noneの場合は先頭から
+
+        end_time : Optional[int]
+
+            範囲の終了時刻(この時刻を含む)。Noneの場合は末尾まで
+
+        Returns
+        ----------
+        sensor_data : SensorData
+
+            範囲に含まれる記録
+        """
+        return self.take(self.time_slice(start_time, end_time))
+
+    def at_frame(self, frame: int) -> SensorData:
+        """
+        指定されたフレームで受信した記録を取り出す
+
+        Parameters
+        ----------
+        frame : int
+
+            フレーム番号
+
+        Returns
+        ----------
+        sensor_data : SensorData
+
+            該当する記録
+        """
+        return self.frame_range(frame, frame)
+
+    def take(self, index: Any) -> SensorData:
+        """
+        位置を指定して記録を取り出す
+
+        Parameters
+        ----------
+        index : Any
+
+            スライス、位置の配列、もしくは真偽値の配列
+
+        Returns
+        ----------
+        sensor_data : SensorData
+
+            取り出された記録
+        """
+        return SensorData(self.__labels,
+                          self.__frames[index],
+                          {label: column[index] for label, column in self.__columns.items()},
+                          None if self.__times is None else self.__times[index])
+
+    def filter(self, mask: np.ndarray) -> SensorData:
+        """
+        条件に合う記録を取り出す
+
+        Parameters
+        ----------
+        mask : np.ndarray
+
+            記録毎の真偽値の配列。例えば data['AccelZ'] > 0 のように作成する
+
+        Returns
+        ----------
+        sensor_data : SensorData
+
+            条件に合う記録
+        """
+        return self.take(np.asarray(mask, dtype=bool))
+
+    def aggregate(self, function: str, labels: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+        """
+        ラベル毎にデータを集計する
+
+        Parameters
+        ----------
+        function : str
+
+            集計方法。AGGREGATE_FUNCTIONSのキーのいずれか
+
+        labels : Optional[Sequence[str]]
+
+            集計するラベル。Noneの場合は数値型の全てのラベル
+
+        Returns
+        ----------
+        result : Dict[str, Any]
+
+            ラベル毎の集計結果
+        """
+        aggregate_function = SensorData.AGGREGATE_FUNCTIONS[function]
+
+        if labels is None:
+            labels = [label for label in self.__labels
+                      if np.issubdtype(self.__columns[label].dtype, np.number)]
+
+        return {label: aggregate_function(self.__columns[label]).item() for label in labels}
+
+    def resample(self,
+                 functions: Sequence[str] = ('mean',),
+                 labels: Optional[Sequence[str]] = None,
+                 interval: Optional[int] = None,
+                 origin: Optional[int] = None,
+                 fill: bool = False) -> SensorData:
+        """
+        フレーム毎もしくは一定の時間毎に記録をまとめて集計する
+
+        記録は連続した区間毎にまとめられ、各集計はnumpyのreduceatによって全ての区間について1度に求められる。
+        結果は区間毎に1件の記録を持ち、ラベルは'AccelZ_mean'のように元のラベルと集計方法を繋げたものになる。
+
+        Parameters
+        ----------
+        functions : Sequence[str]
+
+            集計方法。RESAMPLE_FUNCTIONSの要素のいずれか。'count'は区間毎の記録の件数を'count'として追加する
+
+        labels : Optional[Sequence[str]]
+
+            集計するラベル。Noneの場合は数値型の全てのラベル
+
+        interval : Optional[int]
+
+            区間の長さ(ナノ秒)。Noneの場合はフレーム毎にまとめる
+
+        origin : Optional[int]
+
+            最初の区間の開始時刻(time.monotonic_nsの値)。Noneの場合は最初の記録の受信時刻
+
+        fill : bool
+
+            記録の無い区間も結果に含めるかどうか。含める場合、集計値はNaN、'count'は0となる
+
+        Returns
+        ----------
+        sensor_data : SensorData
+
+            区間毎の集計結果。フレーム毎の場合はframesが各フレーム番号となる。
+            一定の時間毎の場合はtimesが各区間の開始時刻、framesが区間の最初の記録を受信したフレーム番号となる
+
+        Raises
+        ----------
+        ValueError
+
+            集計方法が不正であること、もしくは時間毎にまとめるための受信時刻が記録されていないことを知らせる例外
+        """
+        for function in functions:
+            if function not in SensorData.RESAMPLE_FUNCTIONS:
+                raise ValueError(f'unknown resample function: {function}')
+
+        if labels is None:
+            labels = [label for label in self.__labels
+                      if np.issubdtype(self.__columns[label].dtype, np.number)]
+
+        value_functions = [function for function in functions if function != 'count']
+        result_labels = [f'{label}_{function}' for label in labels for function in value_functions]
+
+        if 'count' in functions:
+            result_labels.append('count')
+
+        frames = self.__frames
+        columns = self.__columns
+        times = self.__times
+
+        if interval is None:
+            keys = frames
+        else:
+            if times is None:
+                raise ValueError('receive times are not recorded')
+
+            # 区間は受信時刻で決まるため、受信時刻順に並べる
+            if times.size > 1 and np.any(times[1:] < times[:-1]):
+                order = np.argsort(times, kind='stable')
+                frames = frames[order]
+                times = times[order]
+                columns = {label: column[order] for label, column in columns.items()}
+
+            if origin is None:
+                origin = int(times[0]) if times.size > 0 else 0
+
+            keys = (times - origin) // interval
+
+        if keys.size == 0:
+            return SensorData(result_labels, np.zeros(0, dtype=np.int64),
+                              {label: np.zeros(0) for label in result_labels},
+                              None if interval is None else np.zeros(0, dtype=np.int64))
+
+        starts = np.concatenate(([0], np.flatnonzero(keys[1:] != keys[:-1]) + 1))
+        ends = np.append(starts[1:], keys.size)
+        counts = ends - starts
+
+        results: Dict[str, np.ndarray] = {}
+
+        for label in labels:
+            column = columns[label]
+
+            for function in value_functions:
+                if function == 'mean':
+                    value = np.add.reduceat(column.astype(np.float64), starts) / counts
+                elif function == 'sum':
+                    value = np.add.reduceat(column, starts)
+                elif function == 'min':
+                    value = np.minimum.reduceat(column, starts)
+                elif function == 'max':
+                    value = np.maximum.reduceat(column, starts)
+                elif function == 'first':
+                    value = column[starts]
+                else:
+                    value = column[ends - 1]
+
+                results[f'{label}_{function}'] = value
+
+        if 'count' in functions:
+            results['count'] = counts
+
+        group_keys = keys[starts]
+        group_frames = frames[starts]
+
+        if fill:
+            present = np.zeros(int(group_keys[-1] - group_keys[0]) + 1, dtype=bool)
+            present[group_keys - group_keys[0]] = True
+
+            for name, value in results.items():
+                if name == 'count':
+                    filled = np.zeros(present.size, dtype=value.dtype)
+                elif np.issubdtype(value.dtype, np.number):
+                    filled = np.full(present.size, np.nan)
+                else:
+                    filled = np.full(present.size, None, dtype=object)
+
+                filled[present] = value
+                results[name] = filled
+
+            # 記録の無い区間は、直前の区間のフレーム番号を引き継ぐ
+            group_frames = group_frames[np.cumsum(present) - 1]
+            group_keys = np.arange(group_keys[0], group_keys[-1] + 1)
+
+        if interval is None:
+            return SensorData(result_labels, group_keys, results)
+
+        return SensorData(result_labels, group_frames, results, origin + group_keys * interval)
+
+
+class FrameIndex:
+    """
+    録画した各フレームの撮影時刻の索引
+
+    フレームと時刻の対応は二分探索で解決される。
+    """
+
+    def __init__(self, timestamps: np.ndarray) -> None:
+        """
+        Parameters
+        ----------
+        timestamps : np.ndarray
+
+            フレーム順に並んだ撮影時刻(time.monotonic_nsの値)
+        """
+        self.__timestamps = np.asarray(timestamps, dtype=np.int64)
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        """
+        Returns
+        ----------
+        timestamps : np.ndarray
+
+            フレーム順に並んだ撮影時刻
+        """
+        return self.__timestamps
+
+    def __len__(self) -> int:
+        return int(self.__timestamps.size)
+
+    def timestamp_of(self, frame: int) -> int:
+        """
+        Parameters
+        ----------
+        frame : int
+
+            フレーム番号
+
+        Returns
+        ----------
+        timestamp : int
+
+            フレームの撮影時刻
+        """
+        return int(self.__timestamps[frame])
+
+    def frame_at(self, timestamp: Any) -> Any:
+        """
+        指定された時刻に表示されていたフレームを求める
+
+        Parameters
+        ----------
+        timestamp : int or np.ndarray
+
+            時刻
+
+        Returns
+        ----------
+        frame : int or np.ndarray
+
+            その時刻以前に撮影された最後のフレームの番号。最初のフレームより前の場合は-1
+        """
+        return np.searchsorted(self.__timestamps, timestamp, side='right') - 1
+
+    def nearest_frame(self, timestamp: Any) -> Any:
+        """
+        指定された時刻に最も近い時刻に撮影されたフレームを求める
+
+        Parameters
+        ----------
+        timestamp : int or np.ndarray
+
+            時刻
+
+        Returns
+        ----------
+        frame : int or np.ndarray
+
+            最も近いフレームの番号
+        """
+        timestamp = np.asarray(timestamp, dtype=np.int64)
+
+        right = np.clip(np.searchsorted(self.__timestamps, timestamp), 1, len(self) - 1)
+        left = right - 1
+
+        nearest = np.where(np.abs(self.__timestamps[right] - timestamp) < np.abs(timestamp - self.__timestamps[left]),
+                           right, left)
+
+        if len(self) == 1:
+            nearest = np.zeros_like(nearest)
+
+        return nearest if nearest.ndim > 0 else int(nearest)
+
+    def frame_range(self, start_time: int, end_time: int) -> Tuple[int, int]:
+        """
+        指定された時間範囲に撮影されたフレームの範囲を求める
+
+        Parameters
+        ----------
+        start_time : int
+
+            範囲の開始時刻
+
+        end_time : int
+
+            範囲の終了時刻(この時刻を含む)
+
+        Returns
+        ----------
+        frame_range : Tuple[int, int]
+
+            範囲に含まれる最初と最後のフレームの番号。範囲にフレームが無い場合は最初が最後より大きくなる
+        """
+        start = int(np.searchsorted(self.__timestamps, start_time, side='left'))
+        end = int(np.searchsorted(self.__timestamps, end_time, side='right')) - 1
+
+        return start, end
+
+
+def join_sensor_data(streams: Dict[str, SensorData], on: str) -> SensorData:
+    """
+    複数のストリームの計測データを時刻で揃えて結合する
+
+    基準となるストリームの各記録に対し、他のストリームからはその時刻以前で最新の記録が
+    二分探索で対応付けられる。該当する記録が無い場合、数値はNaN、それ以外はNoneとなる。
+    受信時刻が記録されていない場合はフレーム番号で揃える。
+
+    Parameters
+    ----------
+    streams : Dict[str, SensorData]
+
+        ストリーム名をキーとする計測データ
+
+    on : str
+
+        基準となるストリーム名
+
+    Returns
+    ----------
+    sensor_data : SensorData
+
+        'ストリーム名.ラベル'をラベルとする計測データ
+    """
+    base = streams[on]
+
+    use_times = all(stream.times is not None for stream in streams.values())
+
+    base_keys = base.times if use_times else base.frames
+
+    labels: List[str] = []
+    columns: Dict[str, np.ndarray] = {}
+
+    for name, stream in streams.items():
+        if name == on:
+            index = np.arange(len(base))
+        else:
+            keys = stream.times if use_times else stream.frames
+            index = np.searchsorted(keys, base_keys, side='right') - 1
+
+        missing = index < 0
+        safe_index = np.maximum(index, 0)
+
+        for label in stream.labels:
+            column = stream[label]
+
+            if len(column) == 0:
+                values = np.full(len(base), None, dtype=object)
+            elif not missing.any():
+                values = column[safe_index]
+            elif np.issubdtype(column.dtype, np.number):
+                values = column[safe_index].astype(np.float64)
+                values[missing] = np.nan
+            else:
+                values = column[safe_index].astype(object)
+                values[missing] = None
+
+            labels.append(f'{name}.{label}')
+            columns[f'{name}.{label}'] = values
+
+    return SensorData(labels, base.frames, columns, base.times)
@@ -0,0 +1,491 @@
+from __future__ import annotations
+
+import bisect
+import cv2
+import json
+import os
+import shutil
+import tempfile
+import zipfile
+
+from pathlib import Path
+from tss.mp4 import member_data_offset, read_keyframe_index
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+
+class VideoReader:
+    """
+    .tss形式のファイルに格納されている動画を、解凍せずに読み出すためのクラス
+
+    動画が無圧縮で格納されている場合は、アーカイブ内の該当範囲をそのまま開く。
+    圧縮されている場合のみ、動画のメンバーだけを一意な一時ファイルへ書き出して開く。
+
+    キーフレームの索引が与えられた場合、シークは目的のフレーム以前で最も近いキーフレームへ移動し、
+    そこから既知のフレーム数だけ順方向にデコードすることで行われる。
+    目的のフレームが現在位置と同じGOP内の先にある場合はシークせずにデコードを進める。
+    """
+
+    def __init__(self,
+                 archive_path: Path,
+                 member: str = 'movie.mp4',
+                 keyframe_index: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Parameters
+        ----------
+        archive_path : Path
+
+            tss形式のファイルへのパス
+
+        member : str
+
+            アーカイブ内の動画ファイル名
+
+        keyframe_index : Optional[Dict[str, Any]]
+
+            frame_countとkeyframesを持つ動画の索引。Noneの場合はcv2.CAP_PROP_POS_FRAMESによってシークする
+        """
+        self.__archive_path = archive_path
+        self.__member = member
+
+        self.__frame_count: Optional[int] = None
+        self.__keyframes: Optional[List[int]] = None
+
+        if keyframe_index is not None and len(keyframe_index['keyframes']) > 0 and keyframe_index['keyframes'][0] == 0:
+            self.__frame_count = keyframe_index['frame_count']
+            self.__keyframes = keyframe_index['keyframes']
+
+        self.__temp_path: Optional[Path] = None
+
+        self.__video_capture = self.__open()
+
+        # 次にreadで読み出されるフレーム番号
+        self.__position = 0
+
+    @property
+    def frame_count(self) -> int:
+        """
+        Returns
+        ----------
+        frame_count : int
+
+            動画の総フレーム数。索引を持つ場合はサンプル表から求めた正確な値
+        """
+        if self.__frame_count is not None:
+            return self.__frame_count
+
+        return int(self.__video_capture.get(cv2.CAP_PROP_FRAME_COUNT))
+
+    @property
+    def fps(self) -> float:
+        """
+        Returns
+        ----------
+        fps : float
+
+            動画のフレームレート
+        """
+        return self.__video_capture.get(cv2.CAP_PROP_FPS)
+
+    @property
+    def position(self) -> int:
+        """
+        Returns
+        ----------
+        position : int
+
+            次に読み出されるフレーム番号
+        """
+        return self.__position
+
+    def __open(self) -> cv2.VideoCapture:
+        """
+        動画を開く
+
+        Returns
+        ----------
+        video_capture : cv2.VideoCapture
+
+            動画を読み出すためのキャプチャ
+        """
+        with zipfile.ZipFile(self.__archive_path) as zip:
+            info = zip.getinfo(self.__member)
+
+            if info.compress_type == zipfile.ZIP_STORED:
+                start = member_data_offset(self.__archive_path, info)
+
+                video_capture = cv2.VideoCapture(
+                    f'subfile,,start,{start},end,{start + info.file_size},,:{self.__archive_path.resolve()}',
+                    cv2.CAP_FFMPEG)
+
+                if video_capture.isOpened():
+                    return video_capture
+
+                video_capture.release()
+
+            # 圧縮されている場合は動画のメンバーのみを一時ファイルへ書き出す
+            fd, temp_path = tempfile.mkstemp(suffix=Path(self.__member).suffix)
+
+            with os.fdopen(fd, 'wb') as f, zip.open(info) as member:
+                shutil.copyfileobj(member, f, 1024 * 1024)
+
+        self.__temp_path = Path(temp_path)
+
+        return cv2.VideoCapture(temp_path)
+
+    def seek(self, frame_no: int) -> None:
+        """
+        次に読み出すフレームを指定する
+
+        Parameters
+        ----------
+        frame_no : int
+
+            フレーム番号
+        """
+        if frame_no == self.__position:
+            return
+
+        if self.__keyframes is None:
+            self.__video_capture.set(cv2.CAP_PROP_POS_FRAMES, frame_no)
+            self.__position = frame_no
+            return
+
+        keyframe = self.__keyframes[max(bisect.bisect_right(self.__keyframes, frame_no) - 1, 0)]
+
+        # 間にキーフレームを挟まない先のフレームへは、シークせずにデコードを進める方が速い
+        if not keyframe <= self.__position < frame_no:
+            self.__video_capture.set(cv2.CAP_PROP_POS_FRAMES, keyframe)
+            self.__position = keyframe
+
+        while self.__position < frame_no:
+            if not self.__video_capture.grab():
+                # 読み出せるフレームが無い場合は、以降のreadも失敗する
+                self.__position = frame_no
+                return
+
+            self.__position += 1
+
+    def read(self, frame_no: Optional[int] = None) -> Optional[Any]:
+        """
+        フレームを読み出す
+
+        直前に読み出したフレームの次のフレームを読み出す場合はシークを行わない。
+
+        Parameters
+        ----------
+        frame_no : Optional[int]
+
+            読み出すフレーム番号。Noneの場合は次のフレームを読み出す
+
+        Returns
+        ----------
+        frame : Optional[numpy.ndarray]
+
+            読み出したフレーム。読み出せなかった場合はNone
+        """
+        if frame_no is not None:
+            self.seek(frame_no)
+
+        ret, frame = self.__video_capture.read()
+        self.__position += 1
+
+        return frame if ret else None
+
+    def read_frames(self, frame_numbers: Iterable[int]) -> Iterator[Tuple[int, Any]]:
+        """
+        指定されたフレームを先頭から順に1度ずつデコードして読み出す
+
+        シークは最初のフレームに対してのみ行い、以降は不要なフレームを
+        grabで読み飛ばしながら順方向にデコードする。
+
+        Parameters
+        ----------
+        frame_numbers : Iterable[int]
+
+            読み出すフレーム番号。重複は取り除かれ、昇順に読み出される
+
+        Returns
+        ----------
+        frames : Iterator[Tuple[int, numpy.ndarray]]
+
+            フレーム番号とフレームの組。読み出せなかったフレームは含まれない
+        """
+        targets = sorted(set(frame_numbers))
+
+        if len(targets) == 0:
+            return
+
+        self.seek(targets[0])
+
+        for frame_no in targets:
+            while self.__position < frame_no:
+                if not self.__video_capture.grab():
+                    return
+
+                self.__position += 1
+
+            ret, frame = self.__video_capture.read()
+            self.__position += 1
+
+            if not ret:
+                return
+
+            yield frame_no, frame
+
+    def release(self) -> None:
+        """
+        動画を閉じ、一時ファイルを作成していた場合は削除する
+        """
+        self.__video_capture.release()
+
+        if self.__temp_path is not None:
+            self.__temp_path.unlink(missing_ok=True)
+            self.__temp_path = None
+
+    def __enter__(self) -> VideoReader:
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.release()
+
+
+class SegmentedVideoReader:
+    """
+    複数のセグメントに分けて格納されている動画を、1つの連続した動画として読み出すためのクラス
+
+    フレーム番号は録画全体で通しの番号であり、各セグメントの動画は必要になった時点で開かれる。
+    同時に開かれるセグメントは1つのみである。
+    """
+
+    def __init__(self,
+                 archive_path: Path,
+                 segments: Sequence[Tuple[str, int, int]],
+                 keyframe_index: Optional[Dict[str, Dict[str, Any]]] = None) -> None:
+        """
+        Parameters
+        ----------
+        archive_path : Path
+
+            tss形式のファイルへのパス
+
+        segments : Sequence[Tuple[str, int, int]]
+
+            各セグメントの動画のファイル名、最初のフレーム番号、フレーム数の組。最初のフレーム番号の順に並んでいる必要がある
+
+        keyframe_index : Optional[Dict[str, Dict[str, Any]]]
+
+            セグメントの動画のファイル名をキーとする、各動画のキーフレームの索引
+        """
+        self.__archive_path = archive_path
+        self.__keyframe_index = keyframe_index or {}
+        self.__members = [member for member, _, _ in segments]
+        self.__offsets = [frame_offset for _, frame_offset, _ in segments]
+        self.__frame_count = segments[-1][1] + segments[-1][2] if len(segments) > 0 else 0
+
+        self.__reader: Optional[VideoReader] = None
+        self.__segment = -1
+
+        # 次にreadで読み出されるフレーム番号
+        self.__position = 0
+
+    @property
+    def frame_count(self) -> int:
+        """
+        Returns
+        ----------
+        frame_count : int
+
+            全てのセグメントの総フレーム数
+        """
+        return self.__frame_count
+
+    @property
+    def fps(self) -> float:
+        """
+        Returns
+        ----------
+        fps : float
+
+            動画のフレームレート
+        """
+        return self.__open_segment(max(self.__segment, 0)).fps
+
+    @property
+    def position(self) -> int:
+        """
+        Returns
+        ----------
+        position : int
+
+            次に読み出されるフレーム番号
+        """
+        return self.__position
+
+    def __segment_of(self, frame_no: int) -> int:
+        """
+        フレームを含むセグメントを求める
+
+        Parameters
+        ----------
+        frame_no : int
+
+            フレーム番号
+
+        Returns
+        ----------
+        segment : int
+
+            セグメントの番号
+        """
+        return max(bisect.bisect_right(self.__offsets, frame_no) - 1, 0)
+
+    def __open_segment(self, segment: int) -> VideoReader:
+        """
+        セグメントの動画を開き、それまで開いていた動画を閉じる
+
+        Parameters
+        ----------
+        segment : int
+
+            セグメントの番号
+
+        Returns
+        ----------
+        video_reader : VideoReader
+
+            セグメントの動画を読み出すためのクラス
+        """
+        if self.__reader is None or self.__segment != segment:
+            if self.__reader is not None:
+                self.__reader.release()
+
+            member = self.__members[segment]
+            self.__reader = VideoReader(self.__archive_path, member, self.__keyframe_index.get(member))
+            self.__segment = segment
+
+        return self.__reader
+
+    def seek(self, frame_no: int) -> None:
+        """
+        次に読み出すフレームを指定する
+
+        Parameters
+        ----------
+        frame_no : int
+
+            フレーム番号
+        """
+        self.__position = frame_no
+
+    def read(self, frame_no: Optional[int] = None) -> Optional[Any]:
+        """
+        フレームを読み出す
+
+        Parameters
+        ----------
+        frame_no : Optional[int]
+
+            読み出すフレーム番号。Noneの場合は次のフレームを読み出す
+
+        Returns
+        ----------
+        frame : Optional[numpy.ndarray]
+
+            読み出したフレーム。読み出せなかった場合はNone
+        """
+        if frame_no is not None:
+            self.seek(frame_no)
+
+        segment = self.__segment_of(self.__position)
+        frame = self.__open_segment(segment).read(self.__position - self.__offsets[segment])
+        self.__position += 1
+
+        return frame
+
+    def read_frames(self, frame_numbers: Iterable[int]) -> Iterator[Tuple[int, Any]]:
+        """
+        指定されたフレームを先頭から順に1度ずつデコードして読み出す
+
+        各セグメントの動画は1度だけ開かれ、VideoReader.read_framesと同様に順方向にデコードされる。
+
+        Parameters
+        ----------
+        frame_numbers : Iterable[int]
+
+            読み出すフレーム番号。重複は取り除かれ、昇順に読み出される
+
+        Returns
+        ----------
+        frames : Iterator[Tuple[int, numpy.ndarray]]
+
+            フレーム番号とフレームの組。読み出せなかったフレームは含まれない
+        """
+        targets = sorted(set(frame_numbers))
+
+        start = 0
+
+        while start < len(targets):
+            segment = self.__segment_of(targets[start])
+            offset = self.__offsets[segment]
+
+            end = start + 1
+            while end < len(targets) and self.__segment_of(targets[end]) == segment:
+                end += 1
+
+            reader = self.__open_segment(segment)
+
+            for local_frame_no, frame in reader.read_frames(frame_no - offset for frame_no in targets[start:end]):
+                self.__position = local_frame_no + offset + 1
+                yield local_frame_no + offset, frame
+
+            start = end
+
+    def release(self) -> None:
+        """
+        開いている動画を閉じる
+        """
+        if self.__reader is not None:
+            self.__reader.release()
+            self.__reader = None
+            self.__segment = -1
+
+    def __enter__(self) -> SegmentedVideoReader:
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.release()
+
+
+def open_archive_video(archive_path: Path) -> Union[VideoReader, SegmentedVideoReader]:
+    """
+    .tss形式のファイルに格納されている動画を開く
+
+    セグメントに分けて録画されたファイルの場合は、全てのセグメントを連続した1つの動画として開く。
+    キーフレームの索引が格納されている場合は、シークにその索引を用いる。
+
+    Parameters
+    ----------
+    archive_path : Path
+
+        tss形式のファイルへのパス
+
+    Returns
+    ----------
+    video_reader : Union[VideoReader, SegmentedVideoReader]
+
+        動画を読み出すためのクラス
+    """
+    with zipfile.ZipFile(archive_path) as zip:
+        segments: List[Tuple[str, int, int]] = []
+
+        if 'manifest.json' in zip.namelist():
+            with zip.open('manifest.json') as member:
+                segments = [(segment['movie'], segment['frame_offset'], segment['frame_count'])
+                            for segment in json.load(member).get('segments', [])]
+
+        keyframe_index = read_keyframe_index(zip)
+
+    if len(segments) == 0:
+        return VideoReader(archive_path, keyframe_index=keyframe_index.get('movie.mp4'))
+
+    return SegmentedVideoReader(archive_path, segments, keyframe_index)